@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""Колоночный архив снимков боев
+
+Архив - каталог с файлами колонок фиксированной ширины (array, без numpy).
+Строка - один участник в одном снимке (бой, раунд); для каждого снимка
+таблица снимков хранит номер первой строки и число строк (босс - последней
+строкой). Читатель отображает колонки в память (mmap) и сканирует только
+нужные, не разбирая состояния целиком:
+
+    with SnapshotArchive("runs.archive", "a") as archive:
+        archive.append_file("battle_round_10.json")     # или append_battle / append_state
+    with SnapshotArchive("runs.archive") as archive:
+        boss_hp = [hp for _, _, _, hp in archive.select('hp', round_number=10, boss=True)]
+
+Архив только дописывается. Сначала пишутся колонки строк, затем таблица
+снимков; снимок виден, только когда записаны все его колонки, а хвост
+после сбоя при открытии на дозапись отрезается. После таблицы снимков
+переписывается индекс по раундам (отсортированные ключи раунд << 32 |
+снимок): select по раунду находит свои снимки бисекцией. Отстающий индекс
+(сбой до его записи, архив без индекса) читатель не использует, а
+дозапись перестраивает.
+
+    python archive.py import runs.archive battle_round_*.json final_battle_result.json
+    python archive.py select runs.archive hp --round 10 --boss
+"""
+import argparse
+import bisect
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+ARCHIVE_FORMAT = "battle-archive"
+ARCHIVE_VERSION = 1
+
+# Колонки строк (участник в снимке): имя -> код типа array
+ROW_COLUMNS = {
+    'battle': 'I',            # номер боя в battles.jsonl
+    'round': 'I',
+    'slot': 'H',              # место в пати; босс - после пати
+    'boss': 'B',
+    'name': 'I',              # строки - ссылки в strings.jsonl
+    'class': 'I',
+    'level': 'i',
+    'hp': 'i',
+    'max_hp': 'i',
+    'mp': 'i',
+    'max_mp': 'i',
+    'strength': 'i',
+    'agility': 'i',
+    'intelligence': 'i',
+    # Эффекты: суммарная сила и наибольшая оставшаяся длительность по типу
+    'poison': 'i',
+    'poison_turns': 'i',
+    'shield': 'i',            # оставшийся запас щитов
+    'shield_turns': 'i',
+    'silence_turns': 'i',
+    'regeneration': 'i',
+    'regeneration_turns': 'i',
+}
+
+# Таблица снимков (индекс по бою и раунду)
+SNAPSHOT_COLUMNS = {
+    'battle': 'I',
+    'round': 'I',
+    'first_row': 'Q',
+    'rows': 'H',
+    'over': 'B',
+}
+
+# Индекс по раундам: ключи (раунд << 32 | номер снимка) по возрастанию
+INDEX_COLUMNS = {
+    'round': 'Q',
+}
+_SNAPSHOT_BITS = 32
+
+_TABLES = {'rows': ROW_COLUMNS, 'snapshots': SNAPSHOT_COLUMNS, 'index': INDEX_COLUMNS}
+
+# Класс эффекта -> (колонка силы или None, колонка длительности)
+EFFECT_COLUMNS = {
+    'PoisonEffect': ('poison', 'poison_turns'),
+    'ShieldEffect': ('shield', 'shield_turns'),
+    'SilenceEffect': (None, 'silence_turns'),
+    'RegenerationEffect': ('regeneration', 'regeneration_turns'),
+}
+
+_STATS = ('level', 'hp', 'max_hp', 'mp', 'max_mp', 'strength', 'agility', 'intelligence')
+
+def _column_path(path: str, table: str, name: str) -> str:
+    return os.path.join(path, f"{table}.{name}.col")
+
+def _read_lines(filename: str) -> List[str]:
+    """Строки JSON Lines; недописанная последняя строка отбрасывается"""
+    if not os.path.exists(filename):
+        return []
+    with open(filename, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return [json.loads(line) for line in text.split("\n")[:-1]]
+
+class SnapshotArchive:
+    """Колоночный архив: mode='r' - чтение через mmap, mode='a' - дозапись (создает архив)"""
+
+    def __init__(self, path: str, mode: str = 'r', buffer_rows: int = 65536):
+        if mode not in ('r', 'a'):
+            raise ValueError(f"Неверный режим: {mode}")
+        self.path = path
+        self.mode = mode
+        self.buffer_rows = buffer_rows
+        meta_path = os.path.join(path, "meta.json")
+        if mode == 'a' and not os.path.exists(meta_path):
+            os.makedirs(path, exist_ok=True)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'format': ARCHIVE_FORMAT, 'version': ARCHIVE_VERSION, 'byteorder': sys.byteorder,
+                           'rows': ROW_COLUMNS, 'snapshots': SNAPSHOT_COLUMNS}, f)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != ARCHIVE_FORMAT or meta.get('version') != ARCHIVE_VERSION:
+            raise ValueError(f"{path}: не архив снимков")
+        if meta['rows'] != ROW_COLUMNS or meta['snapshots'] != SNAPSHOT_COLUMNS:
+            raise ValueError(f"{path}: другой набор колонок")
+        self._swap = meta['byteorder'] != sys.byteorder
+
+        self.battle_ids: List[str] = _read_lines(os.path.join(path, "battles.jsonl"))
+        self.strings: List[str] = _read_lines(os.path.join(path, "strings.jsonl"))
+        self._battle_index = {battle_id: i for i, battle_id in enumerate(self.battle_ids)}
+        self._string_index = {value: i for i, value in enumerate(self.strings)}
+        self._snapshot_index: Optional[Dict[Tuple[int, int], int]] = None
+        self._maps: Dict[Tuple[str, str], mmap.mmap] = {}
+        self._columns: Dict[Tuple[str, str], Sequence[int]] = {}
+
+        self.snapshot_count, self.row_count = self._committed()
+        if mode == 'a':
+            if self._swap:
+                raise ValueError(f"{path}: дозапись архива с другим порядком байт")
+            self._truncate()
+            self._round_keys = self._load_round_index()
+            self._pending_rows = {name: array(code) for name, code in ROW_COLUMNS.items()}
+            self._pending_snapshots = {name: array(code) for name, code in SNAPSHOT_COLUMNS.items()}
+            self._pending_battles: List[str] = []
+            self._pending_strings: List[str] = []
+
+    # --- общее ---
+
+    def _file_length(self, table: str, name: str, code: str) -> int:
+        filename = _column_path(self.path, table, name)
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        return size // array(code).itemsize
+
+    def _committed(self) -> Tuple[int, int]:
+        """Число целиком записанных снимков и строк"""
+        snapshots = min(self._file_length('snapshots', name, code) for name, code in SNAPSHOT_COLUMNS.items())
+        if not snapshots:
+            return 0, 0
+        last = snapshots - 1
+        rows = self._read_column('snapshots', 'first_row', last, 1)[0] + self._read_column('snapshots', 'rows', last, 1)[0]
+        return snapshots, rows
+
+    def _read_column(self, table: str, name: str, start: int, count: int) -> array:
+        values = array(_TABLES[table][name])
+        with open(_column_path(self.path, table, name), 'rb') as f:
+            f.seek(start * values.itemsize)
+            values.frombytes(f.read(count * values.itemsize))
+        if self._swap:
+            values.byteswap()
+        return values
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.mode == 'a':
+            self.flush()
+        self._columns.clear()
+        for key in list(self._maps):
+            self._release(key)
+
+    def __len__(self) -> int:
+        return self.snapshot_count
+
+    # --- дозапись ---
+
+    def _truncate(self):
+        """Отрезание хвостов незавершенной записи"""
+        for table, columns, length in (('rows', ROW_COLUMNS, self.row_count),
+                                       ('snapshots', SNAPSHOT_COLUMNS, self.snapshot_count)):
+            for name, code in columns.items():
+                filename = _column_path(self.path, table, name)
+                with open(filename, 'ab') as f:
+                    f.truncate(length * array(code).itemsize)
+        for filename in ("battles.jsonl", "strings.jsonl"):
+            with open(os.path.join(self.path, filename), 'ab+') as f:
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+
+    def _load_round_index(self) -> array:
+        """Индекс по раундам в памяти; отстающий индекс перестраивается по колонке раундов"""
+        if not self.snapshot_count:
+            return array(INDEX_COLUMNS['round'])
+        if self._file_length('index', 'round', INDEX_COLUMNS['round']) == self.snapshot_count:
+            return self._read_column('index', 'round', 0, self.snapshot_count)
+        rounds = self._read_column('snapshots', 'round', 0, self.snapshot_count)
+        keys = array(INDEX_COLUMNS['round'],
+                     sorted(round_number << _SNAPSHOT_BITS | i for i, round_number in enumerate(rounds)))
+        self._write_round_index(keys)
+        return keys
+
+    def _write_round_index(self, keys: array):
+        """Индекс переписывается целиком и подменяется атомарно"""
+        filename = _column_path(self.path, 'index', 'round')
+        with open(filename + ".tmp", 'wb') as f:
+            keys.tofile(f)
+        os.replace(filename + ".tmp", filename)
+
+    def _string_ref(self, value: str) -> int:
+        ref = self._string_index.get(value)
+        if ref is None:
+            ref = self._string_index[value] = len(self.strings)
+            self.strings.append(value)
+            self._pending_strings.append(value)
+        return ref
+
+    def _append_row(self, battle: int, round_number: int, slot: int, boss: bool, data: Dict[str, Any]):
+        rows = self._pending_rows
+        rows['battle'].append(battle)
+        rows['round'].append(round_number)
+        rows['slot'].append(slot)
+        rows['boss'].append(boss)
+        rows['name'].append(self._string_ref(data['name']))
+        rows['class'].append(self._string_ref(data['class_name']))
+        for stat in _STATS:
+            rows[stat].append(int(data[stat]))
+        effects = dict.fromkeys(('poison', 'poison_turns', 'shield', 'shield_turns', 'silence_turns',
+                                 'regeneration', 'regeneration_turns'), 0)
+        for effect in data.get('effects', ()):
+            power_column, turns_column = EFFECT_COLUMNS.get(effect['class_name'], (None, None))
+            if power_column is not None:
+                effects[power_column] += effect.get('remaining_shield', effect['power'])
+            if turns_column is not None:
+                effects[turns_column] = max(effects[turns_column], effect['duration'])
+        for column, value in effects.items():
+            rows[column].append(value)
+
+    def append_state(self, state: Dict[str, Any], battle_id: Optional[str] = None):
+        """Снимок в формате Battle.to_dict (в том числе прочитанный из JSON)"""
+        if self.mode != 'a':
+            raise ValueError("Архив открыт только для чтения")
+        if battle_id is None:
+            battle_id = str(state.get('battle_id'))
+        battle = self._battle_index.get(battle_id)
+        if battle is None:
+            battle = self._battle_index[battle_id] = len(self.battle_ids)
+            self.battle_ids.append(battle_id)
+            self._pending_battles.append(battle_id)
+        round_number = state['round']
+        party = state['party']
+        for slot, data in enumerate(party):
+            self._append_row(battle, round_number, slot, False, data)
+        self._append_row(battle, round_number, len(party), True, state['boss'])
+
+        snapshots = self._pending_snapshots
+        snapshots['battle'].append(battle)
+        snapshots['round'].append(round_number)
+        snapshots['first_row'].append(self.row_count)
+        snapshots['rows'].append(len(party) + 1)
+        snapshots['over'].append(bool(state.get('is_battle_over')))
+        self.row_count += len(party) + 1
+        self.snapshot_count += 1
+        if self._snapshot_index is not None:
+            self._snapshot_index[(battle, round_number)] = self.snapshot_count - 1
+        if len(self._pending_rows['battle']) >= self.buffer_rows:
+            self.flush()
+
+    def append_battle(self, battle: 'Battle'):
+        """Текущее состояние боя (без состояния ГСЧ, которое архиву не нужно)"""
+        self.append_state({'round': battle.round, 'is_battle_over': battle.is_battle_over,
+                           'party': [char.to_dict() for char in battle.party],
+                           'boss': battle.boss.to_dict()}, battle.battle_id)
+
+    def append_file(self, filename: str, battle_id: Optional[str] = None):
+        """Контрольная точка авто-сохранения (полная или дельта) или save_state"""
+        from autosave import load_checkpoint
+        self.append_state(load_checkpoint(filename), battle_id)
+
+    def flush(self):
+        """Запись буферов: строки, справочники, затем таблица снимков (точка фиксации)"""
+        if self.mode != 'a' or not len(self._pending_snapshots['battle']):
+            return
+        first = self.snapshot_count - len(self._pending_snapshots['battle'])
+        new_keys = sorted(round_number << _SNAPSHOT_BITS | first + i
+                          for i, round_number in enumerate(self._pending_snapshots['round']))
+        for table, pending in (('rows', self._pending_rows), ('snapshots', self._pending_snapshots)):
+            if table == 'snapshots':
+                for filename, lines in (("battles.jsonl", self._pending_battles),
+                                        ("strings.jsonl", self._pending_strings)):
+                    with open(os.path.join(self.path, filename), 'a', encoding='utf-8') as f:
+                        f.writelines(json.dumps(line, ensure_ascii=False) + "\n" for line in lines)
+                    lines.clear()
+            for name, values in pending.items():
+                with open(_column_path(self.path, table, name), 'ab') as f:
+                    values.tofile(f)
+                del values[:]
+        # Два отсортированных прогона: сортировка сливает их за линейное время
+        keys = self._round_keys.tolist()
+        keys.extend(new_keys)
+        keys.sort()
+        self._round_keys = array(INDEX_COLUMNS['round'], keys)
+        self._write_round_index(self._round_keys)
+        # Отображения в память устарели
+        self._columns.clear()
+
+    # --- чтение ---
+
+    def column(self, name: str) -> Sequence[int]:
+        """Колонка строк целиком (memoryview над mmap, без копирования)"""
+        return self._column('rows', name, ROW_COLUMNS, self.row_count)
+
+    def snapshot_column(self, name: str) -> Sequence[int]:
+        """Колонка таблицы снимков"""
+        return self._column('snapshots', name, SNAPSHOT_COLUMNS, self.snapshot_count)
+
+    def _column(self, table: str, name: str, columns: Dict[str, str], length: int) -> Sequence[int]:
+        if self.mode == 'a':
+            self.flush()
+        key = (table, name)
+        view = self._columns.get(key)
+        if view is not None and len(view) == length:
+            return view
+        code = columns[name]
+        # Прежнее отображение колонки (до дозаписи) больше не нужно
+        self._columns.pop(key, None)
+        self._release(key)
+        if not length:
+            view = array(code)
+        elif self._swap:
+            view = self._read_column(table, name, 0, length)
+        else:
+            with open(_column_path(self.path, table, name), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[key] = mapped
+            view = memoryview(mapped)[:length * array(code).itemsize].cast(code)
+        self._columns[key] = view
+        return view
+
+    def _release(self, key: Tuple[str, str]):
+        mapped = self._maps.pop(key, None)
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # На колонку еще ссылаются снаружи - закроется вместе с последней ссылкой
+                pass
+
+    def _round_index(self) -> Optional[Sequence[int]]:
+        """Индекс по раундам или None, если он отстает от таблицы снимков"""
+        if self.mode == 'a':
+            self.flush()
+            return self._round_keys
+        if self._file_length('index', 'round', INDEX_COLUMNS['round']) != self.snapshot_count:
+            return None
+        return self._column('index', 'round', INDEX_COLUMNS, self.snapshot_count)
+
+    def find(self, battle_id: str, round_number: int) -> Optional[int]:
+        """Номер снимка по бою и раунду (последний, если раунд записан несколько раз)"""
+        if self._snapshot_index is None:
+            battles = self.snapshot_column('battle')
+            rounds = self.snapshot_column('round')
+            self._snapshot_index = {(battle, round_number): i
+                                    for i, (battle, round_number) in enumerate(zip(battles, rounds))}
+        battle = self._battle_index.get(battle_id)
+        return self._snapshot_index.get((battle, round_number)) if battle is not None else None
+
+    def snapshot(self, battle_id: str, round_number: int) -> Optional[List[Dict[str, Any]]]:
+        """Строки снимка в виде словарей (пати, затем босс)"""
+        index = self.find(battle_id, round_number)
+        if index is None:
+            return None
+        first = self.snapshot_column('first_row')[index]
+        count = self.snapshot_column('rows')[index]
+        columns = {name: self.column(name) for name in ROW_COLUMNS}
+        rows = []
+        for row in range(first, first + count):
+            data = {name: values[row] for name, values in columns.items()}
+            data['battle'] = self.battle_ids[data['battle']]
+            data['name'] = self.strings[data['name']]
+            data['class'] = self.strings[data['class']]
+            data['boss'] = bool(data['boss'])
+            rows.append(data)
+        return rows
+
+    def select(self, name: str, round_number: Optional[int] = None, boss: bool = False,
+               slot: Optional[int] = None) -> Iterator[Tuple[str, int, int, int]]:
+        """Значения колонки name: (бой, раунд, место, значение)
+
+        round_number - только снимки этого раунда (бисекция по индексу раундов);
+        boss=True - только босс, slot - только место в пати; иначе все
+        участники. Читаются только колонка name, таблица снимков и индекс.
+        """
+        values = self.column(name)
+        battles = self.snapshot_column('battle')
+        rounds = self.snapshot_column('round')
+        firsts = self.snapshot_column('first_row')
+        counts = self.snapshot_column('rows')
+        battle_ids = self.battle_ids
+        snapshots: Iterator[int] = iter(range(self.snapshot_count))
+        if round_number is not None:
+            keys = self._round_index()
+            if keys is not None:
+                mask = (1 << _SNAPSHOT_BITS) - 1
+                start = bisect.bisect_left(keys, round_number << _SNAPSHOT_BITS)
+                end = bisect.bisect_left(keys, round_number + 1 << _SNAPSHOT_BITS, start)
+                snapshots = (keys[k] & mask for k in range(start, end))
+        for i in snapshots:
+            snapshot_round = rounds[i]
+            if round_number is not None and snapshot_round != round_number:
+                continue
+            first, count = firsts[i], counts[i]
+            if boss:
+                yield battle_ids[battles[i]], snapshot_round, count - 1, values[first + count - 1]
+            elif slot is not None:
+                if slot < count - 1:
+                    yield battle_ids[battles[i]], snapshot_round, slot, values[first + slot]
+            else:
+                for offset in range(count):
+                    yield battle_ids[battles[i]], snapshot_round, offset, values[first + offset]
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Колоночный архив снимков боев")
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help="дописать JSON-снимки в архив")
+    importer.add_argument('archive')
+    importer.add_argument('files', nargs='+')
+    selector = commands.add_parser('select', help="значения одной колонки (JSON Lines)")
+    selector.add_argument('archive')
+    selector.add_argument('column', choices=sorted(ROW_COLUMNS))
+    selector.add_argument('--round', type=int)
+    selector.add_argument('--boss', action='store_true')
+    selector.add_argument('--slot', type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        with SnapshotArchive(args.archive, 'a') as archive:
+            for filename in args.files:
+                archive.append_file(filename)
+    else:
+        with SnapshotArchive(args.archive) as archive:
+            for battle_id, round_number, slot, value in archive.select(args.column, args.round,
+                                                                       args.boss, args.slot):
+                sys.stdout.write(json.dumps([battle_id, round_number, slot, value], ensure_ascii=False) + "\n")
+
+if __name__ == '__main__':
+    main()
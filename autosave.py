@@ -0,0 +1,169 @@
+import json
+import os
+import queue
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+# Фоновое авто-сохранение боя.
+# Контрольные точки пишутся цепочками: полный снимок (тот же JSON, что
+# Battle.save_state) и за ним дельты, где лежат только изменившиеся поля.
+
+_MISSING = object()
+
+def diff_state(old: Any, new: Any, path: Tuple = ()) -> Tuple[List[list], List[list]]:
+    """Разница двух состояний: (изменения [[путь, значение]], удаленные пути)
+
+    Словари и списки словарей сравниваются поэлементно, остальные значения
+    (в том числе списки чисел, например состояние ГСЧ) заменяются целиком.
+    """
+    changes: List[list] = []
+    removed: List[list] = []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            previous = old.get(key, _MISSING)
+            if previous is _MISSING:
+                changes.append([list(path + (key,)), value])
+            elif previous != value:
+                sub_changes, sub_removed = diff_state(previous, value, path + (key,))
+                changes.extend(sub_changes)
+                removed.extend(sub_removed)
+        removed.extend(list(path + (key,)) for key in old if key not in new)
+    elif (isinstance(old, list) and isinstance(new, list) and len(old) == len(new)
+          and all(isinstance(item, dict) for item in new)):
+        for index, (previous, value) in enumerate(zip(old, new)):
+            if previous != value:
+                sub_changes, sub_removed = diff_state(previous, value, path + (index,))
+                changes.extend(sub_changes)
+                removed.extend(sub_removed)
+    else:
+        changes.append([list(path), new])
+    return changes, removed
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Применение дельты к состоянию (состояние изменяется на месте)"""
+    for path in delta['removed']:
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        del parent[path[-1]]
+    for path, value in delta['changes']:
+        if not path:
+            return value
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        parent[path[-1]] = value
+    return state
+
+def _normalize(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Приведение к виду после JSON (кортежи -> списки), чтобы дельты сравнивали одинаковое"""
+    return json.loads(json.dumps(state, ensure_ascii=False))
+
+def load_checkpoint(filename: str) -> Dict[str, Any]:
+    """Чтение контрольной точки; для дельты восстанавливается вся цепочка"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('kind') != 'delta':
+        return data
+    base = load_checkpoint(os.path.join(os.path.dirname(filename), data['base']))
+    return apply_delta(base, data)
+
+class AutosaveWriter:
+    """Фоновый писатель контрольных точек боя
+
+    checkpoint() вызывается в конце каждого раунда, но сохраняет только раз
+    в interval раундов: снимает to_dict и ставит в очередь. Сравнение,
+    сериализация, запись на диск и ротация выполняются в отдельном потоке.
+    Полный снимок пишется раз в full_every контрольных точек, хранится не
+    больше retention файлов (старые цепочки удаляются целиком).
+    """
+
+    _STOP = object()
+
+    def __init__(self, directory: str = ".", prefix: str = "battle", interval: int = 5,
+                 full_every: int = 5, retention: int = 10):
+        self.directory = directory
+        self.prefix = prefix
+        self.interval = interval
+        self.full_every = full_every
+        self.retention = max(retention, full_every)
+        self.queue: queue.Queue = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.chains: List[List[str]] = []   # имена файлов, сгруппированные по цепочкам
+        self.last_state: Optional[Dict[str, Any]] = None
+        self.last_round: Optional[int] = None   # раунд последней поставленной в очередь точки
+        self.error: Optional[BaseException] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._worker, daemon=True)
+            self.thread.start()
+
+    def close(self):
+        """Дождаться записи всех контрольных точек и остановить поток"""
+        if self.thread is not None:
+            self.queue.put(self._STOP)
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def checkpoint(self, battle: 'Battle', force: bool = False):
+        """Постановка контрольной точки в очередь (раз в interval раундов)
+        
+        Бой, закончившийся посреди раунда, не меняет номер раунда - повторная
+        точка того же раунда без force пропускается.
+        """
+        if not force and (battle.round % self.interval or battle.round == self.last_round):
+            return
+        self.start()
+        self.last_round = battle.round
+        self.queue.put((battle.round, battle.to_dict()))
+
+    @property
+    def files(self) -> List[str]:
+        return [os.path.join(self.directory, name) for chain in self.chains for name in chain]
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is self._STOP:
+                break
+            try:
+                self._write(*item)
+            except Exception as error:  # поток не должен падать молча посреди боя
+                self.error = error
+
+    def _write(self, round_number: int, state: Dict[str, Any]):
+        state = _normalize(state)
+        full = self.last_state is None or len(self.chains[-1]) >= self.full_every
+        if full:
+            name = f"{self.prefix}_round_{round_number}.json"
+            data = state
+            self.chains.append([])
+        else:
+            changes, removed = diff_state(self.last_state, state)
+            name = f"{self.prefix}_round_{round_number}.delta.json"
+            data = {'kind': 'delta', 'base': self.chains[-1][-1], 'round': round_number,
+                    'changes': changes, 'removed': removed}
+
+        with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        self.chains[-1].append(name)
+        self.last_state = state
+        self._rotate()
+
+    def _rotate(self):
+        while len(self.chains) > 1 and sum(len(chain) for chain in self.chains) > self.retention:
+            for name in self.chains.pop(0):
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
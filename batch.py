@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Пакетный запуск симуляций без диалогов (в отличие от main.py)
+
+Пати и босс задаются в формате utils.create_party / utils.create_boss
+(JSON-строкой или @файлом), результат - JSON в stdout или в --output.
+Ничего, кроме результата, не печатается и не пишется на диск.
+
+    python batch.py --party '[{"class": "warrior", "name": "A", "level": 5}]' \\
+        --boss '{"level": 5, "difficulty": "hard"}' --seed 1 --battles 1000 --workers 4
+
+Модули боя импортируются только после разбора аргументов, поэтому --help и
+ошибки в аргументах не платят за загрузку движка.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+def _json_argument(value: str) -> Any:
+    """JSON-строка или @путь к JSON-файлу"""
+    try:
+        if value.startswith('@'):
+            with open(value[1:], 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return json.loads(value)
+    except (OSError, ValueError) as e:
+        raise argparse.ArgumentTypeError(f"не JSON: {e}")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Пакетная симуляция боев с JSON-результатом")
+    parser.add_argument('--party', type=_json_argument, help="пати в формате utils.create_party "
+                                                            "(по умолчанию - стандартная пати)")
+    parser.add_argument('--boss', type=_json_argument, default={},
+                        help='босс: {"name", "level", "difficulty"}')
+    parser.add_argument('--stash', type=_json_argument, help='общий запас пати: {"health_potion": 2, ...}')
+    parser.add_argument('--seed', type=int, help="сид серии (по умолчанию случайный, попадает в результат)")
+    parser.add_argument('--battles', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--stats', action='store_true', help="статистика персонажей (battle_stats)")
+    parser.add_argument('--output', help="файл для результата вместо stdout")
+    parser.add_argument('--indent', type=int, help="отступ JSON (по умолчанию - одна строка)")
+    return parser
+
+def make_factories(party_config: List[dict], boss_config: Dict[str, Any],
+                   stash_config: Optional[Dict[str, int]] = None) -> Tuple[Callable, Callable, Optional[Callable]]:
+    """Фабрики для simulate; каждая вызывается один раз, чтобы ошибки конфигурации
+    (KeyError, TypeError, ValueError) всплыли здесь, а не в дочерних процессах"""
+    from functools import partial
+
+    from items import Inventory
+    from utils import create_boss, create_party
+
+    factories = (partial(create_party, party_config), partial(create_boss, boss_config),
+                 partial(Inventory.from_dict, stash_config) if stash_config else None)
+    for factory in factories:
+        if factory is not None:
+            factory()
+    return factories
+
+def run(party_config: List[dict], boss_config: Dict[str, Any], seed: int, battles: int, workers: int = 1,
+        stash_config: Optional[Dict[str, int]] = None, stats: bool = False,
+        factories: Optional[Tuple[Callable, Callable, Optional[Callable]]] = None) -> Dict[str, Any]:
+    """Серия боев; возвращает JSON-совместимый словарь с параметрами и результатом
+
+    factories - уже проверенный результат make_factories для этих конфигураций
+    (иначе фабрики строятся и проверяются здесь).
+    """
+    from simulation import simulate
+
+    if factories is None:
+        factories = make_factories(party_config, boss_config, stash_config)
+    party_factory, boss_factory, stash_factory = factories
+    result = simulate(party_factory, boss_factory, battles, seed=seed, workers=workers,
+                      stash_factory=stash_factory, stats=stats)
+    return {
+        'seed': seed,
+        'battles': battles,
+        'party': party_config,
+        'boss': boss_config,
+        'stash': stash_config,
+        'result': result.to_dict(),
+    }
+
+def main(argv: List[str] = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.battles < 1 or args.workers < 1:
+        parser.error("--battles и --workers должны быть положительными")
+
+    seed = args.seed
+    if seed is None:
+        import random
+        seed = random.randrange(2 ** 32)
+    party_config = args.party
+    if party_config is None:
+        from utils import DEFAULT_PARTY
+        party_config = DEFAULT_PARTY
+
+    try:
+        factories = make_factories(party_config, args.boss, args.stash)
+    except (KeyError, TypeError, ValueError) as e:
+        parser.error(f"неверная конфигурация: {e!r}")
+
+    report = run(party_config, args.boss, seed, args.battles, args.workers, args.stash, args.stats,
+                 factories=factories)
+
+    text = json.dumps(report, ensure_ascii=False, indent=args.indent)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+if __name__ == '__main__':
+    main()
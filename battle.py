@@ -1,105 +1,293 @@
+import contextlib
+import heapq
+import itertools
 import random
 import json
-from typing import List, Dict, Any, Iterator
-from core import Character
+import uuid
+from typing import Callable, List, Dict, Any, Iterator, Optional, Tuple, Union
+from core import Character, RandomSource
+from results import ActionResult
 from characters import Boss
+from log_sinks import LogSink, BufferedFileSink, ConsoleSink
+from snapshot import encode_state, decode_state
+from targeting import TargetIndex
+from items import Inventory, Item, drink_potions
+from autosave import AutosaveWriter
 
 class TurnOrder:
-    """Итератор для определения порядка ходов"""
+    """Очередь инициативы: раунд за раундом по убыванию ловкости
+    
+    Итерация выдает персонажей одного раунда и завершается StopIteration
+    на границе раунда; следующий цикл for начинает новый раунд. Мертвые
+    удаляются лениво при извлечении, изменение agility во время боя
+    переупорядочивает еще не ходивших персонажей.
+    """
     
     def __init__(self, characters: List[Character]):
-        self.characters = [c for c in characters if c.is_alive]
-        # Сортируем по ловкости (в порядке убывания)
-        self.characters.sort(key=lambda x: x.agility, reverse=True)
-        self.index = 0
+        self._seq = itertools.count()
+        self._roster: Dict[Character, int] = {}        # участник -> порядковый номер
+        self._pushes = itertools.count()
+        self._heap: List[list] = []                    # [-agility, номер, № записи, персонаж]
+        self._pending: Dict[Character, list] = {}      # актуальные записи текущего раунда
+        for character in characters:
+            self.add_character(character)
+    
+    @property
+    def characters(self) -> List[Character]:
+        """Живые участники в порядке хода"""
+        alive = [c for c in self._roster if c.is_alive]
+        alive.sort(key=lambda c: (-c.agility, self._roster[c]))
+        return alive
     
     def __iter__(self) -> Iterator[Character]:
         return self
     
     def __next__(self) -> Character:
-        if not self.characters:
-            raise StopIteration
-        
-        # Убираем мертвых персонажей
-        self.characters = [c for c in self.characters if c.is_alive]
-        if not self.characters:
-            raise StopIteration
-        
-        if self.index >= len(self.characters):
-            self.index = 0
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            character = entry[3]
+            if self._pending.get(character) is not entry:
+                continue  # устаревшая запись после смены ловкости
+            del self._pending[character]
+            if not character.is_alive:
+                self._remove(character)
+                continue
+            return character
         
-        character = self.characters[self.index]
-        self.index += 1
-        return character
+        # Граница раунда: готовим очередь следующего
+        self._start_round()
+        raise StopIteration
+    
+    def _start_round(self):
+        for character in [c for c in self._roster if not c.is_alive]:
+            self._remove(character)
+        self._heap = [[-c.agility, seq, next(self._pushes), c] for c, seq in self._roster.items()]
+        heapq.heapify(self._heap)
+        self._pending = {entry[3]: entry for entry in self._heap}
+    
+    def _push(self, character: Character):
+        entry = [-character.agility, self._roster[character], next(self._pushes), character]
+        self._pending[character] = entry
+        heapq.heappush(self._heap, entry)
+    
+    def _remove(self, character: Character):
+        del self._roster[character]
+        self._pending.pop(character, None)
+        character.remove_watcher(self)
     
     def add_character(self, character: Character):
-        """Добавление персонажа в очередь"""
-        if character.is_alive and character not in self.characters:
-            self.characters.append(character)
-            self.characters.sort(key=lambda x: x.agility, reverse=True)
+        """Добавление персонажа в очередь (ходит уже в текущем раунде)"""
+        if character.is_alive and character not in self._roster:
+            self._roster[character] = next(self._seq)
+            character.add_watcher(self)
+            self._push(character)
+    
+    def reprioritize(self, character: Character):
+        """Пересчет места в очереди текущего раунда после смены ловкости"""
+        entry = self._pending.get(character)
+        if entry is not None and entry[0] != -character.agility:
+            self._push(character)
+    
+    def on_stat_changed(self, character: Character, stat: str):
+        if stat == 'agility':
+            self.reprioritize(character)
+    
+    def capture(self) -> tuple:
+        """Снимок очереди (записи кучи не изменяются на месте, достаточно копий контейнеров)"""
+        return list(self._heap), dict(self._pending), dict(self._roster)
+    
+    def rewind(self, state: tuple):
+        heap, pending, roster = state
+        self._heap = list(heap)
+        self._pending = dict(pending)
+        self._roster = dict(roster)
+        for character in roster:
+            character.add_watcher(self)
 
 class BattleLogger:
-    """Контекстный менеджер для логирования боя"""
+    """Контекстный менеджер для логирования боя
+    
+    Сообщения передаются в набор приемников (см. log_sinks). По умолчанию -
+    консоль и буферизованный файл filename; filename=None и echo=False
+    отключают соответствующий приемник.
+    """
     
-    def __init__(self, filename: str = "battle_log.txt"):
+    def __init__(self, filename: Optional[str] = "battle_log.txt", echo: bool = True,
+                 sinks: Optional[List[LogSink]] = None):
         self.filename = filename
-        self.log_file = None
+        if sinks is None:
+            sinks = []
+            if filename:
+                sinks.append(BufferedFileSink(filename, header="=== НАЧАЛО БОЯ ===",
+                                              footer="=== КОНЕЦ БОЯ ==="))
+            if echo:
+                sinks.append(ConsoleSink())
+        self.sinks = sinks
+    
+    @property
+    def sinks(self) -> List[LogSink]:
+        return self._sinks
+    
+    @sinks.setter
+    def sinks(self, sinks: List[LogSink]):
+        self._sinks = sinks
+        self._enabled = any(not sink.discards for sink in sinks)
+    
+    @classmethod
+    def headless(cls) -> 'BattleLogger':
+        """Логгер без приемников для массовых симуляций"""
+        return cls(sinks=[])
+    
+    @property
+    def enabled(self) -> bool:
+        """Есть ли приемники, которые что-то сохраняют; иначе сообщения можно не строить"""
+        return self._enabled
     
     def __enter__(self):
-        self.log_file = open(self.filename, 'w', encoding='utf-8')
-        self.log_file.write("=== НАЧАЛО БОЯ ===\n")
+        for sink in self.sinks:
+            sink.open()
         return self
     
-    def log(self, message: str):
-        """Запись сообщения в лог"""
-        if self.log_file:
-            self.log_file.write(message + '\n')
-        print(message)
+    def log(self, message: Union[str, ActionResult]):
+        """Запись сообщения в лог
+        
+        ActionResult передается приемникам как есть: текст строят только
+        текстовые приемники, структурированные пишут поля. Логгер без
+        приемников (или только с NullSink) не трогает сообщение вовсе.
+        """
+        if self._enabled:
+            for sink in self._sinks:
+                sink.write(message)
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.log_file:
-            self.log_file.write("=== КОНЕЦ БОЯ ===\n")
-            self.log_file.close()
+        for sink in self.sinks:
+            sink.close()
 
 class Battle:
     """Основной класс боя"""
     
-    def __init__(self, party: List[Character], boss: Boss, seed: int = None):
+    def __init__(self, party: List[Character], boss: Boss, seed: int = None,
+                 rng: Optional[RandomSource] = None, battle_id: Optional[str] = None,
+                 stash: Optional[Inventory] = None):
         self.party = party
         self.boss = boss
         self.turn_order = TurnOrder(party + [boss])
+        # Живые, самый раненый и случайная цель среди пати без прохода по списку
+        self.targets = TargetIndex(party)
         self.round = 1
         self.is_battle_over = False
         
-        # Настройка генератора случайных чисел
-        if seed is not None:
-            random.seed(seed)
+        # Собственный генератор боя: бои не влияют друг на друга через
+        # глобальный random и воспроизводятся по своему сиду
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed)
+        for char in party + [boss]:
+            char.rng = self.rng
+        
+        # У каждого боя свой файл лога
+        if battle_id is None:
+            battle_id = str(seed) if seed is not None else uuid.uuid4().hex[:8]
+        self.battle_id = battle_id
+        self.log_path = f"battle_log_{battle_id}.txt"
+        
+        # Запись повтора (см. replay.ReplayRecorder); None - не записывается
+        self.recorder = None
+        # Сбор статистики (см. battle_stats.StatsCollector); None - не собирается
+        self.stats = None
+        
+        # Общий запас предметов пати и политика ИИ: item_policy(battle, персонаж)
+        # возвращает предмет, который персонаж использует вместо действия, или None
+        self.stash = stash
+        self.item_policy: Callable[['Battle', Character], Optional[Item]] = drink_potions
     
-    def save_state(self, filename: str = "battle_save.json"):
-        """Сохранение состояния боя в JSON"""
+    def to_dict(self) -> Dict[str, Any]:
+        """Полное состояние боя, включая состояние генератора случайных чисел"""
         state = {
             'round': self.round,
             'party': [char.to_dict() for char in self.party],
             'boss': self.boss.to_dict(),
-            'is_battle_over': self.is_battle_over
+            'is_battle_over': self.is_battle_over,
+            'seed': self.seed,
+            'battle_id': self.battle_id
         }
+        if self.stash is not None:
+            state['stash'] = self.stash.to_dict()
+        if hasattr(self.rng, 'getstate'):
+            state['rng_state'] = self.rng.getstate()
+        return state
+    
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'Battle':
+        """Восстановление боя из to_dict; бой продолжается с начала раунда state['round']"""
+        party = [Character.from_dict(data) for data in state['party']]
+        boss = Boss.from_dict(state['boss'])
+        stash = Inventory.from_dict(state['stash']) if 'stash' in state else None
+        battle = cls(party, boss, state.get('seed'), battle_id=state.get('battle_id'), stash=stash)
+        battle.round = state['round']
+        battle.is_battle_over = state['is_battle_over']
+        rng_state = state.get('rng_state')
+        if rng_state is not None:
+            version, internal, gauss = rng_state
+            battle.rng.setstate((version, tuple(internal), gauss))
+        return battle
+    
+    def capture(self, rng: bool = True) -> tuple:
+        """Быстрый снимок боя в памяти: участники, эффекты, кулдауны, очередь, запас предметов и ГСЧ
         
+        В отличие от to_dict/deepcopy объекты не копируются: rewind возвращает
+        те же объекты к снимку. Подходит для тысяч откатов за ход (поиск ИИ).
+        """
+        return (self.round, self.is_battle_over, self.turn_order.capture(),
+                [char.capture() for char in self.party], self.boss.capture(),
+                self.stash.capture() if self.stash is not None else None,
+                self.rng.getstate() if rng else None)
+    
+    def rewind(self, state: tuple):
+        """Возврат к снимку capture (ГСЧ - только если он был сохранен)"""
+        self.round, self.is_battle_over, turn_order, party, boss, stash, rng_state = state
+        self.turn_order.rewind(turn_order)
+        for char, char_state in zip(self.party, party):
+            char.rewind(char_state)
+        self.boss.rewind(boss)
+        self.targets.rebuild()
+        if stash is not None:
+            self.stash.rewind(stash)
+        if rng_state is not None:
+            self.rng.setstate(rng_state)
+    
+    def close(self):
+        """Конец боя: индекс целей отписывается от участников
+
+        Персонажи переживают бой (пати кампании, объекты тестов) и не должны
+        держать его индекс. Продолжить закрытый бой можно после rewind.
+        """
+        self.targets.detach()
+    
+    def save_state(self, filename: str = "battle_save.json"):
+        """Сохранение состояния боя в JSON"""
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
     
     @classmethod
-    def load_state(cls, filename: str = "battle_save.json"):
-        """Загрузка состояния боя из JSON"""
+    def load_state(cls, filename: str = "battle_save.json") -> 'Battle':
+        """Загрузка боя из JSON, сохраненного save_state"""
         with open(filename, 'r', encoding='utf-8') as f:
-            state = json.load(f)
-        
-        # В реальной реализации нужно восстановить объекты из словарей
-        # Это упрощенная версия
-        return state
+            return cls.from_dict(json.load(f))
+    
+    def save_snapshot(self, filename: str):
+        """Сохранение в компактном двоичном формате (см. snapshot.py)"""
+        with open(filename, 'wb') as f:
+            f.write(encode_state(self.to_dict()))
+    
+    @classmethod
+    def load_snapshot(cls, filename: str) -> 'Battle':
+        """Загрузка боя из двоичного снимка save_snapshot"""
+        with open(filename, 'rb') as f:
+            return cls.from_dict(decode_state(f.read()))
     
     def check_battle_end(self) -> bool:
         """Проверка условий окончания боя"""
-        party_alive = any(char.is_alive for char in self.party)
+        party_alive = self.targets.alive_count > 0
         boss_alive = self.boss.is_alive
         
         if not party_alive:
@@ -113,70 +301,120 @@ class Battle:
     
     def apply_start_of_turn_effects(self, character: Character):
         """Применение эффектов в начале хода персонажа"""
-        character.apply_effects()
+        ticks = character.apply_effects()
+        if self.stats is not None and ticks:
+            self.stats.on_effects(self, character, ticks)
         character.update_cooldowns()
     
-    def run_turn(self, character: Character, logger: BattleLogger) -> bool:
-        """Выполнение хода одного персонажа"""
+    def decide(self, character: Character) -> Tuple[Union[int, Item, None], List[Character]]:
+        """Выбор действия персонажа: (индекс навыка, предмет из запаса или None для базовой атаки, цели)"""
+        if isinstance(character, Boss):
+            return character.decide(self.targets)
+        
+        if self.stash:
+            item = self.item_policy(self, character)
+            if item is not None:
+                return item, [character]
+        
+        # Ход игрока (упрощенная версия - случайное действие)
+        if character.skills and self.rng.random() < 0.6 and character.mp > 10 and not character.is_silenced:
+            # Использование случайного навыка, если есть доступные
+            available_skills = character.ready_skills()
+            if available_skills:
+                return self.rng.choice(available_skills), [self.boss]
+        
+        # Базовая атака
+        return None, [self.boss]
+    
+    def begin_turn(self, character: Character, logger: Optional[BattleLogger]) -> bool:
+        """Начало хода: эффекты и кулдауны; False, если персонаж мертв и не ходит"""
         if not character.is_alive:
             return False
         
-        logger.log(f"\n--- Ход {character.name} ---")
+        if logger is not None and logger.enabled:
+            logger.log(f"\n--- Ход {character.name} ---")
         self.apply_start_of_turn_effects(character)
-        
-        if isinstance(character, Boss):
-            # Ход босса
-            action_result = character.choose_action(self.party)
-            logger.log(action_result)
+        return True
+    
+    def finish_turn(self, character: Character, skill_index: Union[int, Item, None], targets: List[Character],
+                    logger: Optional[BattleLogger]) -> bool:
+        """Выполнение выбранного действия; возвращает True, если бой окончен"""
+        if isinstance(skill_index, Item):
+            action_result = self.stash.use_item(skill_index, character, targets[0])
         else:
-            # Ход игрока (упрощенная версия - случайное действие)
-            if character.skills and random.random() < 0.6 and character.mp > 10:
-                # Использование случайного навыка
-                available_skills = [i for i, skill in enumerate(character.skills) 
-                                  if skill.name not in character.cooldowns and character.mp >= skill.mp_cost]
-                if available_skills:
-                    skill_index = random.choice(available_skills)
-                    action_result = character.use_skill(skill_index, [self.boss])
-                    logger.log(action_result)
-                else:
-                    # Базовая атака если нет доступных навыков
-                    action_result = character.basic_attack(self.boss)
-                    logger.log(action_result)
-            else:
-                # Базовая атака
-                action_result = character.basic_attack(self.boss)
-                logger.log(action_result)
+            action_result = character.perform(skill_index, targets)
+        if self.recorder is not None:
+            self.recorder.on_turn(self, character, skill_index, targets)
+        if self.stats is not None:
+            self.stats.on_action(self, character, action_result)
+        if logger is not None:
+            logger.log(action_result)
         
         return self.check_battle_end()
     
-    def run_battle(self):
-        """Основной игровой цикл"""
-        with BattleLogger() as logger:
+    def run_turn(self, character: Character, logger: Optional[BattleLogger]) -> bool:
+        """Выполнение хода одного персонажа; logger=None - без лога и форматирования заголовков"""
+        if not self.begin_turn(character, logger):
+            return False
+        skill_index, targets = self.decide(character)
+        return self.finish_turn(character, skill_index, targets, logger)
+    
+    def run_round(self, logger: Optional[BattleLogger]) -> bool:
+        """Ходы одного раунда; возвращает True, если бой окончен"""
+        # Итератор очереди останавливается на границе раунда
+        for character in self.turn_order:
+            if self.run_turn(character, logger):
+                break
+        
+        if not self.is_battle_over:
+            self.round += 1
+        return self.is_battle_over
+    
+    def default_logger(self) -> BattleLogger:
+        """Логгер run_battle по умолчанию: консоль и файл self.log_path"""
+        return BattleLogger(self.log_path)
+    
+    def default_autosaver(self) -> AutosaveWriter:
+        return AutosaveWriter(prefix=f"battle_{self.battle_id}")
+    
+    def run_battle(self, logger: Optional[BattleLogger] = None,
+                   autosave: Union[bool, AutosaveWriter] = True):
+        """Основной игровой цикл
+        
+        logger - логгер боя (по умолчанию пишет в консоль и в файл self.log_path),
+        autosave - True (фоновое авто-сохранение каждые 5 раундов), False или
+        настроенный AutosaveWriter.
+        """
+        if logger is None:
+            logger = self.default_logger()
+        if autosave is True:
+            autosave = self.default_autosaver()
+        autosaver = autosave or None
+        
+        with logger, (autosaver or contextlib.nullcontext()), contextlib.closing(self):
             logger.log(f"Начало боя! Пати против {self.boss.name}")
             logger.log(f"Уровень босса: {self.boss.level}")
             logger.log(f"HP босса: {self.boss.hp}/{self.boss.max_hp}")
+            if self.round > 1:
+                logger.log(f"Бой продолжается с раунда {self.round}")
             
             while not self.is_battle_over:
-                logger.log(f"\n=== Раунд {self.round} ===")
-                
-                # Показываем статус всех персонажей
-                for char in self.party:
-                    if char.is_alive:
-                        logger.log(f"{char.name}: HP {char.hp}/{char.max_hp}, MP {char.mp}/{char.max_mp}")
-                
-                logger.log(f"{self.boss.name}: HP {self.boss.hp}/{self.boss.max_hp}, MP {self.boss.mp}/{self.boss.max_mp}")
-                
-                # Выполняем ходы по очереди
-                for character in self.turn_order:
-                    if self.run_turn(character, logger):
-                        break
+                # Заголовок и статус раунда форматируются, только если лог кто-то читает
+                if logger.enabled:
+                    logger.log(f"\n=== Раунд {self.round} ===")
+                    
+                    # Показываем статус всех персонажей
+                    for char in self.party:
+                        if char.is_alive:
+                            logger.log(f"{char.name}: HP {char.hp}/{char.max_hp}, MP {char.mp}/{char.max_mp}")
+                    
+                    logger.log(f"{self.boss.name}: HP {self.boss.hp}/{self.boss.max_hp}, MP {self.boss.mp}/{self.boss.max_mp}")
                 
-                if not self.is_battle_over:
-                    self.round += 1
+                self.run_round(logger)
                 
-                # Авто-сохранение каждые 5 раундов
-                if self.round % 5 == 0:
-                    self.save_state(f"battle_round_{self.round}.json")
+                # Авто-сохранение пишется в фоновом потоке
+                if autosaver:
+                    autosaver.checkpoint(self)
             
             # Определяем победителя
             if any(char.is_alive for char in self.party):
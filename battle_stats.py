@@ -0,0 +1,438 @@
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from results import (ActionResult, ATTACK, MAGIC_ATTACK, SKILL_DAMAGE, SKILL_HEAL, SKILL_MASS_HEAL,
+                     SKILL_EFFECT, POISON_TICK, REGENERATION_TICK, ITEM_RESTORE)
+
+# Потоковая статистика боев.
+# StatsCollector подключается к бою (battle.stats) и получает итоги действий
+# (ActionResult) и тиков эффектов. За бой по каждому персонажу копятся суммы,
+# в конце боя они попадают в потоковые агрегаты: среднее и дисперсия по
+# Уэлфорду и квантильный скетч с логарифмическими корзинами. Память не
+# зависит от числа боев, отчеты разных процессов объединяются (merge) и
+# сериализуются (to_dict/from_dict).
+
+# Величины, которые копятся за бой по каждому персонажу
+METRICS = ('damage_dealt', 'damage_taken', 'healing_done', 'healing_received', 'overheal', 'mp_spent')
+DEALT, TAKEN, HEALING, RECEIVED, OVERHEAL, MP_SPENT = range(len(METRICS))
+
+METRIC_TITLES = {
+    'damage_dealt': "Урон нанесен",
+    'damage_taken': "Урон получен",
+    'healing_done': "Лечение",
+    'healing_received': "Лечение получено",
+    'overheal': "Избыток лечения",
+    'mp_spent': "MP потрачено",
+}
+
+DAMAGE_KINDS = frozenset((ATTACK, MAGIC_ATTACK, SKILL_DAMAGE))
+HEAL_KINDS = frozenset((SKILL_HEAL, SKILL_MASS_HEAL))
+SKILL_KINDS = frozenset((SKILL_DAMAGE, SKILL_HEAL, SKILL_MASS_HEAL, SKILL_EFFECT))
+
+class RunningStats:
+    """Число, среднее, дисперсия, минимум и максимум за один проход (Уэлфорд)"""
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Параллельное объединение (формула Чана)"""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Выборочная дисперсия"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+        if self.count:
+            data['min'] = self.min
+            data['max'] = self.max
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunningStats':
+        stats = cls()
+        stats.count = data['count']
+        stats.mean = data['mean']
+        stats.m2 = data['m2']
+        stats.min = data.get('min', math.inf)
+        stats.max = data.get('max', -math.inf)
+        return stats
+
+class QuantileSketch:
+    """Квантили неотрицательных величин с относительной точностью alpha
+
+    Значение x попадает в корзину ceil(log_gamma(x)), gamma = (1 + alpha) / (1 - alpha);
+    оценка квантиля отличается от истинного значения не более чем в (1 ± alpha)
+    раз. Корзин не больше max_bins: при переполнении сливаются самые младшие,
+    поэтому страдает точность только нижних квантилей. Скетчи с одинаковыми
+    параметрами объединяются сложением счетчиков.
+    """
+    __slots__ = ('alpha', 'max_bins', 'gamma', '_log_gamma', 'zero', 'bins', 'count')
+
+    def __init__(self, alpha: float = 0.02, max_bins: int = 512):
+        self.alpha = alpha
+        self.max_bins = max_bins
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.zero = 0                      # значения <= 0 (урон и лечение бывают нулевыми)
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+
+    def add(self, value: float, count: int = 1):
+        self.count += count
+        if value <= 0:
+            self.zero += count
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        bins = self.bins
+        bins[key] = bins.get(key, 0) + count
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        if excess <= 0:
+            return
+        # Младшие корзины сливаются в первую оставшуюся
+        moved = sum(self.bins.pop(key) for key in keys[:excess])
+        self.bins[keys[excess]] += moved
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if other.gamma != self.gamma:
+            raise ValueError("Нельзя объединить скетчи с разной точностью")
+        self.zero += other.zero
+        self.count += other.count
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self._collapse()
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Оценка q-квантиля (0 <= q <= 1); 0.0 для пустого скетча"""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'alpha': self.alpha, 'max_bins': self.max_bins, 'zero': self.zero,
+                'bins': {str(key): count for key, count in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data['alpha'], data['max_bins'])
+        sketch.zero = data['zero']
+        sketch.bins = {int(key): count for key, count in data['bins'].items()}
+        sketch.count = sketch.zero + sum(sketch.bins.values())
+        return sketch
+
+class Distribution:
+    """Потоковое распределение: моменты (RunningStats) и квантили (QuantileSketch)"""
+    __slots__ = ('stats', 'sketch')
+
+    def __init__(self, stats: Optional[RunningStats] = None, sketch: Optional[QuantileSketch] = None):
+        self.stats = stats if stats is not None else RunningStats()
+        self.sketch = sketch if sketch is not None else QuantileSketch()
+
+    def add(self, value: float):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other: 'Distribution') -> 'Distribution':
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def count(self) -> int:
+        return self.stats.count
+
+    @property
+    def mean(self) -> float:
+        return self.stats.mean
+
+    def quantile(self, q: float) -> float:
+        """Квантиль скетча, ограниченный точными минимумом и максимумом"""
+        if not self.stats.count:
+            return 0.0
+        return min(max(self.sketch.quantile(q), self.stats.min), self.stats.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self.stats.to_dict()
+        data['stdev'] = self.stats.stdev
+        data['p50'] = self.quantile(0.5)
+        data['p90'] = self.quantile(0.9)
+        data['p99'] = self.quantile(0.99)
+        data['sketch'] = self.sketch.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Distribution':
+        return cls(RunningStats.from_dict(data), QuantileSketch.from_dict(data['sketch']))
+
+class CharacterStats:
+    """Агрегаты одного персонажа (по имени) за все бои"""
+
+    def __init__(self, class_name: str = ""):
+        self.class_name = class_name
+        self.battles = 0
+        self.deaths = 0
+        self.attacks = 0                 # базовые атаки, которые могут быть критическими
+        self.crits = 0
+        self.skill_uses: Counter = Counter()
+        self.metrics: Dict[str, Distribution] = {metric: Distribution() for metric in METRICS}
+        self.death_round = Distribution()   # раунд смерти (только погибшие)
+
+    @property
+    def crit_rate(self) -> float:
+        return self.crits / self.attacks if self.attacks else 0.0
+
+    @property
+    def death_rate(self) -> float:
+        return self.deaths / self.battles if self.battles else 0.0
+
+    def merge(self, other: 'CharacterStats') -> 'CharacterStats':
+        self.class_name = self.class_name or other.class_name
+        self.battles += other.battles
+        self.deaths += other.deaths
+        self.attacks += other.attacks
+        self.crits += other.crits
+        self.skill_uses.update(other.skill_uses)
+        for metric, distribution in other.metrics.items():
+            self.metrics[metric].merge(distribution)
+        self.death_round.merge(other.death_round)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'class': self.class_name,
+            'battles': self.battles,
+            'deaths': self.deaths,
+            'attacks': self.attacks,
+            'crits': self.crits,
+            'crit_rate': self.crit_rate,
+            'skill_uses': dict(self.skill_uses),
+            'metrics': {metric: distribution.to_dict() for metric, distribution in self.metrics.items()},
+            'death_round': self.death_round.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CharacterStats':
+        stats = cls(data.get('class', ""))
+        stats.battles = data['battles']
+        stats.deaths = data['deaths']
+        stats.attacks = data['attacks']
+        stats.crits = data['crits']
+        stats.skill_uses.update(data['skill_uses'])
+        for metric, distribution in data['metrics'].items():
+            stats.metrics[metric] = Distribution.from_dict(distribution)
+        stats.death_round = Distribution.from_dict(data['death_round'])
+        return stats
+
+class BattleStats:
+    """Отчет по сериям боев: CharacterStats по именам персонажей"""
+
+    def __init__(self):
+        self.battles = 0
+        self.characters: Dict[str, CharacterStats] = {}
+
+    def character(self, name: str, class_name: str = "") -> CharacterStats:
+        stats = self.characters.get(name)
+        if stats is None:
+            stats = self.characters[name] = CharacterStats(class_name)
+        return stats
+
+    def merge(self, other: 'BattleStats') -> 'BattleStats':
+        self.battles += other.battles
+        for name, stats in other.characters.items():
+            self.character(name).merge(stats)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'battles': self.battles,
+                'characters': {name: stats.to_dict() for name, stats in self.characters.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BattleStats':
+        report = cls()
+        report.battles = data['battles']
+        for name, stats in data['characters'].items():
+            report.characters[name] = CharacterStats.from_dict(stats)
+        return report
+
+    def __str__(self):
+        lines = [f"Боев: {self.battles}",
+                 f"{'Персонаж':16} {'урон (сред. ± ст.откл.)':>24} {'p90':>7} {'лечение':>9} "
+                 f"{'избыток':>8} {'MP':>7} {'крит':>6} {'гибель':>7} {'раунд гибели':>13}"]
+        for name, stats in self.characters.items():
+            metrics = stats.metrics
+            dealt = metrics['damage_dealt']
+            death_round = f"{stats.death_round.mean:.1f}" if stats.deaths else "-"
+            lines.append(f"{name:16} {dealt.mean:>15.1f} ± {dealt.stats.stdev:<6.1f} {dealt.quantile(0.9):>7.0f} "
+                         f"{metrics['healing_done'].mean:>9.1f} {metrics['overheal'].mean:>8.1f} "
+                         f"{metrics['mp_spent'].mean:>7.1f} {stats.crit_rate:>6.1%} {stats.death_rate:>7.1%} "
+                         f"{death_round:>13}")
+        return "\n".join(lines)
+
+class _BattleTotals:
+    """Суммы одного персонажа за текущий бой"""
+    __slots__ = ('values', 'attacks', 'crits', 'skill_uses', 'death_round')
+
+    def __init__(self):
+        self.values = [0] * len(METRICS)
+        self.attacks = 0
+        self.crits = 0
+        self.skill_uses: Counter = Counter()
+        self.death_round: Optional[int] = None
+
+class StatsCollector:
+    """Сбор статистики боев в BattleStats
+
+        collector = StatsCollector()
+        for seed in seeds:
+            battle = Battle(party(), boss(), seed)
+            collector.attach(battle)
+            battle.run_battle(...)
+        print(collector.flush())
+
+    Суммы боя переносятся в отчет при подключении к следующему бою и в
+    flush(). Урон и лечение эффектов (отравление, регенерация) считаются
+    нанесенными наложившему эффект (Effect.source) и полученными персонажем
+    под эффектом; избыток регенерации - наложившему. Эффекты без source
+    (например, из сохранения) засчитываются только получившему.
+    """
+
+    def __init__(self, report: Optional[BattleStats] = None):
+        self.report = report if report is not None else BattleStats()
+        self._battle = None
+        self._totals: Dict[Any, _BattleTotals] = {}
+
+    def attach(self, battle) -> 'StatsCollector':
+        self.flush()
+        self._battle = battle
+        self._totals = {char: _BattleTotals() for char in list(battle.party) + [battle.boss]}
+        battle.stats = self
+        return self
+
+    def _totals_of(self, character) -> _BattleTotals:
+        totals = self._totals.get(character)
+        if totals is None:
+            # Участник, добавленный после начала боя
+            totals = self._totals[character] = _BattleTotals()
+        return totals
+
+    def _check_deaths(self, battle, characters: Sequence):
+        for char in characters:
+            if char.hp <= 0:
+                totals = self._totals_of(char)
+                if totals.death_round is None:
+                    totals.death_round = battle.round
+
+    def on_action(self, battle, character, result: ActionResult):
+        """Итог действия персонажа (вызывается из Battle.finish_turn)"""
+        kind = result.kind
+        totals = self._totals_of(character)
+        if kind in DAMAGE_KINDS:
+            for target, amount in zip(result.targets, result.amounts):
+                totals.values[DEALT] += amount
+                self._totals_of(target).values[TAKEN] += amount
+            if kind == ATTACK:
+                totals.attacks += 1
+                if result.crit:
+                    totals.crits += 1
+            self._check_deaths(battle, result.targets)
+        elif kind in HEAL_KINDS or (kind == ITEM_RESTORE and result.skill.unit == "HP"):
+            for target, amount in zip(result.targets, result.amounts):
+                totals.values[HEALING] += amount
+                self._totals_of(target).values[RECEIVED] += amount
+            totals.values[OVERHEAL] += result.absorbed
+        if kind in SKILL_KINDS:
+            totals.values[MP_SPENT] += result.skill.mp_cost
+            totals.skill_uses[result.skill.name] += 1
+
+    def on_effects(self, battle, character, results: List[ActionResult]):
+        """Тики эффектов в начале хода (вызывается из Battle.apply_start_of_turn_effects)"""
+        totals = self._totals_of(character)
+        for result in results:
+            kind = result.kind
+            if kind == POISON_TICK:
+                totals.values[TAKEN] += result.amounts[0]
+                source = result.skill.source
+                if source is not None:
+                    self._totals_of(source).values[DEALT] += result.amounts[0]
+            elif kind == REGENERATION_TICK:
+                totals.values[RECEIVED] += result.amounts[0]
+                source = result.skill.source
+                healer = self._totals_of(source) if source is not None else totals
+                if source is not None:
+                    healer.values[HEALING] += result.amounts[0]
+                healer.values[OVERHEAL] += result.absorbed
+        self._check_deaths(battle, (character,))
+
+    def flush(self) -> BattleStats:
+        """Перенос сумм текущего боя в отчет; возвращает отчет"""
+        battle = self._battle
+        if battle is None:
+            return self.report
+        report = self.report
+        report.battles += 1
+        for char, totals in self._totals.items():
+            stats = report.character(char.name, char.__class__.__name__)
+            stats.battles += 1
+            for metric, value in zip(METRICS, totals.values):
+                stats.metrics[metric].add(value)
+            stats.attacks += totals.attacks
+            stats.crits += totals.crits
+            stats.skill_uses.update(totals.skill_uses)
+            if totals.death_round is not None:
+                stats.deaths += 1
+                stats.death_round.add(totals.death_round)
+        if battle.stats is self:
+            battle.stats = None
+        self._battle = None
+        self._totals = {}
+        return report
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Бенчмарки горячих путей боя
+
+    python benchmarks/bench_combat.py run [--output results.json] [--quick]
+    python benchmarks/bench_combat.py run --save-baseline
+    python benchmarks/bench_combat.py compare benchmarks/baseline.json results.json [--threshold 0.1]
+
+compare завершается с кодом 1, если хотя бы одна метрика ухудшилась
+больше чем на threshold относительно базовой линии.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Any, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from battle import Battle, BattleLogger, TurnOrder
+from characters import Warrior, Mage, Healer, Boss
+from effects import PoisonEffect, RegenerationEffect
+from skills import DamageSkill, EffectSkill
+from utils import create_default_party
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SCALING_SIZES = (3, 300, 3000)
+
+def measure(func: Callable[[], int], min_time: float = 0.2, repeat: int = 3) -> float:
+    """Лучшая из repeat оценок числа операций в секунду; func возвращает число выполненных операций"""
+    best = 0.0
+    for _ in range(repeat):
+        operations = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            operations += func()
+            elapsed = time.perf_counter() - start
+        best = max(best, operations / elapsed)
+    return best
+
+def metric(value: float, unit: str, higher_is_better: bool = True) -> Dict[str, Any]:
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+class CountingBattle(Battle):
+    """Бой, считающий выполненные ходы"""
+
+    turns = 0
+
+    def run_turn(self, character, logger):
+        CountingBattle.turns += 1
+        return super().run_turn(character, logger)
+
+def make_raid(size: int) -> List:
+    """Рейд из size участников: size - 1 персонажей пати и босс"""
+    classes = (Warrior, Mage, Healer)
+    return [classes[i % 3](f"Боец {i}", 1) for i in range(size - 1)]
+
+def bench_battles(min_time: float) -> Dict[str, Any]:
+    seeds = iter(range(10 ** 9))
+    logger = BattleLogger.headless()
+
+    def run():
+        battle = CountingBattle(create_default_party(), Boss("Босс", 3, "easy"), seed=next(seeds))
+        battle.run_battle(logger=logger, autosave=False)
+        return 1
+
+    CountingBattle.turns = 0
+    start = time.perf_counter()
+    battles_per_sec = measure(run, min_time, repeat=1)
+    turns_per_sec = CountingBattle.turns / (time.perf_counter() - start)
+    return {
+        'battle.battles_per_sec': metric(battles_per_sec, 'battles/s'),
+        'battle.turns_per_sec': metric(turns_per_sec, 'turns/s')
+    }
+
+def bench_vectorized(min_time: float, object_battles_per_sec: float, n: int = 50000) -> Dict[str, Any]:
+    """Векторизованный движок на том же бое, что bench_battles, и ускорение относительно него"""
+    import vectorized
+    if vectorized.np is None:  # numpy не установлен
+        return {}
+    seeds = iter(range(10 ** 9))
+
+    def run():
+        vectorized.simulate_vectorized(create_default_party, lambda: Boss("Босс", 3, "easy"), n, seed=next(seeds))
+        return n
+
+    battles_per_sec = measure(run, min_time)
+    return {
+        'vectorized.battles_per_sec': metric(battles_per_sec, 'battles/s'),
+        'vectorized.speedup': metric(battles_per_sec / object_battles_per_sec, 'x')
+    }
+
+def bench_turn_order(min_time: float) -> Dict[str, Any]:
+    results = {}
+    for size in SCALING_SIZES:
+        turn_order = TurnOrder(make_raid(size) + [Boss("Босс", 5)])
+
+        def one_round():
+            return sum(1 for _ in turn_order)
+
+        results[f'turn_order.next_per_sec[{size}]'] = metric(measure(one_round, min_time), 'turns/s')
+    return results
+
+def bench_scaling(min_time: float, turns: int = 200) -> Dict[str, Any]:
+    """Ходы в секунду в рейдах разного размера (первые turns ходов боя, без создания рейда)"""
+    results = {}
+    logger = BattleLogger.headless()
+    for size in SCALING_SIZES:
+        done = 0
+        elapsed = 0.0
+        while elapsed < min_time:
+            battle = Battle(make_raid(size), Boss("Босс", 5, "hard"), seed=done)
+            played = 0
+            start = time.perf_counter()
+            while played < turns and not battle.is_battle_over:
+                for character in battle.turn_order:
+                    played += 1
+                    if battle.run_turn(character, logger) or played >= turns:
+                        break
+            elapsed += time.perf_counter() - start
+            done += played
+        results[f'scaling.turns_per_sec[{size}]'] = metric(done / elapsed, 'turns/s')
+    return results
+
+def bench_effects(min_time: float, count: int = 50) -> Dict[str, Any]:
+    warrior = Warrior("Воин", 5)
+
+    def run():
+        warrior.effects.clear()
+        for i in range(count):
+            warrior.add_effect(PoisonEffect(1, 10 ** 6) if i % 2 else RegenerationEffect(1, 10 ** 6))
+        for _ in range(100):
+            warrior.apply_effects()
+        return 100
+
+    return {f'effects.apply_effects_per_sec[{count}]': metric(measure(run, min_time), 'calls/s')}
+
+def bench_skills(min_time: float) -> Dict[str, Any]:
+    caster = Mage("Маг", 5)
+    target = Boss("Босс", 5)
+    damage = DamageSkill("Огненный шар", 15, 20, "intelligence", 1.5)
+    effect = EffectSkill("Отравление", 20, "intelligence", 0.5, 3, effect_type="poison")
+
+    def use_damage():
+        for _ in range(1000):
+            target.hp = target.max_hp
+            damage.use(caster, [target])
+        return 1000
+
+    def use_effect():
+        target.effects.clear()
+        for _ in range(1000):
+            effect.use(caster, [target])
+        return 1000
+
+    return {
+        'skills.damage_use_per_sec': metric(measure(use_damage, min_time), 'uses/s'),
+        'skills.effect_use_per_sec': metric(measure(use_effect, min_time), 'uses/s')
+    }
+
+def bench_memory(count: int = 2000) -> Dict[str, Any]:
+    results = {}
+    for name, factory in (('warrior', lambda i: Warrior(f"Воин {i}", 5)),
+                          ('boss', lambda i: Boss(f"Босс {i}", 5))):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        instances = [factory(i) for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results[f'memory.bytes_per_{name}'] = metric((after - before) / len(instances), 'bytes', False)
+    return results
+
+def run_all(quick: bool = False) -> Dict[str, Any]:
+    min_time = 0.05 if quick else 0.3
+    results: Dict[str, Any] = {}
+    results.update(bench_battles(min_time))
+    results.update(bench_vectorized(min_time, results['battle.battles_per_sec']['value'],
+                                    10000 if quick else 50000))
+    results.update(bench_turn_order(min_time))
+    results.update(bench_scaling(min_time))
+    results.update(bench_effects(min_time))
+    results.update(bench_skills(min_time))
+    results.update(bench_memory(200 if quick else 2000))
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """Сравнение результатов с базовой линией; change > 0 - улучшение"""
+    rows = []
+    for name, base in baseline['results'].items():
+        new = current['results'].get(name)
+        if new is None or not base['value']:
+            continue
+        change = (new['value'] - base['value']) / base['value']
+        if not base['higher_is_better']:
+            change = -change
+        rows.append({'name': name, 'baseline': base['value'], 'current': new['value'],
+                     'unit': base['unit'], 'change': change, 'regression': change < -threshold})
+    return rows
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки боевой системы")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="запустить бенчмарки")
+    run_parser.add_argument('--output', help="файл для результатов JSON")
+    run_parser.add_argument('--save-baseline', action='store_true', help=f"записать в {BASELINE_PATH}")
+    run_parser.add_argument('--quick', action='store_true', help="короткие замеры")
+
+    compare_parser = commands.add_parser('compare', help="сравнить результаты с базовой линией")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help="допустимое ухудшение (доля, по умолчанию 0.1)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        report = run_all(args.quick)
+        for name, result in report['results'].items():
+            print(f"{name:45} {result['value']:>14.1f} {result['unit']}")
+        outputs = [args.output] if args.output else []
+        if args.save_baseline:
+            outputs.append(BASELINE_PATH)
+        for path in outputs:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        flag = "РЕГРЕССИЯ" if row['regression'] else ""
+        print(f"{row['name']:45} {row['baseline']:>14.1f} -> {row['current']:>14.1f} "
+              f"{row['unit']:10} {row['change']:+7.1%} {flag}")
+    return 1 if any(row['regression'] for row in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
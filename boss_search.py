@@ -0,0 +1,119 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+from battle import Battle
+from characters import Boss, BossStrategy
+from core import Character
+from skills import EffectSkill
+
+# Поисковый ИИ босса.
+# Перед ходом босса перебираются его варианты действий; каждый вариант
+# оценивается случайными доигрываниями (rollouts) на несколько раундов
+# вперед, выбор следующего доигрывания - по UCB1. Состояние боя между
+# доигрываниями откатывается Battle.capture/rewind, без deepcopy.
+
+Action = Tuple[Optional[int], List[Character]]
+
+class SearchStrategy(BossStrategy):
+    """Монте-Карло поиск действия босса (UCB1 по вариантам первого хода)
+
+    rollouts - бюджет доигрываний на ход, horizon - сколько раундов
+    доигрывать после текущего, exploration - константа UCB1. Внутри
+    доигрываний босс ходит по обычным стратегиям своих фаз, пати - по
+    политике Battle.decide.
+
+        SearchStrategy(rollouts=300).attach(battle)
+    """
+
+    def __init__(self, rollouts: int = 200, horizon: int = 2, exploration: float = 0.5):
+        self.rollouts = rollouts
+        self.horizon = horizon
+        self.exploration = exploration
+        self.battle: Optional[Battle] = None
+        self.fallback: Dict[str, BossStrategy] = {}
+        self.searching = False
+        self.last_stats: List[Tuple[Action, int, float]] = []   # вариант, доигрываний, средняя оценка
+
+    def attach(self, battle: Battle) -> 'SearchStrategy':
+        """Назначение стратегии боссу боя во всех фазах"""
+        self.battle = battle
+        boss = battle.boss
+        self.fallback = dict(boss.strategies)
+        boss.strategies = {phase: self for phase in boss.strategies}
+        boss.current_strategy = self
+        return self
+
+    def options(self, boss: Boss, targets: List[Character]) -> List[Action]:
+        """Все допустимые действия босса"""
+        alive = [t for t in targets if t.is_alive]
+        options: List[Action] = [(None, [target]) for target in alive]
+        if not boss.is_silenced:
+            for index in boss.ready_skills():
+                options.extend((index, [target]) for target in alive)
+                if isinstance(boss.skills[index], EffectSkill) and len(alive) > 1:
+                    options.append((index, alive))
+        return options
+
+    def evaluate(self, battle: Battle) -> float:
+        """Оценка позиции для босса в [0, 1]"""
+        boss = battle.boss
+        if not boss.is_alive:
+            return 0.0
+        party_hp = sum(char.hp for char in battle.party)
+        if not party_hp:
+            return 1.0
+        party_share = party_hp / sum(char.max_hp for char in battle.party)
+        return 0.5 + 0.5 * (boss.hp / boss.max_hp - party_share)
+
+    def _rollout(self, battle: Battle, boss: Boss, action: Action) -> float:
+        if not battle.finish_turn(boss, action[0], action[1], None):
+            # Остаток текущего раунда, затем horizon полных раундов
+            for character in battle.turn_order:
+                if battle.run_turn(character, None):
+                    break
+            if not battle.is_battle_over:
+                battle.round += 1
+                for _ in range(self.horizon):
+                    if battle.run_round(None):
+                        break
+        return self.evaluate(battle)
+
+    def decide(self, boss: Boss, targets: List[Character]) -> Action:
+        if self.searching or self.battle is None:
+            return self.fallback[boss.phase()].decide(boss, targets)
+
+        options = self.options(boss, targets)
+        if len(options) <= 1:
+            return options[0] if options else (None, [])
+
+        battle = self.battle
+        root = battle.capture()
+        # ГСЧ не откатывается между доигрываниями (иначе они одинаковы), но
+        # откатывается в конце: поиск не сдвигает поток случайных чисел боя
+        state = root[:-1] + (None,)
+        recorder, battle.recorder = battle.recorder, None
+        stats, battle.stats = battle.stats, None
+        visits = [0] * len(options)
+        totals = [0.0] * len(options)
+        self.searching = True
+        try:
+            for i in range(self.rollouts):
+                if i < len(options):
+                    choice = i
+                else:
+                    log_total = math.log(i)
+                    choice = max(range(len(options)), key=lambda k: totals[k] / visits[k]
+                                 + self.exploration * math.sqrt(log_total / visits[k]))
+                totals[choice] += self._rollout(battle, boss, options[choice])
+                visits[choice] += 1
+                battle.rewind(state)
+        finally:
+            self.searching = False
+            battle.rewind(root)
+            battle.recorder = recorder
+            battle.stats = stats
+
+        self.last_stats = [(option, visits[k], totals[k] / visits[k] if visits[k] else 0.0)
+                           for k, option in enumerate(options)]
+        best = max(range(len(options)), key=lambda k: (visits[k], totals[k]))
+        return options[best]
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Автоматическая калибровка сложности босса
+
+Для заданной пати подбирает множитель сложности Boss (при нескольких
+уровнях босса) так, чтобы доля побед пати была близка к цели. Каждый
+кандидат проверяется последовательными критериями Вальда (SPRT): симуляции
+идут пачками и останавливаются, как только ясно, что доля побед ниже,
+внутри или выше целевого коридора.
+
+    python calibration.py --party '[{"class": "warrior", "name": "A", "level": 5}]' --levels 4 5 6
+"""
+import argparse
+import json
+import math
+import os
+import random
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import List, Dict, Any, Optional, Sequence
+
+from characters import Boss
+from simulation import derive_seed, simulate
+from utils import create_party
+
+TOO_EASY = "too_easy"    # доля побед пати выше коридора - босс слишком слабый
+TOO_HARD = "too_hard"    # доля побед ниже коридора
+ON_TARGET = "on_target"
+
+class SPRT:
+    """Последовательный критерий отношения правдоподобия Вальда для доли побед
+
+    H0: p = p0 против H1: p = p1 (p0 < p1); alpha и beta - вероятности
+    ошибок первого и второго рода.
+    """
+
+    def __init__(self, p0: float, p1: float, alpha: float = 0.05, beta: float = 0.05):
+        p0 = min(max(p0, 1e-6), 1 - 1e-6)
+        p1 = min(max(p1, 1e-6), 1 - 1e-6)
+        self.win_step = math.log(p1 / p0)
+        self.loss_step = math.log((1 - p1) / (1 - p0))
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+        self.log_ratio = 0.0
+        self.accepted: Optional[int] = None   # 0 или 1 - принятая гипотеза
+
+    def update(self, wins: int, battles: int):
+        if self.accepted is not None:
+            return
+        self.log_ratio += wins * self.win_step + (battles - wins) * self.loss_step
+        if self.log_ratio >= self.upper:
+            self.accepted = 1
+        elif self.log_ratio <= self.lower:
+            self.accepted = 0
+
+class SequentialTest:
+    """Трехисходный последовательный тест: ниже коридора, в коридоре, выше коридора
+
+    Пара SPRT: (target - tolerance против target) и (target против target + tolerance).
+    """
+
+    def __init__(self, target: float, tolerance: float = 0.05, alpha: float = 0.05, beta: float = 0.05):
+        self.lower_test = SPRT(target - tolerance, target, alpha, beta)
+        self.upper_test = SPRT(target, target + tolerance, alpha, beta)
+        self.wins = 0
+        self.battles = 0
+
+    def update(self, wins: int, battles: int):
+        self.wins += wins
+        self.battles += battles
+        self.lower_test.update(wins, battles)
+        self.upper_test.update(wins, battles)
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.battles if self.battles else 0.0
+
+    def decision(self) -> Optional[str]:
+        """Вердикт, когда данных достаточно, иначе None"""
+        if self.lower_test.accepted == 0:
+            return TOO_HARD
+        if self.upper_test.accepted == 1:
+            return TOO_EASY
+        if self.lower_test.accepted == 1 and self.upper_test.accepted == 0:
+            return ON_TARGET
+        return None
+
+class CalibrationPoint:
+    """Результат проверки одного кандидата (уровень, множитель)"""
+
+    def __init__(self, level: int, multiplier: float, verdict: str, win_rate: float, battles: int):
+        self.level = level
+        self.multiplier = multiplier
+        self.verdict = verdict
+        self.win_rate = win_rate
+        self.battles = battles
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'level': self.level,
+            'multiplier': round(self.multiplier, 4),
+            'verdict': self.verdict,
+            'win_rate': self.win_rate,
+            'battles': self.battles
+        }
+
+    def __str__(self):
+        return (f"Уровень {self.level}, множитель {self.multiplier:.3f}: "
+                f"{self.win_rate:.1%} побед за {self.battles} боев ({self.verdict})")
+
+def max_multiplier(level: int) -> float:
+    """Наибольший множитель, при котором характеристики босса остаются в допустимых границах"""
+    return min((1000 - level * 50) / 500, (100 - level * 3) / 20,
+               (100 - level * 2) / 15, (100 - level * 2) / 18)
+
+@contextmanager
+def _shared_pool(workers: Optional[int], pool: Optional[Executor]):
+    """Один пул процессов на всю калибровку; None - бои в этом процессе"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if pool is not None or workers <= 1:
+        yield pool
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield pool
+
+def evaluate_candidate(party_config: List[dict], level: int, multiplier: float, target: float,
+                       tolerance: float = 0.05, batch: int = 200, max_battles: int = 5000,
+                       seed: int = 0, workers: Optional[int] = None,
+                       pool: Optional[Executor] = None) -> CalibrationPoint:
+    """Пачки симуляций для одного кандидата до решения SPRT или max_battles
+
+    Все пачки идут в одном пуле процессов (pool или созданный здесь).
+    """
+    test = SequentialTest(target, tolerance)
+    party_factory = partial(create_party, party_config)
+    boss_factory = partial(Boss, "Босс", level, multiplier)
+    verdict = None
+    with _shared_pool(workers, pool) as pool:
+        while verdict is None and test.battles < max_battles:
+            # Свой поток боев у каждой пачки каждого кандидата (пачки не пересекаются)
+            batch_seed = derive_seed(seed, 'calibration', level, multiplier, test.battles)
+            result = simulate(party_factory, boss_factory, batch, seed=batch_seed, workers=workers, pool=pool)
+            test.update(result.party_wins, result.battles)
+            verdict = test.decision()
+    if verdict is None:
+        # Лимит боев исчерпан: решаем по точечной оценке
+        if abs(test.win_rate - target) <= tolerance:
+            verdict = ON_TARGET
+        else:
+            verdict = TOO_EASY if test.win_rate > target else TOO_HARD
+    return CalibrationPoint(level, multiplier, verdict, test.win_rate, test.battles)
+
+def calibrate_level(party_config: List[dict], level: int, target: float = 0.5, tolerance: float = 0.05,
+                    low: float = 0.3, high: Optional[float] = None, resolution: float = 0.02,
+                    seed: int = 0, workers: Optional[int] = None, pool: Optional[Executor] = None,
+                    **test_options) -> List[CalibrationPoint]:
+    """Бисекция по множителю для одного уровня; доля побед убывает с ростом множителя
+
+    Возвращает все проверенные кандидаты в порядке проверки (лучший выбирает
+    best_point). ValueError - если у уровня нет допустимых множителей не ниже
+    low или ни один кандидат из [low, high] не попал в коридор.
+    """
+    limit = max_multiplier(level)
+    if limit < low:
+        raise ValueError(f"Для уровня {level} нет допустимых множителей не ниже {low}")
+    # Верхняя граница не выше допустимой и не ниже нижней
+    high = max(low, min(high if high is not None else limit, limit))
+    history: List[CalibrationPoint] = []
+    with _shared_pool(workers, pool) as pool:
+        while True:
+            multiplier = (low + high) / 2
+            point = evaluate_candidate(party_config, level, multiplier, target, tolerance,
+                                       seed=seed, workers=workers, pool=pool, **test_options)
+            history.append(point)
+            if point.verdict == ON_TARGET:
+                return history
+            if high - low < resolution:
+                raise ValueError(f"Для уровня {level} ни один множитель в [{low:.3f}, {high:.3f}] "
+                                 f"не дает долю побед {target:.0%} ± {tolerance:.0%}")
+            if point.verdict == TOO_EASY:
+                low = multiplier
+            else:
+                high = multiplier
+
+def best_point(history: Sequence[CalibrationPoint], target: float = 0.5) -> CalibrationPoint:
+    """Кандидат в коридоре с долей побед, ближайшей к цели"""
+    accepted = [point for point in history if point.verdict == ON_TARGET]
+    if not accepted:
+        raise ValueError("Ни один кандидат не попал в коридор")
+    return min(accepted, key=lambda point: abs(point.win_rate - target))
+
+def calibrate(party_config: List[dict], levels: Sequence[int] = (5,), target: float = 0.5,
+              seed: Optional[int] = None, workers: Optional[int] = None,
+              **options) -> List[CalibrationPoint]:
+    """Лучший кандидат для каждого уровня босса (один пул процессов на все уровни)"""
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    with _shared_pool(workers, None) as pool:
+        return [best_point(calibrate_level(party_config, level, target, seed=seed, workers=workers,
+                                           pool=pool, **options), target)
+                for level in levels]
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Калибровка сложности босса")
+    parser.add_argument('--party', required=True, help="JSON-конфигурация пати в формате utils.create_party")
+    parser.add_argument('--levels', type=int, nargs='+', default=[5])
+    parser.add_argument('--target', type=float, default=0.5, help="целевая доля побед пати")
+    parser.add_argument('--tolerance', type=float, default=0.05)
+    parser.add_argument('--batch', type=int, default=200)
+    parser.add_argument('--max-battles', type=int, default=5000)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    points = calibrate(json.loads(args.party), args.levels, args.target, seed=args.seed,
+                       tolerance=args.tolerance, batch=args.batch, max_battles=args.max_battles,
+                       workers=args.workers)
+    print(json.dumps([point.to_dict() for point in points], indent=2, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
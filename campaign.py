@@ -0,0 +1,134 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# derive_seed, battle_seed и SEED_MASK живут в simulation (там ими выводятся
+# сиды simulate) и реэкспортируются здесь
+from simulation import (SEED_MASK, BossFactory, PartyFactory, SimulationResult, StashFactory, _run_chunk,
+                        battle_seed, derive_seed)
+
+# Кампании симуляций, разбитые на шарды (узлы).
+# Сид боя выводится из сида кампании и номера боя хешем (simulation.derive_seed),
+# поэтому бой i кампании S получает один и тот же поток случайных чисел, на
+# каком бы узле и процессе он ни шел, а соседние кампании не пересекаются;
+# simulate с тем же сидом играет первые n боев кампании. Бои группируются в
+# блоки фиксированного размера; шард считает свою часть блоков и пишет
+# агрегат каждого блока в файл, а merge_shards складывает блоки строго по
+# порядку номеров. Порядок сложения не зависит от разбиения, поэтому итог
+# (включая средние и дисперсии battle_stats) совпадает бит в бит при любом
+# числе шардов и процессов.
+
+SHARD_FORMAT = "campaign-shard"
+SHARD_VERSION = 1
+
+class Campaign:
+    """Параметры кампании: сид, число боев и размер блока
+
+    Размер блока входит в параметры кампании: при другом размере блоков
+    совпадут отдельные бои, но не обязательно последние биты агрегатов.
+    """
+
+    def __init__(self, seed: int, battles: int, block_size: int = 1000):
+        if battles < 0 or block_size < 1:
+            raise ValueError("Число боев должно быть неотрицательным, размер блока - положительным")
+        self.seed = seed
+        self.battles = battles
+        self.block_size = block_size
+
+    @property
+    def blocks(self) -> int:
+        return -(-self.battles // self.block_size)
+
+    def block_battles(self, block: int) -> range:
+        """Номера боев блока"""
+        start = block * self.block_size
+        return range(start, min(start + self.block_size, self.battles))
+
+    def block_seeds(self, block: int) -> List[int]:
+        return [battle_seed(self.seed, index) for index in self.block_battles(block)]
+
+    def shard_blocks(self, shard: int, shards: int) -> range:
+        """Непрерывный диапазон блоков шарда shard из shards"""
+        if not 0 <= shard < shards:
+            raise ValueError(f"Неверный номер шарда: {shard} из {shards}")
+        return range(self.blocks * shard // shards, self.blocks * (shard + 1) // shards)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'seed': self.seed, 'battles': self.battles, 'block_size': self.block_size}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Campaign':
+        return cls(data['seed'], data['battles'], data['block_size'])
+
+def run_blocks(campaign: Campaign, blocks: Iterable[int], party_factory: PartyFactory, boss_factory: BossFactory,
+               workers: int = 1, stash_factory: Optional[StashFactory] = None,
+               stats: bool = False) -> Dict[int, SimulationResult]:
+    """Агрегаты блоков кампании (блок -> результат); workers > 1 - пул процессов"""
+    blocks = list(blocks)
+    if workers <= 1 or len(blocks) < 2:
+        return {block: _run_chunk(party_factory, boss_factory, campaign.block_seeds(block),
+                                  stash_factory=stash_factory, stats=stats)
+                for block in blocks}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {block: pool.submit(_run_chunk, party_factory, boss_factory, campaign.block_seeds(block),
+                                      stash_factory=stash_factory, stats=stats)
+                   for block in blocks}
+        return {block: future.result() for block, future in futures.items()}
+
+def run_shard(campaign: Campaign, shard: int, shards: int, filename: str,
+              party_factory: PartyFactory, boss_factory: BossFactory, workers: int = 1,
+              stash_factory: Optional[StashFactory] = None, stats: bool = False) -> Dict[int, SimulationResult]:
+    """Расчет шарда и запись его блоков в файл (атомарно: временный файл + os.replace)"""
+    results = run_blocks(campaign, campaign.shard_blocks(shard, shards), party_factory, boss_factory,
+                         workers, stash_factory, stats)
+    data = {
+        'format': SHARD_FORMAT,
+        'version': SHARD_VERSION,
+        'campaign': campaign.to_dict(),
+        'shard': shard,
+        'shards': shards,
+        'blocks': {str(block): result.to_dict() for block, result in results.items()},
+    }
+    temp_name = f"{filename}.tmp"
+    with open(temp_name, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_name, filename)
+    return results
+
+def load_shard(filename: str) -> Dict[str, Any]:
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('format') != SHARD_FORMAT or data.get('version') != SHARD_VERSION:
+        raise ValueError(f"{filename}: не файл шарда кампании")
+    return data
+
+def merge_blocks(campaign: Campaign, blocks: Dict[int, SimulationResult]) -> SimulationResult:
+    """Сложение агрегатов блоков по порядку номеров; все блоки кампании обязательны"""
+    missing = [block for block in range(campaign.blocks) if block not in blocks]
+    if missing:
+        raise ValueError(f"Нет результатов блоков: {missing}")
+    result = SimulationResult()
+    for block in range(campaign.blocks):
+        result.merge(blocks[block])
+    return result
+
+def merge_shards(filenames: Sequence[str]) -> SimulationResult:
+    """Итог кампании по файлам шардов (в любом порядке)"""
+    campaign: Optional[Campaign] = None
+    blocks: Dict[int, SimulationResult] = {}
+    for filename in filenames:
+        data = load_shard(filename)
+        shard_campaign = Campaign.from_dict(data['campaign'])
+        if campaign is None:
+            campaign = shard_campaign
+        elif shard_campaign.to_dict() != campaign.to_dict():
+            raise ValueError(f"{filename}: шард другой кампании")
+        for block, result in data['blocks'].items():
+            block = int(block)
+            if block in blocks:
+                raise ValueError(f"{filename}: блок {block} уже есть в другом шарде")
+            blocks[block] = SimulationResult.from_dict(result)
+    if campaign is None:
+        raise ValueError("Нет файлов шардов")
+    return merge_blocks(campaign, blocks)
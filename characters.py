@@ -1,79 +1,83 @@
 from abc import ABC, abstractmethod
-import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Union
 
 # Сначала импортируем все необходимые классы
 from core import Character, Human
-from skills import Skill, DamageSkill, HealSkill, EffectSkill
+from results import ActionFailure, ActionResult, ATTACK, MAGIC_ATTACK
+from skills import AOE, DEBUFF, Skill, default_catalog
+from targeting import alive_count, alive_targets, lowest_hp, random_alive
 from effects import PoisonEffect, ShieldEffect, SilenceEffect, RegenerationEffect
 
 class CritMixin:
     """Миксин для критического урона"""
+    __slots__ = ()
     
     def calculate_crit(self, base_damage: int, crit_chance: float = 0.1) -> tuple[int, bool]:
         """Расчет критического урона"""
-        is_crit = random.random() < crit_chance
+        is_crit = self.rng.random() < crit_chance
         if is_crit:
             return int(base_damage * 1.5), True
         return base_damage, False
 
 # Стратегии поведения босса должны быть объявлены ДО класса Boss
 class BossStrategy(ABC):
-    """Абстрактный класс стратегии босса"""
+    """Абстрактный класс стратегии босса
+    
+    decide только выбирает действие: (индекс навыка или None для базовой
+    атаки, цели); выполнение - Character.perform. Бой и запись повторов
+    пользуются этим разделением.
+    """
     
     @abstractmethod
-    def choose_action(self, boss: 'Boss', targets: List[Character]) -> str:
+    def decide(self, boss: 'Boss', targets: List[Character]) -> Tuple[Optional[int], List[Character]]:
         pass
+    
+    def choose_action(self, boss: 'Boss', targets: List[Character]) -> str:
+        return str(boss.perform(*self.decide(boss, targets)))
 
 class AggressiveStrategy(BossStrategy):
     """Агрессивная стратегия - атака самого слабого"""
     
-    def choose_action(self, boss: 'Boss', targets: List[Character]) -> str:
-        alive_targets = [t for t in targets if t.is_alive]
-        if not alive_targets:
-            return "Нет целей для атаки"
-        
+    def decide(self, boss: 'Boss', targets: List[Character]) -> Tuple[Optional[int], List[Character]]:
         # Атакуем цель с наименьшим HP
-        target = min(alive_targets, key=lambda x: x.hp)
-        return boss.basic_attack(target)
+        target = lowest_hp(targets)
+        if target is None:
+            return None, []
+        return None, [target]
 
 class AOEStrategy(BossStrategy):
     """Стратегия массовой атаки"""
     
-    def choose_action(self, boss: 'Boss', targets: List[Character]) -> str:
-        alive_targets = [t for t in targets if t.is_alive]
-        if not alive_targets:
-            return "Нет целей для атаки"
+    def decide(self, boss: 'Boss', targets: List[Character]) -> Tuple[Optional[int], List[Character]]:
+        if not alive_count(targets):
+            return None, []
         
         # Используем AOE навык если доступен
-        aoe_skill = next((s for s in boss.skills if "массовая" in s.name.lower()), None)
-        if aoe_skill and aoe_skill.name not in boss.cooldowns and boss.mp >= aoe_skill.mp_cost:
-            return boss.use_skill(boss.skills.index(aoe_skill), alive_targets)
+        aoe_skill = boss.usable_skill(AOE)
+        if aoe_skill is not None:
+            return aoe_skill, alive_targets(targets)
         
         # Иначе атакуем случайную цель
-        target = random.choice(alive_targets)
-        return boss.basic_attack(target)
+        return None, [random_alive(targets, boss.rng)]
 
 class DebuffStrategy(BossStrategy):
     """Стратегия наложения дебаффов"""
     
-    def choose_action(self, boss: 'Boss', targets: List[Character]) -> str:
-        alive_targets = [t for t in targets if t.is_alive]
-        if not alive_targets:
-            return "Нет целей для атаки"
-        
-        # Ищем навык с эффектом
-        debuff_skill = next((s for s in boss.skills if hasattr(s, 'effect_type')), None)
-        if debuff_skill and debuff_skill.name not in boss.cooldowns and boss.mp >= debuff_skill.mp_cost:
-            target = random.choice(alive_targets)
-            return boss.use_skill(boss.skills.index(debuff_skill), [target])
-        
-        target = random.choice(alive_targets)
-        return boss.basic_attack(target)
+    def decide(self, boss: 'Boss', targets: List[Character]) -> Tuple[Optional[int], List[Character]]:
+        if not alive_count(targets):
+            return None, []
+        
+        # Ищем навык-дебафф
+        debuff_skill = boss.usable_skill(DEBUFF)
+        if debuff_skill is not None:
+            return debuff_skill, [random_alive(targets, boss.rng)]
+        
+        return None, [random_alive(targets, boss.rng)]
 
 # Теперь объявляем классы персонажей
 class Warrior(Character, CritMixin):
     """Класс воина"""
+    __slots__ = ()
     
     def __init__(self, name: str, level: int = 1):
         super().__init__(name, level)
@@ -85,40 +89,38 @@ class Warrior(Character, CritMixin):
         self.agility = 8 + level
         self.intelligence = 5 + level
         
-        # Навыки воина
-        self.skills = [
-    DamageSkill("Удар мечом", 10, 5, "strength", 1.2, cooldown=0),
-    DamageSkill("Мощный удар", 20, 15, "strength", 2.0, cooldown=2),
-    EffectSkill("Боевой клич", 15, "strength", 1.5, 3, effect_type="shield", cooldown=3)  # Изменено с "buff" на "shield"
-]
+        # Навыки воина - общие объекты из каталога data/skills.json
+        self.skills = default_catalog().loadout("warrior")
     
-    def basic_attack(self, target: Character) -> str:
-        damage = self.strength + random.randint(1, 5)
+    def basic_attack(self, target: Character) -> ActionResult:
+        damage = self.strength + self.rng.randint(1, 5)
         damage, is_crit = self.calculate_crit(damage, 0.15)
-        target.hp -= damage
-        crit_text = " КРИТИЧЕСКИЙ УРОН!" if is_crit else ""
-        return f"{self.name} атакует {target.name} на {damage} урона{crit_text}"
+        dealt = target.take_damage(damage)
+        return ActionResult(ATTACK, self, (target,), (dealt,), damage - dealt, is_crit)
     
-    def use_skill(self, skill_index: int, targets: List[Character]) -> str:
+    def use_skill(self, skill_index: int, targets: List[Character]) -> ActionResult:
         if skill_index >= len(self.skills):
-            return "Неверный навык"
+            return ActionFailure(self, "Неверный навык")
         
         skill = self.skills[skill_index]
         
-        if skill.name in self.cooldowns:
-            return f"Навык {skill.name} на перезарядке"
+        if self.is_silenced:
+            return ActionFailure(self, f"{self.name} под немотой и не может использовать навыки")
+        
+        if not self.is_ready(skill):
+            return ActionFailure(self, f"Навык {skill.name} на перезарядке")
         
         if self.mp < skill.mp_cost:
-            return "Недостаточно MP"
+            return ActionFailure(self, "Недостаточно MP")
         
         self.mp -= skill.mp_cost
-        if skill.cooldown > 0:
-            self.cooldowns[skill.name] = skill.cooldown
+        self.start_cooldown(skill)
         
         return skill.use(self, targets)
 
 class Mage(Character):
     """Класс мага"""
+    __slots__ = ()
     
     def __init__(self, name: str, level: int = 1):
         super().__init__(name, level)
@@ -130,37 +132,36 @@ class Mage(Character):
         self.agility = 8 + level
         self.intelligence = 18 + level * 2
         
-        self.skills = [
-    DamageSkill("Огненный шар", 15, 20, "intelligence", 1.5, cooldown=0),
-    DamageSkill("Ледяная стрела", 12, 15, "intelligence", 1.3, cooldown=1),
-    EffectSkill("Отравление", 20, "intelligence", 0.5, 3, effect_type="poison", cooldown=3)  # Уже правильно
-]
+        self.skills = default_catalog().loadout("mage")
     
-    def basic_attack(self, target: Character) -> str:
-        damage = self.intelligence // 2 + random.randint(1, 3)
-        target.hp -= damage
-        return f"{self.name} атакует {target.name} магией на {damage} урона"
+    def basic_attack(self, target: Character) -> ActionResult:
+        damage = self.intelligence // 2 + self.rng.randint(1, 3)
+        dealt = target.take_damage(damage)
+        return ActionResult(MAGIC_ATTACK, self, (target,), (dealt,), damage - dealt)
     
-    def use_skill(self, skill_index: int, targets: List[Character]) -> str:
+    def use_skill(self, skill_index: int, targets: List[Character]) -> ActionResult:
         if skill_index >= len(self.skills):
-            return "Неверный навык"
+            return ActionFailure(self, "Неверный навык")
         
         skill = self.skills[skill_index]
         
-        if skill.name in self.cooldowns:
-            return f"Навык {skill.name} на перезарядке"
+        if self.is_silenced:
+            return ActionFailure(self, f"{self.name} под немотой и не может использовать навыки")
+        
+        if not self.is_ready(skill):
+            return ActionFailure(self, f"Навык {skill.name} на перезарядке")
         
         if self.mp < skill.mp_cost:
-            return "Недостаточно MP"
+            return ActionFailure(self, "Недостаточно MP")
         
         self.mp -= skill.mp_cost
-        if skill.cooldown > 0:
-            self.cooldowns[skill.name] = skill.cooldown
+        self.start_cooldown(skill)
         
         return skill.use(self, targets)
 
 class Healer(Character):
     """Класс лекаря"""
+    __slots__ = ()
     
     def __init__(self, name: str, level: int = 1):
         super().__init__(name, level)
@@ -172,43 +173,45 @@ class Healer(Character):
         self.agility = 10 + level
         self.intelligence = 14 + level * 2
         
-        self.skills = [
-    HealSkill("Лечение", 10, 15, "intelligence", 1.2, cooldown=0),
-    HealSkill("Массовое лечение", 25, 30, "intelligence", 0.8, cooldown=3),
-    EffectSkill("Щит", 15, "intelligence", 0.5, 2, effect_type="shield", cooldown=2)  # Уже правильно
-]
+        self.skills = default_catalog().loadout("healer")
     
-    def basic_attack(self, target: Character) -> str:
-        damage = self.strength + random.randint(1, 3)
-        target.hp -= damage
-        return f"{self.name} атакует {target.name} на {damage} урона"
+    def basic_attack(self, target: Character) -> ActionResult:
+        damage = self.strength + self.rng.randint(1, 3)
+        dealt = target.take_damage(damage)
+        return ActionResult(ATTACK, self, (target,), (dealt,), damage - dealt)
     
-    def use_skill(self, skill_index: int, targets: List[Character]) -> str:
+    def use_skill(self, skill_index: int, targets: List[Character]) -> ActionResult:
         if skill_index >= len(self.skills):
-            return "Неверный навык"
+            return ActionFailure(self, "Неверный навык")
         
         skill = self.skills[skill_index]
         
-        if skill.name in self.cooldowns:
-            return f"Навык {skill.name} на перезарядке"
+        if self.is_silenced:
+            return ActionFailure(self, f"{self.name} под немотой и не может использовать навыки")
+        
+        if not self.is_ready(skill):
+            return ActionFailure(self, f"Навык {skill.name} на перезарядке")
         
         if self.mp < skill.mp_cost:
-            return "Недостаточно MP"
+            return ActionFailure(self, "Недостаточно MP")
         
         self.mp -= skill.mp_cost
-        if skill.cooldown > 0:
-            self.cooldowns[skill.name] = skill.cooldown
+        self.start_cooldown(skill)
         
         return skill.use(self, targets)
 
 class Boss(Character, CritMixin):
     """Класс босса с меняющимися фазами"""
+    __slots__ = ('difficulty', 'strategies', 'current_strategy')
+    
+    DIFFICULTY_MULTIPLIERS = {"easy": 0.8, "normal": 1.0, "hard": 1.3}
     
-    def __init__(self, name: str, level: int = 1, difficulty: str = "normal"):
+    def __init__(self, name: str, level: int = 1, difficulty: Union[str, float] = "normal"):
         super().__init__(name, level)
+        self.difficulty = difficulty
         
-        # Настройки сложности
-        difficulty_multiplier = {"easy": 0.8, "normal": 1.0, "hard": 1.3}[difficulty]
+        # Настройки сложности: имя из таблицы или явный множитель (для калибровки)
+        difficulty_multiplier = self.difficulty_multiplier(difficulty)
         
         self.max_hp = int(500 * difficulty_multiplier) + level * 50
         self.hp = self.max_hp
@@ -218,11 +221,7 @@ class Boss(Character, CritMixin):
         self.agility = int(15 * difficulty_multiplier) + level * 2
         self.intelligence = int(18 * difficulty_multiplier) + level * 2
         
-        self.skills = [
-    DamageSkill("Темный удар", 20, 25, "strength", 1.5, cooldown=1),
-    DamageSkill("Массовая тьма", 40, 50, "intelligence", 1.0, cooldown=4),
-    EffectSkill("Оковы тьмы", 30, "intelligence", 0.3, 2, effect_type="silence", cooldown=3)  # Уже правильно
-]
+        self.skills = default_catalog().loadout("boss")
         
         # Стратегии для разных фаз
         self.strategies = {
@@ -232,43 +231,85 @@ class Boss(Character, CritMixin):
         }
         self.current_strategy = self.strategies["phase1"]
     
-    def basic_attack(self, target: Character) -> str:
-        damage = self.strength + random.randint(5, 10)
+    def basic_attack(self, target: Character) -> ActionResult:
+        damage = self.strength + self.rng.randint(5, 10)
         damage, is_crit = self.calculate_crit(damage, 0.2)
-        target.hp -= damage
-        crit_text = " КРИТИЧЕСКИЙ УРОН!" if is_crit else ""
-        return f"{self.name} атакует {target.name} на {damage} урона{crit_text}"
+        dealt = target.take_damage(damage)
+        return ActionResult(ATTACK, self, (target,), (dealt,), damage - dealt, is_crit)
     
-    def use_skill(self, skill_index: int, targets: List[Character]) -> str:
+    def use_skill(self, skill_index: int, targets: List[Character]) -> ActionResult:
         if skill_index >= len(self.skills):
-            return "Неверный навык"
+            return ActionFailure(self, "Неверный навык")
         
         skill = self.skills[skill_index]
         
-        if skill.name in self.cooldowns:
-            return f"Навык {skill.name} на перезарядке"
+        if self.is_silenced:
+            return ActionFailure(self, f"{self.name} под немотой и не может использовать навыки")
+        
+        if not self.is_ready(skill):
+            return ActionFailure(self, f"Навык {skill.name} на перезарядке")
         
         if self.mp < skill.mp_cost:
-            return "Недостаточно MP"
+            return ActionFailure(self, "Недостаточно MP")
         
         self.mp -= skill.mp_cost
-        if skill.cooldown > 0:
-            self.cooldowns[skill.name] = skill.cooldown
+        self.start_cooldown(skill)
         
         return skill.use(self, targets)
     
-    def update_strategy(self):
-        """Обновление стратегии в зависимости от HP"""
+    @classmethod
+    def difficulty_multiplier(cls, difficulty: Union[str, float]) -> float:
+        if difficulty in cls.DIFFICULTY_MULTIPLIERS:
+            return cls.DIFFICULTY_MULTIPLIERS[difficulty]
+        try:
+            return float(difficulty)
+        except (TypeError, ValueError):
+            raise KeyError(difficulty) from None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data['difficulty'] = self.difficulty
+        data['strategy'] = next(phase for phase, strategy in self.strategies.items()
+                                if strategy is self.current_strategy)
+        return data
+    
+    def capture(self) -> tuple:
+        return super().capture() + (self.current_strategy,)
+    
+    def rewind(self, state: tuple):
+        super().rewind(state)
+        self.current_strategy = state[5]
+    
+    @classmethod
+    def _init_kwargs(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = super()._init_kwargs(data)
+        kwargs['difficulty'] = data.get('difficulty', "normal")
+        return kwargs
+    
+    def restore_state(self, data: Dict[str, Any]):
+        super().restore_state(data)
+        self.current_strategy = self.strategies[data.get('strategy', "phase1")]
+    
+    def phase(self) -> str:
+        """Фаза боя по доле HP: phase1 (100-70%), phase2 (70-30%), phase3 (30-0%)"""
         hp_percent = self.hp / self.max_hp
         
         if hp_percent > 0.7:
-            self.current_strategy = self.strategies["phase1"]
+            return "phase1"
         elif hp_percent > 0.3:
-            self.current_strategy = self.strategies["phase2"]
+            return "phase2"
         else:
-            self.current_strategy = self.strategies["phase3"]
+            return "phase3"
     
-    def choose_action(self, targets: List[Character]) -> str:
-        """Выбор действия на основе текущей стратегии"""
+    def update_strategy(self):
+        """Обновление стратегии в зависимости от HP"""
+        self.current_strategy = self.strategies[self.phase()]
+    
+    def decide(self, targets: List[Character]) -> Tuple[Optional[int], List[Character]]:
+        """Выбор действия (навык или None, цели) на основе текущей стратегии"""
         self.update_strategy()
-        return self.current_strategy.choose_action(self, targets)
\ No newline at end of file
+        return self.current_strategy.decide(self, targets)
+    
+    def choose_action(self, targets: List[Character]) -> str:
+        """Выбор и выполнение действия на основе текущей стратегии; возвращает текст действия"""
+        return str(self.perform(*self.decide(targets)))
\ No newline at end of file
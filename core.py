@@ -1,87 +1,151 @@
 from abc import ABC, abstractmethod
 import json
-from typing import Dict, List, Optional, Any
+import random
+from functools import lru_cache
+from operator import attrgetter
+from effects import EffectSet, ShieldEffect, SilenceEffect, effect_from_dict
+from results import ActionFailure, ActionResult
+from typing import Dict, List, Optional, Any, Protocol, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+class RandomSource(Protocol):
+    """Протокол генератора случайных чисел (random.Random или модуль random)"""
+    
+    def random(self) -> float: ...
+    
+    def randint(self, a: int, b: int) -> int: ...
+    
+    def uniform(self, a: float, b: float) -> float: ...
+    
+    def choice(self, seq: Sequence[T]) -> T: ...
+    
+    def randrange(self, stop: int) -> int: ...
 
 class BoundedStat:
-    """Дескриптор для валидации характеристик"""
-    def __init__(self, min_val: int = 0, max_val: int = 100):
-        self.min_val = min_val
-        self.max_val = max_val
+    """Допустимый диапазон характеристики
     
-    def __set_name__(self, owner, name):
-        self.name = name
+    Human хранит значения в __slots__ и вызывает check только при записи,
+    чтение идет прямо из слота без промежуточных дескрипторов.
+    """
+    __slots__ = ('name', 'min_val', 'max_val')
     
-    def __get__(self, instance, owner):
-        return instance.__dict__.get(self.name, self.min_val)
+    def __init__(self, min_val: int = 0, max_val: int = 100, name: str = "value"):
+        self.name = name
+        self.min_val = min_val
+        self.max_val = max_val
     
-    def __set__(self, instance, value):
+    def check(self, value):
         if not (self.min_val <= value <= self.max_val):
             raise ValueError(f"{self.name} must be between {self.min_val} and {self.max_val}")
-        instance.__dict__[self.name] = value
+        return value
+
+HP_RANGE = BoundedStat(0, 1000, "_hp")
+MP_RANGE = BoundedStat(0, 500, "_mp")
+STRENGTH_RANGE = BoundedStat(1, 100, "_strength")
+AGILITY_RANGE = BoundedStat(1, 100, "_agility")
+INTELLIGENCE_RANGE = BoundedStat(1, 100, "_intelligence")
 
 class Human:
     """Базовый класс для всех персонажей"""
-    _hp = BoundedStat(0, 1000)
-    _mp = BoundedStat(0, 500)
-    _strength = BoundedStat(1, 100)
-    _agility = BoundedStat(1, 100)
-    _intelligence = BoundedStat(1, 100)
+    __slots__ = ('name', 'level', '_hp', '_mp', '_strength', '_agility', '_intelligence',
+                 'max_hp', 'max_mp', 'effects', 'rng', '_watchers', '__weakref__')
     
     def __init__(self, name: str, level: int = 1):
         self.name = name
         self.level = level
+        self.max_hp = 100
+        self.max_mp = 50
         self._hp = 100
         self._mp = 50
         self._strength = 10
         self._agility = 10
         self._intelligence = 10
-        self.max_hp = 100
-        self.max_mp = 50
-        self.effects: List['Effect'] = []
+        self.effects = EffectSet()
+        # Генератор случайных чисел; Battle подменяет его своим экземпляром
+        self.rng: RandomSource = random
+        # Наблюдатели за изменением характеристик (например, TurnOrder)
+        self._watchers: List[Any] = []
     
-    @property
-    def hp(self) -> int:
-        return self._hp
+    # Геттеры - attrgetter (C-функция), сеттеры обрезают и проверяют диапазон
+    hp = property(attrgetter('_hp'))
     
     @hp.setter
     def hp(self, value: int):
-        self._hp = max(0, min(value, self.max_hp))
+        max_hp = self.max_hp
+        if value > max_hp:
+            value = max_hp
+        elif value < 0:
+            value = 0
+        if value > 1000:
+            HP_RANGE.check(value)
+        if value != self._hp:
+            self._hp = value
+            # Индексы целей (targeting.TargetIndex) следят за HP
+            for watcher in self._watchers:
+                watcher.on_stat_changed(self, 'hp')
     
-    @property
-    def mp(self) -> int:
-        return self._mp
+    mp = property(attrgetter('_mp'))
     
     @mp.setter
     def mp(self, value: int):
-        self._mp = max(0, min(value, self.max_mp))
+        max_mp = self.max_mp
+        if value > max_mp:
+            value = max_mp
+        elif value < 0:
+            value = 0
+        if value > 500:
+            MP_RANGE.check(value)
+        self._mp = value
     
-    @property
-    def strength(self) -> int:
-        return self._strength
+    strength = property(attrgetter('_strength'))
     
     @strength.setter
     def strength(self, value: int):
-        self._strength = value
+        self._strength = STRENGTH_RANGE.check(value)
     
-    @property
-    def agility(self) -> int:
-        return self._agility
+    agility = property(attrgetter('_agility'))
     
     @agility.setter
     def agility(self, value: int):
-        self._agility = value
+        self._agility = AGILITY_RANGE.check(value)
+        for watcher in self._watchers:
+            watcher.on_stat_changed(self, 'agility')
     
-    @property
-    def intelligence(self) -> int:
-        return self._intelligence
+    intelligence = property(attrgetter('_intelligence'))
     
     @intelligence.setter
     def intelligence(self, value: int):
-        self._intelligence = value
+        self._intelligence = INTELLIGENCE_RANGE.check(value)
+    
+    def add_watcher(self, watcher: Any):
+        """Подписка на изменения характеристик: watcher.on_stat_changed(character, stat)"""
+        if watcher not in self._watchers:
+            self._watchers.append(watcher)
+    
+    def remove_watcher(self, watcher: Any):
+        if watcher in self._watchers:
+            self._watchers.remove(watcher)
     
     @property
     def is_alive(self) -> bool:
-        return self.hp > 0
+        return self._hp > 0
+    
+    def take_damage(self, damage: int) -> int:
+        """Единая точка получения урона: щиты поглощают его по очереди наложения
+        
+        Возвращает урон, прошедший через щиты.
+        """
+        effects = self.effects
+        shield = effects.first(ShieldEffect)
+        while shield is not None and damage > 0:
+            damage = shield.absorb_damage(damage)
+            if shield.duration <= 0:
+                effects.remove(shield)
+            shield = effects.first(ShieldEffect)
+        if damage > 0:
+            self.hp = self._hp - damage
+        return damage
     
     def __str__(self) -> str:
         return f"{self.name} (Lvl {self.level}) - HP: {self.hp}/{self.max_hp}, MP: {self.mp}/{self.max_mp}"
@@ -107,41 +171,179 @@ class Human:
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Human':
-        """Десериализация из словаря"""
-        # Этот метод будет переопределен в дочерних классах
-        raise NotImplementedError
+        """Десериализация из словаря
+        
+        Класс выбирается по data['class_name'] среди наследников cls, поэтому
+        Human.from_dict восстанавливает и Warrior, и Boss.
+        """
+        target_cls = cls._find_subclass(data.get('class_name', cls.__name__))
+        instance = target_cls(**target_cls._init_kwargs(data))
+        instance.restore_state(data)
+        return instance
+    
+    @classmethod
+    def _find_subclass(cls, class_name: str) -> type:
+        if cls.__name__ == class_name:
+            return cls
+        for subclass in cls.__subclasses__():
+            try:
+                return subclass._find_subclass(class_name)
+            except ValueError:
+                continue
+        raise ValueError(f"Неизвестный класс персонажа: {class_name}")
+    
+    @classmethod
+    def _init_kwargs(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Аргументы конструктора при десериализации"""
+        return {'name': data['name'], 'level': data.get('level', 1)}
+    
+    def restore_state(self, data: Dict[str, Any]):
+        """Восстановление изменяемого состояния из словаря to_dict"""
+        # Максимумы раньше текущих значений: сеттеры hp/mp обрезают по ним
+        self.max_hp = data['max_hp']
+        self.max_mp = data['max_mp']
+        self.hp = data['hp']
+        self.mp = data['mp']
+        self.strength = data['strength']
+        self.agility = data['agility']
+        self.intelligence = data['intelligence']
+        self.effects = EffectSet(effect_from_dict(effect) for effect in data.get('effects', []))
+    
+    def capture(self) -> tuple:
+        """Быстрый снимок изменяемого в бою состояния для rewind (без to_dict и deepcopy)
+        
+        Эффекты запоминаются вместе со своими изменяемыми полями, потому что
+        при откате восстанавливаются те же объекты.
+        """
+        return (self._hp, self._mp,
+                [(effect, effect.duration, getattr(effect, 'remaining_shield', None)) for effect in self.effects])
+    
+    def rewind(self, state: tuple):
+        """Возврат к снимку capture"""
+        self._hp, self._mp, effects = state[:3]
+        for effect, duration, remaining_shield in effects:
+            effect.duration = duration
+            if remaining_shield is not None:
+                effect.remaining_shield = remaining_shield
+        self.effects = EffectSet(effect for effect, _, _ in effects)
 
 class Character(Human, ABC):
     """Абстрактный класс для игровых персонажей"""
+    __slots__ = ('_skills', 'skill_tags', 'turn', 'ready_at')
     
     def __init__(self, name: str, level: int = 1):
         super().__init__(name, level)
-        self.skills: List['Skill'] = []
-        self.cooldowns: Dict[str, int] = {}
+        self.skills = ()
+        # Кулдауны отсчитываются собственными ходами персонажа: turn - номер
+        # текущего хода, ready_at[навык] - ход, с которого навык снова доступен
+        self.turn = 0
+        self.ready_at: Dict['Skill', int] = {}
+    
+    skills = property(attrgetter('_skills'))
+    
+    @skills.setter
+    def skills(self, value: Sequence['Skill']):
+        self._skills = value
+        # Тег -> индексы навыков; общий для всех персонажей с тем же набором
+        self.skill_tags = skill_tag_index(tuple(value))
     
     @abstractmethod
-    def basic_attack(self, target: 'Character') -> str:
+    def basic_attack(self, target: 'Character') -> ActionResult:
         pass
     
     @abstractmethod
-    def use_skill(self, skill_index: int, targets: List['Character']) -> str:
+    def use_skill(self, skill_index: int, targets: List['Character']) -> ActionResult:
         pass
     
+    def perform(self, skill_index: Optional[int], targets: List['Character']) -> ActionResult:
+        """Выполнение выбранного действия: навык skill_index или базовая атака (None)"""
+        if not targets:
+            return ActionFailure(self, "Нет целей для атаки")
+        if skill_index is None:
+            return self.basic_attack(targets[0])
+        return self.use_skill(skill_index, targets)
+    
     def update_cooldowns(self):
-        """Обновление кулдаунов навыков"""
-        for skill_name in list(self.cooldowns.keys()):
-            self.cooldowns[skill_name] -= 1
-            if self.cooldowns[skill_name] <= 0:
-                del self.cooldowns[skill_name]
+        """Начало нового хода: кулдауны истекают сами, сравнением с номером хода"""
+        self.turn += 1
+    
+    def start_cooldown(self, skill: 'Skill'):
+        if skill.cooldown > 0:
+            self.ready_at[skill] = self.turn + skill.cooldown
+    
+    def is_ready(self, skill: 'Skill') -> bool:
+        return self.ready_at.get(skill, 0) <= self.turn
+    
+    def ready_skills(self) -> List[int]:
+        """Индексы навыков, доступных сейчас (кулдаун прошел и хватает MP)"""
+        turn = self.turn
+        mp = self._mp
+        ready_at = self.ready_at
+        return [i for i, skill in enumerate(self.skills)
+                if ready_at.get(skill, 0) <= turn and mp >= skill.mp_cost]
     
-    def apply_effects(self):
+    def skill_with_tag(self, tag: str) -> Optional[int]:
+        """Индекс первого навыка с тегом (или None)"""
+        indices = self.skill_tags.get(tag)
+        return indices[0] if indices else None
+    
+    def usable_skill(self, tag: str) -> Optional[int]:
+        """Индекс первого навыка с тегом, применимого сейчас (без немоты, готов, хватает MP)"""
+        indices = self.skill_tags.get(tag)
+        if not indices or self.is_silenced:
+            return None
+        for index in indices:
+            skill = self._skills[index]
+            if self.is_ready(skill) and self._mp >= skill.mp_cost:
+                return index
+        return None
+    
+    @property
+    def cooldowns(self) -> Dict[str, int]:
+        """Оставшиеся ходы перезарядки по имени навыка (только навыки на перезарядке)"""
+        turn = self.turn
+        return {skill.name: ready - turn for skill, ready in self.ready_at.items() if ready > turn}
+    
+    @property
+    def is_silenced(self) -> bool:
+        return self.effects.has(SilenceEffect)
+    
+    def apply_effects(self) -> List[ActionResult]:
         """Применение эффектов в начале хода"""
-        for effect in self.effects[:]:
-            effect.apply(self)
-            effect.duration -= 1
-            if effect.duration <= 0:
-                self.effects.remove(effect)
+        return self.effects.tick(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data['cooldowns'] = dict(self.cooldowns)
+        return data
+    
+    def restore_state(self, data: Dict[str, Any]):
+        super().restore_state(data)
+        skills = {skill.name: skill for skill in self.skills}
+        self.ready_at = {skills[name]: self.turn + turns
+                         for name, turns in data.get('cooldowns', {}).items() if name in skills}
+    
+    def capture(self) -> tuple:
+        return super().capture() + (self.turn, dict(self.ready_at))
+    
+    def rewind(self, state: tuple):
+        super().rewind(state)
+        self.turn = state[3]
+        self.ready_at = dict(state[4])
     
     def add_effect(self, effect: 'Effect'):
         """Добавление эффекта персонажу"""
-        self.effects.append(effect)
\ No newline at end of file
+        self.effects.add(effect)
+
+# Наборов навыков немного (классы каталога), но персонажи со своими навыками
+# создают новые наборы - кеш ограничен, чтобы не расти без предела.
+SKILL_TAG_CACHE_SIZE = 256
+
+@lru_cache(maxsize=SKILL_TAG_CACHE_SIZE)
+def skill_tag_index(skills: Tuple['Skill', ...]) -> Dict[str, Tuple[int, ...]]:
+    """Индекс тег -> номера навыков набора (строится один раз на набор)"""
+    index: Dict[str, List[int]] = {}
+    for i, skill in enumerate(skills):
+        for tag in skill.tags:
+            index.setdefault(tag, []).append(i)
+    return {tag: tuple(indices) for tag, indices in index.items()}
@@ -1,16 +1,29 @@
 from abc import ABC, abstractmethod
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from results import ActionResult, POISON_TICK, SHIELD_TICK, SILENCE_TICK, REGENERATION_TICK
 
 class Effect(ABC):
-    """Абстрактный класс эффекта"""
+    """Абстрактный класс эффекта
+
+    source - персонаж, наложивший эффект (EffectSkill.use), или None; не
+    сериализуется и нужен статистике, чтобы засчитать тики наложившему.
+    """
+    __slots__ = ('power', 'duration', 'name', 'source')
     
     def __init__(self, power: int, duration: int):
         self.power = power
         self.duration = duration
         self.name = "Эффект"
+        self.source = None
+    
+    def apply(self, target: 'Character') -> ActionResult:
+        """Применение эффекта к цели; длительность уменьшает EffectSet.tick"""
+        return self.tick(target)
     
     @abstractmethod
-    def apply(self, target: 'Character') -> str:
-        """Применение эффекта к цели"""
+    def tick(self, target: 'Character') -> ActionResult:
+        """Действие эффекта за один ход"""
         pass
     
     def __str__(self):
@@ -23,33 +36,53 @@ class Effect(ABC):
             'power': self.power,
             'duration': self.duration
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Effect':
+        return cls(data['power'], data['duration'])
 
 class PoisonEffect(Effect):
     """Эффект отравления - урон каждый ход"""
+    __slots__ = ()
     
     def __init__(self, power: int, duration: int):
         super().__init__(power, duration)
         self.name = "Отравление"
     
-    def apply(self, target: 'Character') -> str:
-        damage = self.power
-        target.hp -= damage
-        return f"{target.name} получает {damage} урона от отравления"
+    def tick(self, target: 'Character') -> ActionResult:
+        damage = target.take_damage(self.power)
+        return ActionResult(POISON_TICK, target, amounts=(damage,), skill=self)
 
 class ShieldEffect(Effect):
     """Эффект щита - поглощение урона"""
+    __slots__ = ('remaining_shield',)
     
     def __init__(self, power: int, duration: int):
         super().__init__(power, duration)
         self.name = "Щит"
         self.remaining_shield = power
     
-    def apply(self, target: 'Character') -> str:
+    def to_dict(self):
+        data = super().to_dict()
+        data['remaining_shield'] = self.remaining_shield
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ShieldEffect':
+        effect = super().from_dict(data)
+        effect.remaining_shield = data.get('remaining_shield', effect.power)
+        return effect
+    
+    def tick(self, target: 'Character') -> ActionResult:
         # Щит не наносит урон, просто висит на цели
-        return f"{target.name} защищен щитом ({self.remaining_shield})"
+        return ActionResult(SHIELD_TICK, target, amounts=(self.remaining_shield,))
     
     def absorb_damage(self, damage: int) -> int:
-        """Поглощение урона щитом, возвращает непоглощенный урон"""
+        """Поглощение урона щитом, возвращает непоглощенный урон
+
+        Удар, равный остатку, поглощается целиком: щит с нулевым остатком
+        держится до конца действия или до следующего ненулевого удара.
+        """
         if damage <= self.remaining_shield:
             self.remaining_shield -= damage
             return 0
@@ -61,24 +94,111 @@ class ShieldEffect(Effect):
 
 class SilenceEffect(Effect):
     """Эффект немоты - нельзя использовать навыки"""
+    __slots__ = ()
     
     def __init__(self, power: int, duration: int):
         super().__init__(power, duration)
         self.name = "Немота"
     
-    def apply(self, target: 'Character') -> str:
-        return f"{target.name} немой и не может использовать навыки"
+    def tick(self, target: 'Character') -> ActionResult:
+        return ActionResult(SILENCE_TICK, target)
 
 class RegenerationEffect(Effect):
     """Эффект регенерации - восстановление HP каждый ход"""
+    __slots__ = ()
     
     def __init__(self, power: int, duration: int):
         super().__init__(power, duration)
         self.name = "Регенерация"
     
-    def apply(self, target: 'Character') -> str:
+    def tick(self, target: 'Character') -> ActionResult:
         heal = self.power
         old_hp = target.hp
         target.hp += heal
         actual_heal = target.hp - old_hp
-        return f"{target.name} восстанавливает {actual_heal} HP от регенерации"
\ No newline at end of file
+        return ActionResult(REGENERATION_TICK, target, amounts=(actual_heal,), absorbed=heal - actual_heal,
+                            skill=self)
+
+EFFECT_CLASSES = {cls.__name__: cls for cls in (PoisonEffect, ShieldEffect, SilenceEffect, RegenerationEffect)}
+
+def effect_from_dict(data: Dict[str, Any]) -> Effect:
+    """Восстановление эффекта из словаря to_dict"""
+    effect_class = EFFECT_CLASSES.get(data['class_name'])
+    if effect_class is None:
+        raise ValueError(f"Неизвестный эффект: {data['class_name']}")
+    return effect_class.from_dict(data)
+
+class EffectSet:
+    """Эффекты персонажа с индексом по типу
+    
+    Эффекты хранятся в словаре (порядок наложения сохраняется) и дублируются
+    в корзинах по классу эффекта, поэтому добавление, снятие истекшего
+    эффекта и проверки вроде "есть ли немота" или "первый щит" занимают O(1)
+    независимо от числа наложенных эффектов.
+    """
+    __slots__ = ('_effects', '_by_type')
+    
+    def __init__(self, effects: Iterable[Effect] = ()):
+        self._effects: Dict[Effect, None] = {}
+        self._by_type: Dict[type, Dict[Effect, None]] = {}
+        for effect in effects:
+            self.add(effect)
+    
+    def add(self, effect: Effect):
+        self._effects[effect] = None
+        bucket = self._by_type.get(type(effect))
+        if bucket is None:
+            bucket = self._by_type[type(effect)] = {}
+        bucket[effect] = None
+    
+    # Совместимость со списком, которым эффекты были раньше
+    append = add
+    
+    def remove(self, effect: Effect):
+        del self._effects[effect]
+        del self._by_type[type(effect)][effect]
+    
+    def discard(self, effect: Effect):
+        if effect in self._effects:
+            self.remove(effect)
+    
+    def clear(self):
+        self._effects.clear()
+        self._by_type.clear()
+    
+    def has(self, effect_class: type) -> bool:
+        return bool(self._by_type.get(effect_class))
+    
+    def first(self, effect_class: type) -> Optional[Effect]:
+        """Самый ранний из наложенных эффектов класса или None"""
+        bucket = self._by_type.get(effect_class)
+        return next(iter(bucket)) if bucket else None
+    
+    def of_type(self, effect_class: type) -> List[Effect]:
+        return list(self._by_type.get(effect_class, ()))
+    
+    def tick(self, target: 'Character') -> List[ActionResult]:
+        """Применение всех эффектов в порядке наложения и снятие истекших"""
+        messages = []
+        effects = self._effects
+        for effect in list(effects):
+            # Эффект мог быть снят во время хода (щит, разбитый отравлением)
+            if effect not in effects:
+                continue
+            messages.append(effect.apply(target))
+            effect.duration -= 1
+            if effect.duration <= 0:
+                self.discard(effect)
+        return messages
+    
+    def __iter__(self) -> Iterator[Effect]:
+        return iter(self._effects)
+    
+    def __len__(self) -> int:
+        return len(self._effects)
+    
+    def __contains__(self, effect: Effect) -> bool:
+        return effect in self._effects
+    
+    def __repr__(self) -> str:
+        return f"EffectSet({list(self._effects)!r})"
@@ -1,86 +1,221 @@
-from typing import List
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from results import ActionFailure, ActionResult, ITEM_RESTORE, ITEM_USE
 
 class Item:
-    """Базовый класс предмета"""
-    
-    def __init__(self, name: str, description: str, consumable: bool = True):
+    """Базовый класс предмета
+
+    Предмет - общее неизменяемое описание (как навык из каталога): инвентари
+    хранят не экземпляры, а число предметов каждого вида. item_id - стабильный
+    идентификатор для сохранений; code - явный неизменный номер для двоичных
+    форматов (повторы). Предмет без кода нельзя записать в повтор.
+    """
+    __slots__ = ('item_id', 'code', 'name', 'description', 'consumable')
+
+    def __init__(self, name: str, description: str, consumable: bool = True, item_id: Optional[str] = None,
+                 code: Optional[int] = None):
+        self.item_id = item_id if item_id is not None else name
+        self.code = code
         self.name = name
         self.description = description
         self.consumable = consumable
-    
-    def use(self, user: 'Character', target: 'Character' = None) -> str:
+
+    def use(self, user: 'Character', target: 'Character' = None) -> ActionResult:
         """Использование предмета"""
         if target is None:
             target = user
-        return f"{user.name} использует {self.name} на {target.name}"
-    
+        return ActionResult(ITEM_USE, user, (target,), skill=self)
+
     def __str__(self):
         return f"{self.name}: {self.description}"
 
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.item_id!r})"
+
 class HealthPotion(Item):
     """Зелье здоровья"""
-    
-    def __init__(self, heal_amount: int = 50):
-        super().__init__("Зелье здоровья", f"Восстанавливает {heal_amount} HP")
+    __slots__ = ('heal_amount',)
+
+    unit = "HP"
+
+    def __init__(self, heal_amount: int = 50, item_id: str = "health_potion", code: Optional[int] = None):
+        super().__init__("Зелье здоровья", f"Восстанавливает {heal_amount} HP", item_id=item_id, code=code)
         self.heal_amount = heal_amount
-    
-    def use(self, user: 'Character', target: 'Character' = None) -> str:
+
+    def use(self, user: 'Character', target: 'Character' = None) -> ActionResult:
         if target is None:
             target = user
-        
+
         old_hp = target.hp
         target.hp += self.heal_amount
         actual_heal = target.hp - old_hp
-        
-        return f"{user.name} использует {self.name} на {target.name} и восстанавливает {actual_heal} HP"
+
+        return ActionResult(ITEM_RESTORE, user, (target,), (actual_heal,), self.heal_amount - actual_heal, skill=self)
 
 class ManaPotion(Item):
     """Зелье маны"""
-    
-    def __init__(self, mana_amount: int = 30):
-        super().__init__("Зелье маны", f"Восстанавливает {mana_amount} MP")
+    __slots__ = ('mana_amount',)
+
+    unit = "MP"
+
+    def __init__(self, mana_amount: int = 30, item_id: str = "mana_potion", code: Optional[int] = None):
+        super().__init__("Зелье маны", f"Восстанавливает {mana_amount} MP", item_id=item_id, code=code)
         self.mana_amount = mana_amount
-    
-    def use(self, user: 'Character', target: 'Character' = None) -> str:
+
+    def use(self, user: 'Character', target: 'Character' = None) -> ActionResult:
         if target is None:
             target = user
-        
+
         old_mp = target.mp
         target.mp += self.mana_amount
         actual_mana = target.mp - old_mp
-        
-        return f"{user.name} использует {self.name} на {target.name} и восстанавливает {actual_mana} MP"
+
+        return ActionResult(ITEM_RESTORE, user, (target,), (actual_mana,), self.mana_amount - actual_mana, skill=self)
+
+# Общие описания предметов: все инвентари ссылаются на эти объекты.
+# Коды записаны в повторах - существующие не меняются, новые берут следующий номер.
+HEALTH_POTION = HealthPotion(code=0)
+MANA_POTION = ManaPotion(code=1)
+
+ITEMS: Dict[str, Item] = {}
+ITEM_CODES: Dict[int, Item] = {}
+
+def register_item(item: Item) -> Item:
+    """Регистрация общего описания предмета (нужна для from_dict и повторов)"""
+    known = ITEMS.get(item.item_id)
+    if known is not None and known is not item:
+        raise ValueError(f"Предмет {item.item_id} уже зарегистрирован")
+    if item.code is not None:
+        known = ITEM_CODES.get(item.code)
+        if known is not None and known is not item:
+            raise ValueError(f"Код {item.code} уже занят предметом {known.item_id}")
+        ITEM_CODES[item.code] = item
+    ITEMS[item.item_id] = item
+    return item
+
+register_item(HEALTH_POTION)
+register_item(MANA_POTION)
 
 class Inventory:
-    """Инвентарь персонажа"""
-    
-    def __init__(self):
-        self.items: List[Item] = []
-    
-    def add_item(self, item: Item):
-        """Добавление предмета в инвентарь"""
-        self.items.append(item)
-    
-    def remove_item(self, item: Item):
-        """Удаление предмета из инвентаря"""
-        if item in self.items:
-            self.items.remove(item)
-    
-    def use_item(self, item_index: int, user: 'Character', target: 'Character' = None) -> str:
-        """Использование предмета по индексу"""
-        if item_index >= len(self.items):
-            return "Неверный предмет"
-        
-        item = self.items[item_index]
+    """Инвентарь: стопки предметов (описание -> количество)
+
+    Добавление, проверка и расход - O(1) независимо от числа предметов.
+    Один инвентарь может быть общим запасом пати (Battle(stash=...)).
+    Стопки хранятся по зарегистрированному описанию (ITEMS[item_id]), поэтому
+    отдельно созданный предмет с тем же item_id попадает в ту же стопку.
+    """
+
+    def __init__(self, stacks: Optional[Dict[Item, int]] = None):
+        self.stacks: Dict[Item, int] = {}
+        for item, count in (stacks or {}).items():
+            self.add_item(item, count)
+
+    @staticmethod
+    def _registered(item: Item) -> Item:
+        registered = ITEMS.get(item.item_id)
+        if registered is None:
+            raise ValueError(f"Предмет {item.item_id} не зарегистрирован (items.register_item)")
+        return registered
+
+    def add_item(self, item: Item, count: int = 1):
+        """Добавление count предметов в инвентарь; предмет должен быть зарегистрирован"""
+        item = self._registered(item)
+        if count > 0:
+            self.stacks[item] = self.stacks.get(item, 0) + count
+
+    def remove_item(self, item: Item, count: int = 1) -> bool:
+        """Удаление count предметов; False, если столько нет"""
+        item = ITEMS.get(item.item_id, item)
+        have = self.stacks.get(item, 0)
+        if have < count:
+            return False
+        if have == count:
+            del self.stacks[item]
+        else:
+            self.stacks[item] = have - count
+        return True
+
+    def count(self, item: Item) -> int:
+        return self.stacks.get(ITEMS.get(item.item_id, item), 0)
+
+    def _resolve(self, item: Union[Item, int]) -> Optional[Item]:
+        if isinstance(item, Item):
+            item = ITEMS.get(item.item_id, item)
+            return item if item in self.stacks else None
+        # Номер стопки в порядке добавления (как в __str__)
+        stacks = list(self.stacks)
+        return stacks[item] if 0 <= item < len(stacks) else None
+
+    def use_item(self, item: Union[Item, int], user: 'Character', target: 'Character' = None) -> ActionResult:
+        """Использование предмета (описание или номер стопки)"""
+        item = self._resolve(item)
+        if item is None:
+            return ActionFailure(user, "Неверный предмет")
+
         result = item.use(user, target)
-        
+
         if item.consumable:
             self.remove_item(item)
-        
+
         return result
-    
+
+    def __contains__(self, item: Item) -> bool:
+        return ITEMS.get(item.item_id, item) in self.stacks
+
+    def __iter__(self) -> Iterator[Tuple[Item, int]]:
+        return iter(self.stacks.items())
+
+    def __len__(self) -> int:
+        """Число предметов во всех стопках"""
+        return sum(self.stacks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.stacks)
+
+    def capture(self) -> Dict[Item, int]:
+        """Снимок для Battle.capture/rewind"""
+        return dict(self.stacks)
+
+    def rewind(self, state: Dict[Item, int]):
+        self.stacks = dict(state)
+
+    def to_dict(self) -> Dict[str, int]:
+        data: Dict[str, int] = {}
+        for item, count in self.stacks.items():
+            data[item.item_id] = data.get(item.item_id, 0) + count
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Inventory':
+        inventory = cls()
+        for item_id, count in data.items():
+            if item_id not in ITEMS:
+                raise ValueError(f"Неизвестный предмет: {item_id}")
+            inventory.add_item(ITEMS[item_id], count)
+        return inventory
+
     def __str__(self):
-        if not self.items:
+        if not self.stacks:
             return "Инвентарь пуст"
-        
-        return "\n".join([f"{i}. {item}" for i, item in enumerate(self.items)])
\ No newline at end of file
+
+        return "\n".join([f"{i}. {item} x{count}" for i, (item, count) in enumerate(self.stacks.items())])
+
+def drink_potions(battle: 'Battle', character: 'Character',
+                  hp_threshold: float = 0.35, mp_threshold: float = 0.2) -> Optional[Item]:
+    """Политика ИИ пати по умолчанию: зелье из общего запаса при низком HP или MP
+
+    Без обращений к ГСЧ, чтобы бой без зелий в запасе шел так же, как раньше.
+    Подходит любое зелье нужного вида (первая такая стопка запаса), не только
+    HEALTH_POTION и MANA_POTION; зелье здоровья важнее зелья маны.
+    """
+    need_hp = character.hp < character.max_hp * hp_threshold
+    need_mp = character.mp < character.max_mp * mp_threshold
+    if not (need_hp or need_mp):
+        return None
+    mana = None
+    for item in battle.stash.stacks:
+        if need_hp and isinstance(item, HealthPotion):
+            return item
+        if need_mp and mana is None and isinstance(item, ManaPotion):
+            mana = item
+    return mana
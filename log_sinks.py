@@ -0,0 +1,169 @@
+import json
+import queue
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, List, Optional, Union
+
+from results import ActionFailure, ActionResult
+
+Message = Union[str, ActionResult]
+
+class LogSink(ABC):
+    """Абстрактный приемник сообщений лога
+
+    write получает строку или ActionResult как есть: текстовые приемники
+    строят текст сами (str(message)), структурированные пишут поля записи.
+    """
+
+    # True - приемник ничего не сохраняет; логгер только с такими приемниками
+    # считается выключенным и сообщения не строит
+    discards = False
+
+    def open(self):
+        """Подготовка приемника перед началом боя"""
+        pass
+
+    @abstractmethod
+    def write(self, message: Message):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Завершение работы приемника в конце боя"""
+        self.flush()
+
+class NullSink(LogSink):
+    """Приемник, который отбрасывает все сообщения"""
+
+    discards = True
+
+    def write(self, message: Message):
+        pass
+
+class ConsoleSink(LogSink):
+    """Вывод сообщений в консоль"""
+
+    def write(self, message: Message):
+        print(message)
+
+class MemorySink(LogSink):
+    """Кольцевой буфер последних сообщений в памяти"""
+
+    def __init__(self, capacity: int = 1000):
+        self.messages = deque(maxlen=capacity)
+
+    def write(self, message: Message):
+        self.messages.append(str(message))
+
+    def lines(self) -> List[str]:
+        return list(self.messages)
+
+class BufferedFileSink(LogSink):
+    """Запись в файл пачками по flush_every строк"""
+
+    def __init__(self, filename: str, flush_every: int = 100,
+                 header: Optional[str] = None, footer: Optional[str] = None):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.header = header
+        self.footer = footer
+        self.buffer: List[str] = []
+        self.file = None
+
+    def open(self):
+        self.file = open(self.filename, 'w', encoding='utf-8')
+        if self.header is not None:
+            self.buffer.append(self.header)
+
+    def write(self, message: Message):
+        self.buffer.append(self._format(message))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def _format(self, message: Message) -> str:
+        return str(message)
+
+    def flush(self):
+        if self.file and self.buffer:
+            self.file.write('\n'.join(self.buffer) + '\n')
+            self.buffer.clear()
+
+    def close(self):
+        if self.file:
+            if self.footer is not None:
+                self.buffer.append(self.footer)
+            self.flush()
+            self.file.close()
+            self.file = None
+
+class JsonLinesSink(BufferedFileSink):
+    """Структурированный лог: одна JSON-запись на строку"""
+
+    def __init__(self, filename: str, flush_every: int = 100, battle_id: Optional[str] = None):
+        super().__init__(filename, flush_every)
+        self.battle_id = battle_id
+        self.seq = 0
+
+    def _format(self, message: Message) -> str:
+        self.seq += 1
+        record = {'battle_id': self.battle_id, 'seq': self.seq}
+        if isinstance(message, ActionResult):
+            record.update(result_record(message))
+        else:
+            record['message'] = message
+        return json.dumps(record, ensure_ascii=False)
+
+def result_record(result: ActionResult) -> Dict[str, Any]:
+    """Поля ActionResult для структурированного лога (персонажи и навыки - по именам)"""
+    record = {'kind': result.kind, 'actor': result.actor.name}
+    if isinstance(result, ActionFailure):
+        record['message'] = result.text
+        return record
+    record['targets'] = [target.name for target in result.targets]
+    record['amounts'] = list(result.amounts)
+    if result.absorbed:
+        record['absorbed'] = result.absorbed
+    if result.crit:
+        record['crit'] = True
+    if result.skill is not None:
+        record['skill'] = result.skill.name
+    return record
+
+class ThreadedSink(LogSink):
+    """Обертка, передающая запись другому приемнику в фоновом потоке"""
+
+    _STOP = object()
+
+    def __init__(self, sink: LogSink, max_queue: int = 0):
+        self.sink = sink
+        self.discards = sink.discards
+        self.queue: queue.Queue = queue.Queue(max_queue)
+        self.thread: Optional[threading.Thread] = None
+
+    def open(self):
+        self.sink.open()
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def _worker(self):
+        while True:
+            message = self.queue.get()
+            if message is self._STOP:
+                break
+            self.sink.write(message)
+            # Сбрасываем на диск, только когда очередь опустела
+            if self.queue.empty():
+                self.sink.flush()
+
+    def write(self, message: Message):
+        self.queue.put(message)
+
+    def close(self):
+        if self.thread:
+            self.queue.put(self._STOP)
+            self.thread.join()
+            self.thread = None
+        self.sink.close()
@@ -0,0 +1,188 @@
+import time
+import weakref
+from collections import Counter
+from typing import Callable, Dict, Any, List, Optional
+
+# Профилирование фаз боя.
+# BattleProfiler.attach подменяет методы конкретного экземпляра Battle (и его
+# логгера/авто-сохранения) обертками с таймерами. Класс Battle не меняется,
+# поэтому бои без профилировщика не платят ничего, даже проверку флага.
+# Логгер принадлежит вызывающему: таймер на нем снимается, как только
+# закончится вызов боя, раунда или хода, который его поставил.
+
+PHASE_TITLES = {
+    'effects': "Эффекты и кулдауны (apply_start_of_turn_effects)",
+    'decide': "Выбор действия (стратегия босса, политика пати)",
+    'execute': "Выполнение действия (навык или атака)",
+    'end_check': "Проверка конца боя (check_battle_end)",
+    'logging': "Логирование",
+    'autosave': "Авто-сохранение (постановка в очередь)",
+    'scheduling': "Очередь ходов и прочее внутри раунда",
+}
+
+_MISSING = object()
+
+class ProfileReport:
+    """Счетчики и время по фазам; сериализуется и объединяется между процессами
+
+    Время фазы исключающее: вложенные фазы (например, логирование внутри
+    выполнения хода) вычитаются из родительской.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, List[int]] = {}   # фаза -> [вызовы, суммарно нс, максимум нс]
+        self.counters: Counter = Counter()        # battles, rounds, turns
+
+    def add(self, phase: str, elapsed_ns: int):
+        stats = self.phases.get(phase)
+        if stats is None:
+            self.phases[phase] = [1, elapsed_ns, elapsed_ns]
+            return
+        stats[0] += 1
+        stats[1] += elapsed_ns
+        if elapsed_ns > stats[2]:
+            stats[2] = elapsed_ns
+
+    def merge(self, other: 'ProfileReport') -> 'ProfileReport':
+        for phase, (calls, total, longest) in other.phases.items():
+            stats = self.phases.setdefault(phase, [0, 0, 0])
+            stats[0] += calls
+            stats[1] += total
+            stats[2] = max(stats[2], longest)
+        self.counters.update(other.counters)
+        return self
+
+    @property
+    def total_ns(self) -> int:
+        return sum(stats[1] for stats in self.phases.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'phases': {phase: {'calls': calls, 'total_ns': total, 'max_ns': longest}
+                       for phase, (calls, total, longest) in self.phases.items()},
+            'counters': dict(self.counters)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ProfileReport':
+        report = cls()
+        for phase, stats in data['phases'].items():
+            report.phases[phase] = [stats['calls'], stats['total_ns'], stats['max_ns']]
+        report.counters.update(data.get('counters', {}))
+        return report
+
+    def __str__(self):
+        total = self.total_ns or 1
+        lines = [f"{'Фаза':52} {'вызовов':>10} {'всего, мс':>11} {'мкс/вызов':>10} {'доля':>7}"]
+        for phase in sorted(self.phases, key=lambda p: -self.phases[p][1]):
+            calls, elapsed, _ = self.phases[phase]
+            lines.append(f"{PHASE_TITLES.get(phase, phase):52} {calls:>10} {elapsed / 1e6:>11.2f} "
+                         f"{elapsed / calls / 1e3:>10.2f} {elapsed / total:>7.1%}")
+        counters = ", ".join(f"{name}: {value}" for name, value in sorted(self.counters.items()))
+        if counters:
+            lines.append(counters)
+        return "\n".join(lines)
+
+class BattleProfiler:
+    """Таймеры фаз для одного или нескольких боев
+
+        profiler = BattleProfiler()
+        profiler.attach(battle)
+        battle.run_battle(...)
+        print(profiler.report)
+
+    Один профилировщик можно подключить к нескольким боям по очереди (в одном
+    потоке) - отчет будет общим.
+    """
+
+    def __init__(self, report: Optional[ProfileReport] = None):
+        self.report = report if report is not None else ProfileReport()
+        self._children: List[int] = []   # время вложенных фаз для текущих открытых фаз
+        self._loggers = weakref.WeakKeyDictionary()   # логгер -> прежний атрибут log экземпляра
+
+    def _timed(self, phase: str, func: Callable) -> Callable:
+        report = self.report
+        children = self._children
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            children.append(0)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                report.add(phase, elapsed - children.pop())
+                if children:
+                    children[-1] += elapsed
+        return timed
+
+    def instrument_logger(self, logger) -> bool:
+        """Таймер на logger.log; True, если поставлен этим вызовом (снимается release_logger)"""
+        if logger is None or logger in self._loggers:
+            return False
+        self._loggers[logger] = vars(logger).get('log', _MISSING)
+        logger.log = self._timed('logging', logger.log)
+        return True
+
+    def release_logger(self, logger):
+        """Возврат исходного logger.log"""
+        original = self._loggers.pop(logger, _MISSING)
+        if original is _MISSING:
+            del logger.log
+        else:
+            logger.log = original
+
+    def attach(self, battle: 'Battle') -> 'Battle':
+        battle.apply_start_of_turn_effects = self._timed('effects', battle.apply_start_of_turn_effects)
+        battle.decide = self._timed('decide', battle.decide)
+        battle.finish_turn = self._timed('execute', battle.finish_turn)
+        battle.check_battle_end = self._timed('end_check', battle.check_battle_end)
+        run_round = self._timed('scheduling', battle.run_round)
+        run_turn = battle.run_turn
+
+        def round_wrapper(logger):
+            instrumented = self.instrument_logger(logger)
+            self.report.counters['rounds'] += 1
+            try:
+                return run_round(logger)
+            finally:
+                if instrumented:
+                    self.release_logger(logger)
+
+        def turn_wrapper(character, logger):
+            instrumented = self.instrument_logger(logger)
+            self.report.counters['turns'] += 1
+            try:
+                return run_turn(character, logger)
+            finally:
+                if instrumented:
+                    self.release_logger(logger)
+
+        run_battle = battle.run_battle
+
+        def battle_wrapper(logger=None, autosave=True):
+            if logger is None:
+                logger = battle.default_logger()
+            instrumented = self.instrument_logger(logger)
+            if autosave is True:
+                autosave = battle.default_autosaver()
+            if autosave:
+                autosave.checkpoint = self._timed('autosave', autosave.checkpoint)
+            self.report.counters['battles'] += 1
+            try:
+                return run_battle(logger, autosave)
+            finally:
+                if instrumented:
+                    self.release_logger(logger)
+
+        battle.run_round = round_wrapper
+        battle.run_turn = turn_wrapper
+        battle.run_battle = battle_wrapper
+        return battle
+
+def profile_battle(battle: 'Battle', **run_options) -> ProfileReport:
+    """Прогон одного боя с профилированием; отчет только по этому бою"""
+    profiler = BattleProfiler()
+    profiler.attach(battle).run_battle(**run_options)
+    return profiler.report
@@ -0,0 +1,243 @@
+import random
+import struct
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
+
+from battle import Battle
+from core import Character
+from items import Item
+from snapshot import encode_state, decode_state
+
+# Детерминированные повторы боев.
+# Повтор хранит начальное состояние боя (со сидом) и поток событий: кто
+# ходил, какое действие выбрал, в кого и сколько случайных чисел потратил.
+# Бой полностью определяется начальным состоянием и сидом, поэтому
+# воспроизведение заново исполняет ходы без лога и сверяет их с записью,
+# а события позволяют смотреть ход боя, не исполняя его.
+
+MAGIC = b'PZR1'
+_HEADER = struct.Struct('<4sI')   # магия, длина начального состояния
+
+BASIC_ATTACK = 0                  # код действия; навык i кодируется как i + 1
+ITEM_ACTIONS = 1024               # предмет из запаса: ITEM_ACTIONS + Item.code
+
+class ReplayDivergence(ValueError):
+    """Воспроизведение разошлось с записью (изменились правила или код боя)"""
+
+class CountingRandom(random.Random):
+    """random.Random, считающий извлечения; последовательность чисел та же"""
+
+    def __init__(self, seed=None):
+        self.draws = 0
+        super().__init__(seed)
+
+    def random(self) -> float:
+        self.draws += 1
+        return super().random()
+
+    def getrandbits(self, k: int) -> int:
+        self.draws += 1
+        return super().getrandbits(k)
+
+class TurnEvent:
+    """Один ход: раунд, участник, действие, цели (индексы участников) и число извлечений ГСЧ"""
+    __slots__ = ('round', 'actor', 'action', 'targets', 'draws')
+
+    def __init__(self, round_number: int, actor: int, action: int, targets: Tuple[int, ...], draws: int):
+        self.round = round_number
+        self.actor = actor
+        self.action = action
+        self.targets = targets
+        self.draws = draws
+
+    def key(self) -> tuple:
+        return (self.round, self.actor, self.action, self.targets, self.draws)
+
+    def __eq__(self, other):
+        return isinstance(other, TurnEvent) and self.key() == other.key()
+
+    def __repr__(self):
+        return f"TurnEvent{self.key()!r}"
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+class ReplayLog:
+    """Запись боя: начальное состояние (Battle.to_dict) и события ходов"""
+
+    def __init__(self, initial_state: Dict[str, Any], events: Optional[List[TurnEvent]] = None):
+        self.initial_state = initial_state
+        self.events: List[TurnEvent] = events if events is not None else []
+
+    @property
+    def rounds(self) -> int:
+        return self.events[-1].round if self.events else 0
+
+    def events_in_round(self, round_number: int) -> List[TurnEvent]:
+        return [event for event in self.events if event.round == round_number]
+
+    def to_bytes(self) -> bytes:
+        """Компактное представление: снимок snapshot.py и события в varint, все сжато zlib"""
+        state = encode_state(self.initial_state, compress=False)
+        body = bytearray()
+        _write_varint(body, len(self.events))
+        previous_round = self.initial_state['round']
+        for event in self.events:
+            # Раунд хранится приращением: почти всегда 0 или 1
+            _write_varint(body, event.round - previous_round)
+            previous_round = event.round
+            _write_varint(body, event.actor)
+            _write_varint(body, event.action)
+            _write_varint(body, event.draws)
+            _write_varint(body, len(event.targets))
+            for target in event.targets:
+                _write_varint(body, target)
+        return zlib.compress(_HEADER.pack(MAGIC, len(state)) + state + bytes(body), 9)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ReplayLog':
+        payload = zlib.decompress(data)
+        magic, state_size = _HEADER.unpack_from(payload, 0)
+        if magic != MAGIC:
+            raise ValueError("Неверный формат повтора")
+        offset = _HEADER.size
+        initial_state = decode_state(payload[offset:offset + state_size])
+        offset += state_size
+
+        count, offset = _read_varint(payload, offset)
+        events = []
+        round_number = initial_state['round']
+        for _ in range(count):
+            delta, offset = _read_varint(payload, offset)
+            round_number += delta
+            actor, offset = _read_varint(payload, offset)
+            action, offset = _read_varint(payload, offset)
+            draws, offset = _read_varint(payload, offset)
+            target_count, offset = _read_varint(payload, offset)
+            targets = []
+            for _ in range(target_count):
+                target, offset = _read_varint(payload, offset)
+                targets.append(target)
+            events.append(TurnEvent(round_number, actor, action, tuple(targets), draws))
+        return cls(initial_state, events)
+
+    def save(self, filename: str):
+        with open(filename, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, filename: str) -> 'ReplayLog':
+        with open(filename, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+def _combatant_index(battle: Battle) -> Dict[Character, int]:
+    return {char: i for i, char in enumerate(battle.party + [battle.boss])}
+
+def _use_counting_rng(battle: Battle):
+    """Замена генератора боя на CountingRandom с тем же состоянием"""
+    rng = CountingRandom()
+    rng.setstate(battle.rng.getstate())
+    battle.rng = rng
+    for char in battle.party + [battle.boss]:
+        char.rng = rng
+
+def _event(battle: Battle, index: Dict[Character, int], character: Character,
+           skill_index: Optional[int], targets: List[Character], draws: int) -> TurnEvent:
+    if skill_index is None:
+        action = BASIC_ATTACK
+    elif isinstance(skill_index, Item):
+        if skill_index.code is None:
+            raise ValueError(f"Предмет {skill_index.item_id} без кода нельзя записать в повтор")
+        action = ITEM_ACTIONS + skill_index.code
+    else:
+        action = skill_index + 1
+    return TurnEvent(battle.round, index[character], action, tuple(index[t] for t in targets), draws)
+
+class ReplayRecorder:
+    """Запись ходов боя в ReplayLog; подключается до первого хода
+
+        recorder = ReplayRecorder.attach(battle)
+        battle.run_battle(...)
+        recorder.log.save("battle.replay")
+    """
+
+    def __init__(self, battle: Battle):
+        _use_counting_rng(battle)
+        state = battle.to_dict()
+        # Генератор в начальном состоянии своего сида не сохраняется:
+        # 2.5 КБ состояния Mersenne Twister больше всего остального повтора
+        if battle.seed is not None and random.Random(battle.seed).getstate() == state['rng_state']:
+            del state['rng_state']
+        self.log = ReplayLog(state)
+        self.index = _combatant_index(battle)
+        self.draws = battle.rng.draws
+
+    @classmethod
+    def attach(cls, battle: Battle) -> 'ReplayRecorder':
+        recorder = cls(battle)
+        battle.recorder = recorder
+        return recorder
+
+    def on_turn(self, battle: Battle, character: Character, skill_index: Optional[int],
+                targets: List[Character]):
+        draws = battle.rng.draws
+        self.log.events.append(_event(battle, self.index, character, skill_index, targets, draws - self.draws))
+        self.draws = draws
+
+class Replayer:
+    """Повторное исполнение записи без лога с проверкой каждого хода
+
+        replayer = Replayer(ReplayLog.load("battle.replay"))
+        battle = replayer.fast_forward(12)   # бой в начале 12-го раунда
+    """
+
+    def __init__(self, log: ReplayLog, verify: bool = True):
+        self.log = log
+        self.verify = verify
+        self.battle = Battle.from_dict(log.initial_state)
+        _use_counting_rng(self.battle)
+        self.index = _combatant_index(self.battle)
+        self.position = 0          # номер следующего события записи
+        self.draws = self.battle.rng.draws
+        self.battle.recorder = self
+
+    def on_turn(self, battle: Battle, character: Character, skill_index: Optional[int],
+                targets: List[Character]):
+        draws = battle.rng.draws
+        event = _event(battle, self.index, character, skill_index, targets, draws - self.draws)
+        self.draws = draws
+        if self.verify:
+            expected = self.log.events[self.position] if self.position < len(self.log.events) else None
+            if event != expected:
+                raise ReplayDivergence(f"Ход {self.position}: записано {expected!r}, получено {event!r}")
+        self.position += 1
+
+    def fast_forward(self, round_number: int) -> Battle:
+        """Исполнение ходов до начала раунда round_number (или до конца боя)"""
+        battle = self.battle
+        while battle.round < round_number and not battle.is_battle_over:
+            battle.run_round(None)
+        return battle
+
+    def run(self) -> Battle:
+        """Исполнение записи до конца боя"""
+        battle = self.battle
+        while not battle.is_battle_over:
+            battle.run_round(None)
+        if self.verify and self.position != len(self.log.events):
+            raise ReplayDivergence(f"Бой закончился после {self.position} ходов из {len(self.log.events)}")
+        return battle
@@ -0,0 +1,116 @@
+from typing import Any, Callable, Dict, Sequence
+
+# Итоги действий в бою.
+# Атаки, навыки и тики эффектов возвращают ActionResult - запись из ссылок и
+# чисел без форматирования. Текст для лога строится в str() по шаблону вида
+# действия, то есть только когда сообщение действительно кому-то нужно
+# (BattleLogger с приемниками); массовые симуляции строки не строят вовсе.
+
+# Виды действий
+ATTACK = "attack"                    # базовая атака
+MAGIC_ATTACK = "magic_attack"        # базовая атака мага
+SKILL_DAMAGE = "skill_damage"
+SKILL_HEAL = "skill_heal"
+SKILL_MASS_HEAL = "skill_mass_heal"
+SKILL_EFFECT = "skill_effect"
+POISON_TICK = "poison_tick"          # тики эффектов: actor - персонаж под эффектом
+SHIELD_TICK = "shield_tick"
+SILENCE_TICK = "silence_tick"
+REGENERATION_TICK = "regeneration_tick"
+ITEM_USE = "item_use"                # предмет (в поле skill)
+ITEM_RESTORE = "item_restore"        # зелье: amounts - восстановленные HP или MP
+FAILURE = "failure"                  # действие не выполнено (ActionFailure)
+
+class ActionResult:
+    """Итог одного действия
+
+    amounts идут параллельно targets: нанесенный урон, восстановленное HP или
+    (название, длительность) наложенного эффекта; absorbed - урон, поглощенный
+    щитом, а для лечения - избыток сверх максимума (overheal); crit -
+    критический удар; skill - навык, предмет или эффект (у тиков отравления и
+    регенерации, его source - наложивший). Создается на каждом ходу,
+    поэтому только присваивания полей и никакого форматирования.
+    """
+    __slots__ = ('kind', 'actor', 'targets', 'amounts', 'absorbed', 'crit', 'skill')
+
+    def __init__(self, kind: str, actor: Any, targets: Sequence[Any] = (), amounts: Sequence[Any] = (),
+                 absorbed: int = 0, crit: bool = False, skill: Any = None):
+        self.kind = kind
+        self.actor = actor
+        self.targets = targets
+        self.amounts = amounts
+        self.absorbed = absorbed
+        self.crit = crit
+        self.skill = skill
+
+    @property
+    def succeeded(self) -> bool:
+        return self.kind != FAILURE
+
+    @property
+    def total(self) -> int:
+        """Сумма числовых величин (урон или лечение)"""
+        return sum(amount for amount in self.amounts if isinstance(amount, int))
+
+    def __str__(self):
+        return RENDERERS[self.kind](self)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.kind!r}, {str(self)!r})"
+
+class ActionFailure(ActionResult):
+    """Действие не выполнено (немота, перезарядка, нет MP или целей); text - причина"""
+    __slots__ = ('text',)
+
+    def __init__(self, actor: Any, text: str):
+        super().__init__(FAILURE, actor)
+        self.text = text
+
+def _absorbed_text(result: ActionResult) -> str:
+    return f" (щит поглотил {result.absorbed})" if result.absorbed else ""
+
+def _render_attack(result: ActionResult) -> str:
+    crit_text = " КРИТИЧЕСКИЙ УРОН!" if result.crit else ""
+    return (f"{result.actor.name} атакует {result.targets[0].name} на {result.amounts[0]} урона"
+            f"{crit_text}{_absorbed_text(result)}")
+
+def _render_magic_attack(result: ActionResult) -> str:
+    return (f"{result.actor.name} атакует {result.targets[0].name} магией на {result.amounts[0]} урона"
+            f"{_absorbed_text(result)}")
+
+def _render_skill_damage(result: ActionResult) -> str:
+    return (f"{result.actor.name} использует {result.skill.name} на {result.targets[0].name} "
+            f"и наносит {result.amounts[0]} урона{_absorbed_text(result)}")
+
+def _render_skill_heal(result: ActionResult) -> str:
+    return (f"{result.actor.name} использует {result.skill.name} на {result.targets[0].name} "
+            f"и восстанавливает {result.amounts[0]} HP")
+
+def _render_mass_heal(result: ActionResult) -> str:
+    healed = ', '.join(f"{target.name} +{heal} HP" for target, heal in zip(result.targets, result.amounts))
+    return f"{result.actor.name} использует {result.skill.name}: {healed}"
+
+def _render_skill_effect(result: ActionResult) -> str:
+    applied = ', '.join(f"{target.name} получает {name} ({duration} ходов)"
+                        for target, (name, duration) in zip(result.targets, result.amounts))
+    return f"{result.actor.name} использует {result.skill.name}: {applied}"
+
+def _render_item_restore(result: ActionResult) -> str:
+    return (f"{result.actor.name} использует {result.skill.name} на {result.targets[0].name} "
+            f"и восстанавливает {result.amounts[0]} {result.skill.unit}")
+
+RENDERERS: Dict[str, Callable[[ActionResult], str]] = {
+    ATTACK: _render_attack,
+    MAGIC_ATTACK: _render_magic_attack,
+    SKILL_DAMAGE: _render_skill_damage,
+    SKILL_HEAL: _render_skill_heal,
+    SKILL_MASS_HEAL: _render_mass_heal,
+    SKILL_EFFECT: _render_skill_effect,
+    POISON_TICK: lambda r: f"{r.actor.name} получает {r.amounts[0]} урона от отравления",
+    SHIELD_TICK: lambda r: f"{r.actor.name} защищен щитом ({r.amounts[0]})",
+    SILENCE_TICK: lambda r: f"{r.actor.name} немой и не может использовать навыки",
+    REGENERATION_TICK: lambda r: f"{r.actor.name} восстанавливает {r.amounts[0]} HP от регенерации",
+    ITEM_USE: lambda r: f"{r.actor.name} использует {r.skill.name} на {r.targets[0].name}",
+    ITEM_RESTORE: _render_item_restore,
+    FAILURE: lambda r: r.text,
+}
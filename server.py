@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Асинхронный сервер боев: много интерактивных сессий в одном процессе
+
+Каждая сессия - корутина, которая ведет свой Battle. Ходы персонажей
+игрока ждут ход от клиента, ходы ИИ (босса и персонажей без игрока)
+выполняются сразу. Протокол - строки JSON через TCP или unix-сокет:
+
+    клиент -> {"type": "new", "party": [...create_party...], "boss": {"name": "Саурон", "level": 5,
+               "difficulty": "normal"}, "seed": 1}
+    сервер <- {"type": "session", "session": "..."}
+    сервер <- {"type": "log", "message": "..."}
+    сервер <- {"type": "turn", "character": 0, "name": "...", "ready_skills": [0, 2], "status": [...]}
+    клиент -> {"type": "move", "skill": 2, "targets": [3]}    # skill null - базовая атака
+    сервер <- {"type": "end", "winner": "party", "round": 9}
+
+    python server.py --port 8765
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import uuid
+from collections import deque
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from battle import Battle, BattleLogger
+from core import Character
+from log_sinks import LogSink
+from utils import create_boss, create_party
+
+class SessionError(Exception):
+    """Ошибка протокола или ограничений сервера"""
+
+class _OutboxSink(LogSink):
+    """Пересылка строк лога боя клиенту сессии"""
+
+    def __init__(self, session: 'BattleSession'):
+        self.session = session
+
+    def write(self, message):
+        self.session.send({'type': 'log', 'message': str(message)})
+
+class BattleSession:
+    """Один бой, ведущийся корутиной run()
+
+    Память сессии ограничена: сам бой, очередь из одного хода и исходящий
+    буфер не длиннее outbox_size сообщений (при медленном клиенте старые
+    сообщения вытесняются, итоговые turn/end приходят всегда последними).
+    """
+
+    def __init__(self, session_id: str, battle: Battle, humans: Set[Character],
+                 outbox_size: int = 256, move_timeout: Optional[float] = None):
+        self.session_id = session_id
+        self.battle = battle
+        self.humans = humans
+        self.move_timeout = move_timeout
+        self.combatants = battle.party + [battle.boss]
+        self.moves: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.outbox: deque = deque(maxlen=outbox_size)
+        self.outbox_ready = asyncio.Event()
+        self.logger = BattleLogger(sinks=[_OutboxSink(self)])
+        self.waiting_for: Optional[Character] = None
+        self.winner: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    # --- Обмен сообщениями ---
+
+    def send(self, message: Dict[str, Any]):
+        self.outbox.append(message)
+        self.outbox_ready.set()
+
+    async def receive(self) -> Dict[str, Any]:
+        """Следующее исходящее сообщение (для транспорта или локального клиента)"""
+        while not self.outbox:
+            self.outbox_ready.clear()
+            await self.outbox_ready.wait()
+        return self.outbox.popleft()
+
+    async def submit(self, move: Dict[str, Any]):
+        """Ход клиента; ждет, если предыдущий ход еще не разобран"""
+        await self.moves.put(move)
+
+    @property
+    def finished(self) -> bool:
+        return self.winner is not None
+
+    # --- Ход боя ---
+
+    def _status(self) -> List[Dict[str, Any]]:
+        return [{'name': char.name, 'hp': char.hp, 'max_hp': char.max_hp, 'mp': char.mp,
+                 'alive': char.is_alive} for char in self.combatants]
+
+    def _parse_move(self, character: Character, move: Dict[str, Any]) -> Tuple[Optional[int], List[Character]]:
+        if not isinstance(move, dict) or move.get('type') != 'move':
+            kind = move.get('type') if isinstance(move, dict) else type(move).__name__
+            raise SessionError(f"Ожидался ход, получено {kind!r}")
+        skill_index = move.get('skill')
+        if skill_index is not None and (not _is_index(skill_index) or skill_index not in character.ready_skills()):
+            raise SessionError(f"Навык {skill_index!r} сейчас недоступен")
+        if skill_index is not None and character.is_silenced:
+            raise SessionError("Персонаж под немотой")
+
+        indices = move.get('targets') or [len(self.battle.party)]
+        # Отрицательные номера списка выбрали бы участников с конца
+        if not isinstance(indices, list) or not all(_is_index(i) and i < len(self.combatants) for i in indices):
+            raise SessionError(f"Неверные цели: {indices!r}")
+        targets = [self.combatants[i] for i in indices]
+        if not any(target.is_alive for target in targets):
+            raise SessionError("Все выбранные цели мертвы")
+        return skill_index, targets
+
+    async def _human_move(self, character: Character) -> Tuple[Optional[int], List[Character]]:
+        self.waiting_for = character
+        self.send({'type': 'turn', 'character': self.combatants.index(character), 'name': character.name,
+                   'ready_skills': [] if character.is_silenced else character.ready_skills(),
+                   'status': self._status()})
+        try:
+            while True:
+                try:
+                    move = await asyncio.wait_for(self.moves.get(), self.move_timeout)
+                except asyncio.TimeoutError:
+                    # Игрок не ответил вовремя - за него ходит политика ИИ
+                    self.send({'type': 'timeout', 'character': character.name})
+                    return self.battle.decide(character)
+                try:
+                    return self._parse_move(character, move)
+                except SessionError as error:
+                    self.send({'type': 'error', 'message': str(error)})
+        finally:
+            self.waiting_for = None
+
+    async def run(self) -> str:
+        """Бой до конца; возвращает победителя ("party" или "boss")"""
+        battle = self.battle
+        logger = self.logger
+        logger.log(f"Начало боя! Пати против {battle.boss.name}")
+        with contextlib.closing(battle):
+            while not battle.is_battle_over:
+                logger.log(f"\n=== Раунд {battle.round} ===")
+                for character in battle.turn_order:
+                    if not battle.begin_turn(character, logger):
+                        continue
+                    if character in self.humans:
+                        skill_index, targets = await self._human_move(character)
+                    else:
+                        skill_index, targets = battle.decide(character)
+                    if battle.finish_turn(character, skill_index, targets, logger):
+                        break
+                if not battle.is_battle_over:
+                    battle.round += 1
+                # Раунды ИИ без участия игрока не должны задерживать остальные сессии
+                await asyncio.sleep(0)
+
+        self.winner = "party" if any(char.is_alive for char in battle.party) else "boss"
+        self.send({'type': 'end', 'winner': self.winner, 'round': battle.round})
+        return self.winner
+
+class BattleServer:
+    """Реестр сессий и сетевой транспорт"""
+
+    def __init__(self, max_sessions: int = 10000, outbox_size: int = 256,
+                 move_timeout: Optional[float] = None):
+        self.max_sessions = max_sessions
+        self.outbox_size = outbox_size
+        self.move_timeout = move_timeout
+        self.sessions: Dict[str, BattleSession] = {}
+
+    def create_session(self, party_config: List[dict], boss_config: Optional[Dict[str, Any]] = None,
+                       seed: Optional[int] = None, human: bool = True) -> BattleSession:
+        """Новая сессия; human=False - вся пати под управлением ИИ"""
+        if len(self.sessions) >= self.max_sessions:
+            raise SessionError("Достигнут предел числа сессий")
+        if not isinstance(party_config, list) or not party_config \
+                or not all(isinstance(config, dict) for config in party_config):
+            raise SessionError("party должен быть непустым списком объектов")
+        if boss_config is not None and not isinstance(boss_config, dict):
+            raise SessionError("boss должен быть объектом")
+        if seed is not None and (not _is_int(seed) or not -2 ** 63 <= seed < 2 ** 63):
+            raise SessionError("seed должен быть 64-битным целым числом")
+        session_id = uuid.uuid4().hex[:12]
+        try:
+            party = create_party(party_config)
+            boss = create_boss(boss_config)
+            battle = Battle(party, boss, seed, battle_id=session_id)
+        except (KeyError, TypeError, ValueError) as error:
+            raise SessionError(f"Неверная конфигурация: {error!r}") from None
+        session = BattleSession(session_id, battle, set(party) if human else set(),
+                                self.outbox_size, self.move_timeout)
+        self.sessions[session_id] = session
+        session.task = asyncio.get_running_loop().create_task(session.run())
+        session.task.add_done_callback(lambda _: self.sessions.pop(session_id, None))
+        return session
+
+    async def close(self):
+        tasks = [session.task for session in self.sessions.values() if session.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- Транспорт: строки JSON ---
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            hello = json.loads(await reader.readline() or b'{}')
+            if not isinstance(hello, dict) or hello.get('type') != 'new':
+                raise SessionError("Первым сообщением должно быть new")
+            session = self.create_session(hello['party'], hello.get('boss'), hello.get('seed'),
+                                          hello.get('human', True))
+        except (SessionError, KeyError, ValueError) as error:
+            writer.write(_encode({'type': 'error', 'message': str(error)}))
+            await writer.drain()
+            writer.close()
+            return
+
+        writer.write(_encode({'type': 'session', 'session': session.session_id}))
+
+        async def pump_moves():
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    await session.submit(json.loads(line))
+                except ValueError:
+                    session.send({'type': 'error', 'message': "Неверный JSON"})
+
+        async def pump_messages():
+            while True:
+                message = await session.receive()
+                writer.write(_encode(message))
+                await writer.drain()
+                if message['type'] == 'end':
+                    break
+
+        loop = asyncio.get_running_loop()
+        reading = loop.create_task(pump_moves())
+        sending = loop.create_task(pump_messages())
+        try:
+            # Конец боя или отключение клиента (EOF при чтении, ошибка при записи)
+            await asyncio.wait((reading, sending), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            reading.cancel()
+            sending.cancel()
+            await asyncio.gather(reading, sending, return_exceptions=True)
+            # Брошенная сессия ждала бы ход вечно (при move_timeout=None) и
+            # занимала место в max_sessions
+            if not session.finished:
+                session.task.cancel()
+            self.sessions.pop(session.session_id, None)
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Запуск TCP-сервера (или unix-сокета при заданном path)"""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+def _is_int(value: Any) -> bool:
+    # bool - подкласс int, но true/false из JSON не номер и не сид
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _is_index(value: Any) -> bool:
+    return _is_int(value) and value >= 0
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8')
+
+class LocalClient:
+    """Клиент в том же процессе: обменивается сообщениями с сессией без сокета"""
+
+    def __init__(self, session: BattleSession):
+        self.session = session
+
+    async def next_message(self, kind: Optional[str] = None) -> Dict[str, Any]:
+        """Следующее сообщение (при заданном kind - следующее сообщение этого типа)"""
+        while True:
+            message = await self.session.receive()
+            if kind is None or message['type'] == kind or message['type'] == 'end':
+                return message
+
+    async def move(self, skill: Optional[int] = None, targets: Optional[List[int]] = None):
+        await self.session.submit({'type': 'move', 'skill': skill, 'targets': targets})
+
+    async def play(self) -> str:
+        """Игра до конца базовыми атаками по боссу"""
+        while True:
+            message = await self.next_message('turn')
+            if message['type'] == 'end':
+                return message['winner']
+            await self.move()
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Асинхронный сервер боев")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="путь unix-сокета вместо TCP")
+    parser.add_argument('--max-sessions', type=int, default=10000)
+    parser.add_argument('--move-timeout', type=float, help="секунд на ход до хода за игрока")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = BattleServer(args.max_sessions, move_timeout=args.move_timeout)
+        listener = await server.start(args.host, args.port, args.unix)
+        async with listener:
+            await listener.serve_forever()
+
+    asyncio.run(serve())
+
+if __name__ == '__main__':
+    main()
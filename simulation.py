@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import random
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Iterable, List, Dict, Any, Optional, Sequence
+
+from core import Character
+from characters import Boss
+from battle import Battle, BattleLogger
+from battle_stats import BattleStats, StatsCollector
+from items import Inventory
+from profiling import BattleProfiler, ProfileReport
+
+PartyFactory = Callable[[], List[Character]]
+StashFactory = Callable[[], Inventory]
+BossFactory = Callable[[], Boss]
+
+SEED_MASK = 2 ** 63 - 1   # сиды боев - неотрицательные int64 (snapshot, replay)
+
+def derive_seed(seed: int, *path: Any) -> int:
+    """63-битный сид потомка по пути от корневого сида: derive_seed(S, 'battle', i)
+
+    Разные пути дают независимые сиды; путь может продолжаться на любую глубину
+    (например, кампания -> сценарий -> бой). Старший бит сброшен: сид
+    помещается в знаковое 64-битное поле снимков и повторов.
+    """
+    key = json.dumps([seed, *path], separators=(',', ':'), ensure_ascii=False)
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') & SEED_MASK
+
+def battle_seed(seed: int, index: int) -> int:
+    """Сид боя index серии (кампании) seed"""
+    return derive_seed(seed, 'battle', index)
+
+class SimulationResult:
+    """Агрегированные результаты серии боев"""
+
+    def __init__(self):
+        self.battles = 0
+        self.party_wins = 0
+        self.rounds: Counter = Counter()     # раунды до конца боя -> число боев
+        self.survivors: Counter = Counter()  # выживших в пати -> число боев
+        self.timeouts = 0                    # бои без победителя (предел раундов vectorized)
+        self.profile: Optional[ProfileReport] = None   # при simulate(..., profile=True)
+        self.stats: Optional[BattleStats] = None       # при simulate(..., stats=True)
+
+    def record(self, battle: Battle, winner: str):
+        """Учет результата одного боя"""
+        self.battles += 1
+        if winner == "party":
+            self.party_wins += 1
+        self.rounds[battle.round] += 1
+        self.survivors[sum(1 for char in battle.party if char.is_alive)] += 1
+
+    def merge(self, other: 'SimulationResult') -> 'SimulationResult':
+        """Объединение результатов (например, от разных процессов)"""
+        self.battles += other.battles
+        self.party_wins += other.party_wins
+        self.rounds.update(other.rounds)
+        self.survivors.update(other.survivors)
+        self.timeouts += other.timeouts
+        if other.profile is not None:
+            self.profile = (self.profile or ProfileReport()).merge(other.profile)
+        if other.stats is not None:
+            self.stats = (self.stats or BattleStats()).merge(other.stats)
+        return self
+
+    @property
+    def win_rate(self) -> float:
+        return self.party_wins / self.battles if self.battles else 0.0
+
+    @property
+    def mean_rounds(self) -> float:
+        if not self.battles:
+            return 0.0
+        return sum(r * count for r, count in self.rounds.items()) / self.battles
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'battles': self.battles,
+            'party_wins': self.party_wins,
+            'win_rate': self.win_rate,
+            'mean_rounds': self.mean_rounds,
+            'rounds': {str(r): c for r, c in sorted(self.rounds.items())},
+            'survivors': {str(s): c for s, c in sorted(self.survivors.items())}
+        }
+        if self.timeouts:
+            data['timeouts'] = self.timeouts
+        if self.profile is not None:
+            data['profile'] = self.profile.to_dict()
+        if self.stats is not None:
+            data['stats'] = self.stats.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SimulationResult':
+        """Восстановление из to_dict (win_rate и mean_rounds пересчитываются)"""
+        result = cls()
+        result.battles = data['battles']
+        result.party_wins = data['party_wins']
+        result.rounds.update({int(r): c for r, c in data['rounds'].items()})
+        result.survivors.update({int(s): c for s, c in data['survivors'].items()})
+        result.timeouts = data.get('timeouts', 0)
+        if 'profile' in data:
+            result.profile = ProfileReport.from_dict(data['profile'])
+        if 'stats' in data:
+            result.stats = BattleStats.from_dict(data['stats'])
+        return result
+
+    def __str__(self):
+        return (f"Боев: {self.battles}, побед пати: {self.party_wins} "
+                f"({self.win_rate:.1%}), среднее число раундов: {self.mean_rounds:.1f}")
+
+def run_headless(party_factory: PartyFactory, boss_factory: BossFactory, seed: Optional[int] = None,
+                 profiler: Optional[BattleProfiler] = None, stash_factory: Optional[StashFactory] = None,
+                 collector: Optional[StatsCollector] = None):
+    """Один бой без вывода в консоль, логов и авто-сохранений"""
+    stash = stash_factory() if stash_factory is not None else None
+    battle = Battle(party_factory(), boss_factory(), seed, stash=stash)
+    if profiler is not None:
+        profiler.attach(battle)
+    if collector is not None:
+        collector.attach(battle)
+    winner = battle.run_battle(logger=BattleLogger.headless(), autosave=False)
+    return battle, winner
+
+def _run_chunk(party_factory: PartyFactory, boss_factory: BossFactory, seeds: Iterable[int],
+               profile: bool = False, stash_factory: Optional[StashFactory] = None,
+               stats: bool = False) -> SimulationResult:
+    """Серия боев внутри одного рабочего процесса"""
+    result = SimulationResult()
+    profiler = BattleProfiler() if profile else None
+    collector = StatsCollector() if stats else None
+    for seed in seeds:
+        battle, winner = run_headless(party_factory, boss_factory, seed, profiler, stash_factory, collector)
+        result.record(battle, winner)
+    if profiler is not None:
+        result.profile = profiler.report
+    if collector is not None:
+        result.stats = collector.flush()
+    return result
+
+def _split(seeds: Sequence[int], chunks: int) -> List[Sequence[int]]:
+    """Разбиение списка сидов на непрерывные куски"""
+    size = max(1, -(-len(seeds) // chunks))
+    return [seeds[i:i + size] for i in range(0, len(seeds), size)]
+
+def simulate(party_factory: PartyFactory, boss_factory: BossFactory, n: int,
+             seed: Optional[int] = None, workers: Optional[int] = None,
+             profile: bool = False, stash_factory: Optional[StashFactory] = None,
+             stats: bool = False, pool: Optional[Executor] = None) -> SimulationResult:
+    """Монте-Карло симуляция n боев
+
+    Фабрики должны быть функциями уровня модуля (их передают в дочерние процессы).
+    Бой i получает сид battle_seed(seed, i), поэтому результат не зависит от
+    числа процессов, а серии с соседними сидами не делят бои (как было бы при
+    seed + i).
+    profile=True - профилирование фаз; отчеты процессов объединяются в result.profile.
+    stash_factory - общий запас предметов пати для каждого боя.
+    stats=True - статистика персонажей (battle_stats); отчеты процессов
+    объединяются в result.stats.
+    pool - готовый пул процессов вызывающего (не закрывается), чтобы серия
+    вызовов не создавала пул заново; workers тогда задает разбиение на куски.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    seeds = [battle_seed(seed, index) for index in range(n)]
+    if workers <= 1 or n < 2:
+        return _run_chunk(party_factory, boss_factory, seeds, profile, stash_factory, stats)
+
+    result = SimulationResult()
+    # Несколько кусков на процесс, чтобы сгладить разную длину боев
+    chunks = _split(seeds, workers * 4)
+    with nullcontext(pool) if pool is not None else ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_chunk, party_factory, boss_factory, chunk, profile, stash_factory, stats)
+                   for chunk in chunks]
+        for future in futures:
+            result.merge(future.result())
+    return result
@@ -1,17 +1,62 @@
+import json
+import os
 from abc import ABC, abstractmethod
-from typing import List
-import random
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, Iterable, List, Tuple
+
+from results import ActionFailure, ActionResult, SKILL_DAMAGE, SKILL_HEAL, SKILL_MASS_HEAL, SKILL_EFFECT
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'skills.json')
+
+# Теги возможностей навыков (Skill.tags). Стратегии ищут навыки по тегам
+# через Character.skill_tags, а не по отображаемым именам.
+AOE = "aoe"
+SINGLE_TARGET = "single_target"
+DAMAGE = "damage"
+HEAL = "heal"
+EFFECT = "effect"
+DEBUFF = "debuff"
+BUFF = "buff"
+# Кроме того, навык эффекта помечен типом своего эффекта ("poison", "shield", ...)
+
+DEBUFF_EFFECTS = frozenset({"poison", "silence"})
 
 class Skill(ABC):
-    """Абстрактный класс навыка"""
+    """Абстрактный класс навыка
+    
+    Навык не хранит состояния персонажа (ход готовности навыка лежит в
+    Character.ready_at), поэтому один объект может использоваться всеми
+    персонажами. Навыки из каталога заморожены вызовом freeze().
+    
+    declared_tags - теги, объявленные в каталоге (например, "aoe"); tags
+    дополняет их тегами, следующими из типа навыка.
+    """
+    __slots__ = ('name', 'mp_cost', 'cooldown', 'declared_tags', '_frozen')
     
-    def __init__(self, name: str, mp_cost: int, cooldown: int = 0):
+    KIND_TAGS: FrozenSet[str] = frozenset()
+    
+    def __init__(self, name: str, mp_cost: int, cooldown: int = 0, tags: Iterable[str] = ()):
         self.name = name
         self.mp_cost = mp_cost
         self.cooldown = cooldown
+        self.declared_tags = frozenset(tags)
+    
+    def __setattr__(self, name: str, value: Any):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"Навык {self.name} общий для всех персонажей и не изменяется")
+        object.__setattr__(self, name, value)
+    
+    def freeze(self) -> 'Skill':
+        object.__setattr__(self, '_frozen', True)
+        return self
+    
+    @property
+    def tags(self) -> FrozenSet[str]:
+        tags = self.declared_tags | self.KIND_TAGS
+        return tags if AOE in tags else tags | {SINGLE_TARGET}
     
     @abstractmethod
-    def use(self, caster: 'Character', targets: List['Character']) -> str:
+    def use(self, caster: 'Character', targets: List['Character']) -> ActionResult:
         pass
     
     def __str__(self):
@@ -19,73 +64,91 @@ class Skill(ABC):
 
 class DamageSkill(Skill):
     """Навык нанесения урона"""
+    __slots__ = ('base_power', 'stat', 'multiplier')
+    
+    KIND_TAGS = frozenset({DAMAGE})
     
-    def __init__(self, name: str, mp_cost: int, base_power: int, stat: str, multiplier: float = 1.0, cooldown: int = 0):
-        super().__init__(name, mp_cost, cooldown)
+    def __init__(self, name: str, mp_cost: int, base_power: int, stat: str, multiplier: float = 1.0, cooldown: int = 0,
+                 tags: Iterable[str] = ()):
+        super().__init__(name, mp_cost, cooldown, tags)
         self.base_power = base_power
         self.stat = stat  # "strength", "intelligence", etc.
         self.multiplier = multiplier
     
-    def use(self, caster: 'Character', targets: List['Character']) -> str:
+    def use(self, caster: 'Character', targets: List['Character']) -> ActionResult:
         if not targets:
-            return "Нет целей для атаки"
+            return ActionFailure(caster, "Нет целей для атаки")
         
         target = targets[0]  # Для одиночных атак
         stat_value = getattr(caster, self.stat)
-        damage = int((self.base_power + stat_value) * self.multiplier * random.uniform(0.9, 1.1))
+        damage = int((self.base_power + stat_value) * self.multiplier * caster.rng.uniform(0.9, 1.1))
         
-        target.hp -= damage
-        return f"{caster.name} использует {self.name} на {target.name} и наносит {damage} урона"
+        dealt = target.take_damage(damage)
+        return ActionResult(SKILL_DAMAGE, caster, (target,), (dealt,), damage - dealt, skill=self)
 
 class HealSkill(Skill):
     """Навык лечения"""
+    __slots__ = ('base_power', 'stat', 'multiplier')
+    
+    KIND_TAGS = frozenset({HEAL})
     
-    def __init__(self, name: str, mp_cost: int, base_power: int, stat: str, multiplier: float = 1.0, cooldown: int = 0):
-        super().__init__(name, mp_cost, cooldown)
+    def __init__(self, name: str, mp_cost: int, base_power: int, stat: str, multiplier: float = 1.0, cooldown: int = 0,
+                 tags: Iterable[str] = ()):
+        super().__init__(name, mp_cost, cooldown, tags)
         self.base_power = base_power
         self.stat = stat
         self.multiplier = multiplier
     
-    def use(self, caster: 'Character', targets: List['Character']) -> str:
+    def use(self, caster: 'Character', targets: List['Character']) -> ActionResult:
         if not targets:
-            return "Нет целей для лечения"
+            return ActionFailure(caster, "Нет целей для лечения")
         
         if len(targets) == 1:
             # Одиночное лечение
             target = targets[0]
             stat_value = getattr(caster, self.stat)
-            heal = int((self.base_power + stat_value) * self.multiplier * random.uniform(0.9, 1.1))
+            heal = int((self.base_power + stat_value) * self.multiplier * caster.rng.uniform(0.9, 1.1))
             old_hp = target.hp
             target.hp += heal
             actual_heal = target.hp - old_hp
-            return f"{caster.name} использует {self.name} на {target.name} и восстанавливает {actual_heal} HP"
+            return ActionResult(SKILL_HEAL, caster, (target,), (actual_heal,), heal - actual_heal, skill=self)
         else:
             # Массовое лечение
             stat_value = getattr(caster, self.stat)
-            heal = int((self.base_power + stat_value) * self.multiplier * random.uniform(0.8, 1.0))
-            results = []
+            heal = int((self.base_power + stat_value) * self.multiplier * caster.rng.uniform(0.8, 1.0))
+            healed = []
+            amounts = []
             for target in targets:
                 if target.is_alive:
                     old_hp = target.hp
                     target.hp += heal
-                    actual_heal = target.hp - old_hp
-                    results.append(f"{target.name} +{actual_heal} HP")
-            return f"{caster.name} использует {self.name}: {', '.join(results)}"
+                    healed.append(target)
+                    amounts.append(target.hp - old_hp)
+            overheal = heal * len(healed) - sum(amounts)
+            return ActionResult(SKILL_MASS_HEAL, caster, healed, amounts, overheal, skill=self)
 
 class EffectSkill(Skill):
     """Навык наложения эффектов"""
+    __slots__ = ('stat', 'power', 'duration', 'effect_type')
+    
+    KIND_TAGS = frozenset({EFFECT})
     
     def __init__(self, name: str, mp_cost: int, stat: str, power: float, duration: int, 
-                 effect_type: str = "buff", cooldown: int = 0):
-        super().__init__(name, mp_cost, cooldown)
+                 effect_type: str = "buff", cooldown: int = 0, tags: Iterable[str] = ()):
+        super().__init__(name, mp_cost, cooldown, tags)
         self.stat = stat
         self.power = power
         self.duration = duration
         self.effect_type = effect_type
     
-    def use(self, caster: 'Character', targets: List['Character']) -> str:
+    @property
+    def tags(self) -> FrozenSet[str]:
+        kind = DEBUFF if self.effect_type in DEBUFF_EFFECTS else BUFF
+        return super().tags | {self.effect_type, kind}
+    
+    def use(self, caster: 'Character', targets: List['Character']) -> ActionResult:
         if not targets:
-            return "Нет целей для навыка"
+            return ActionFailure(caster, "Нет целей для навыка")
         
         # Импортируем эффекты внутри метода чтобы избежать циклических импортов
         from effects import PoisonEffect, ShieldEffect, SilenceEffect, RegenerationEffect
@@ -99,15 +162,68 @@ class EffectSkill(Skill):
         
         effect_class = effect_map.get(self.effect_type)
         if not effect_class:
-            return f"Неизвестный тип эффекта: {self.effect_type}"
+            return ActionFailure(caster, f"Неизвестный тип эффекта: {self.effect_type}")
         
-        results = []
+        affected = []
+        applied = []
         for target in targets:
             if target.is_alive:
                 stat_value = getattr(caster, self.stat)
                 effect_power = int(stat_value * self.power)
                 effect = effect_class(effect_power, self.duration)
+                effect.source = caster
                 target.add_effect(effect)
-                results.append(f"{target.name} получает {effect}")
+                affected.append(target)
+                # Длительность запоминается сейчас: эффект будет тикать раньше, чем текст понадобится
+                applied.append((effect.name, effect.duration))
+        
+        return ActionResult(SKILL_EFFECT, caster, affected, applied, skill=self)
+
+SKILL_TYPES = {"damage": DamageSkill, "heal": HealSkill, "effect": EffectSkill}
+
+class SkillCatalog:
+    """Каталог общих неизменяемых навыков, загруженный из JSON
+    
+    Формат файла: {"skills": {id: {"type": "damage"|"heal"|"effect", "tags": [...],
+    ...аргументы конструктора}}, "loadouts": {набор: [id, ...]}}. Наборы компилируются в
+    кортежи один раз, и все персонажи класса получают один и тот же кортеж.
+    """
+    
+    def __init__(self, skills: Dict[str, Skill], loadouts: Dict[str, Tuple[Skill, ...]]):
+        self.skills = skills
+        self.loadouts = loadouts
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SkillCatalog':
+        skills = {}
+        for skill_id, spec in data['skills'].items():
+            spec = dict(spec)
+            skill_class = SKILL_TYPES.get(spec.pop('type', None))
+            if skill_class is None:
+                raise ValueError(f"Неизвестный тип навыка {skill_id}: {data['skills'][skill_id].get('type')}")
+            skills[skill_id] = skill_class(**spec).freeze()
         
-        return f"{caster.name} использует {self.name}: {', '.join(results)}"
\ No newline at end of file
+        loadouts = {}
+        for loadout, skill_ids in data.get('loadouts', {}).items():
+            missing = [skill_id for skill_id in skill_ids if skill_id not in skills]
+            if missing:
+                raise ValueError(f"Набор {loadout} ссылается на неизвестные навыки: {', '.join(missing)}")
+            loadouts[loadout] = tuple(skills[skill_id] for skill_id in skill_ids)
+        return cls(skills, loadouts)
+    
+    @classmethod
+    def load(cls, path: str = DEFAULT_CATALOG_PATH) -> 'SkillCatalog':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+    
+    def get(self, skill_id: str) -> Skill:
+        return self.skills[skill_id]
+    
+    def loadout(self, name: str) -> Tuple[Skill, ...]:
+        """Общий кортеж навыков набора (например, класса персонажа)"""
+        return self.loadouts[name]
+
+@lru_cache(maxsize=None)
+def default_catalog() -> SkillCatalog:
+    """Каталог из data/skills.json, загружается один раз на процесс"""
+    return SkillCatalog.load()
@@ -0,0 +1,201 @@
+import struct
+import zlib
+from typing import Dict, Any, List, Optional
+
+# Компактный двоичный формат снимка боя.
+# Кодирует тот же словарь, что Battle.to_dict, но без ключей и отступов:
+# строки вынесены в общую таблицу, числа упакованы struct, тело сжато zlib.
+
+MAGIC = b'PZB1'
+
+_HEADER = struct.Struct('<4sB')
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_I32 = struct.Struct('<i')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+_BATTLE = struct.Struct('<I?B')            # раунд, бой окончен, флаги (сид, состояние ГСЧ)
+_CHARACTER = struct.Struct('<HHHiiiiiiiiHHH')  # строки, уровень/HP/MP/статы, стратегия, счетчики
+_EFFECT = struct.Struct('<Hiii')           # класс, сила, длительность, остаток щита (-1 - нет)
+
+# Сложность босса: ссылка на строку пресета ("" - нет сложности) или метка
+# _DIFFICULTY_F64 и число <d сразу после записи персонажа. Таблица строк не
+# длиннее 0xFFFF записей, поэтому такой ссылки на строку не бывает.
+_DIFFICULTY_F64 = 0xFFFF
+
+_HAS_SEED = 1
+_HAS_RNG = 2
+_HAS_STASH = 4
+_STACK = struct.Struct('<HI')              # предмет, количество
+
+class _StringTable:
+    def __init__(self):
+        self.strings: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def ref(self, value: str) -> int:
+        if value not in self.index:
+            self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return self.index[value]
+
+def _encode_character(out: bytearray, data: Dict[str, Any], strings: _StringTable):
+    cooldowns = data.get('cooldowns', {})
+    effects = data.get('effects', [])
+    difficulty = data.get('difficulty', "")
+    numeric = not isinstance(difficulty, str)
+    out += _CHARACTER.pack(
+        strings.ref(data['class_name']), strings.ref(data['name']),
+        _DIFFICULTY_F64 if numeric else strings.ref(difficulty),
+        data['level'], int(data['hp']), data['max_hp'], int(data['mp']), data['max_mp'],
+        data['strength'], data['agility'], data['intelligence'],
+        strings.ref(data.get('strategy', "")), len(cooldowns), len(effects))
+    if numeric:
+        out += _F64.pack(difficulty)
+    for skill_name, turns in cooldowns.items():
+        out += _U16.pack(strings.ref(skill_name)) + _I32.pack(turns)
+    for effect in effects:
+        out += _EFFECT.pack(strings.ref(effect['class_name']), effect['power'], effect['duration'],
+                            effect.get('remaining_shield', -1))
+
+def _decode_character(view: memoryview, offset: int, strings: List[str]):
+    (class_ref, name_ref, difficulty_ref, level, hp, max_hp, mp, max_mp, strength, agility,
+     intelligence, strategy_ref, cooldown_count, effect_count) = _CHARACTER.unpack_from(view, offset)
+    offset += _CHARACTER.size
+    data = {
+        'class_name': strings[class_ref], 'name': strings[name_ref], 'level': level,
+        'hp': hp, 'max_hp': max_hp, 'mp': mp, 'max_mp': max_mp,
+        'strength': strength, 'agility': agility, 'intelligence': intelligence
+    }
+    if difficulty_ref == _DIFFICULTY_F64:
+        (data['difficulty'],) = _F64.unpack_from(view, offset)
+        offset += _F64.size
+    elif strings[difficulty_ref]:
+        data['difficulty'] = strings[difficulty_ref]
+    if strings[strategy_ref]:
+        data['strategy'] = strings[strategy_ref]
+
+    cooldowns = {}
+    for _ in range(cooldown_count):
+        (skill_ref,) = _U16.unpack_from(view, offset)
+        (turns,) = _I32.unpack_from(view, offset + _U16.size)
+        cooldowns[strings[skill_ref]] = turns
+        offset += _U16.size + _I32.size
+    data['cooldowns'] = cooldowns
+
+    effects = []
+    for _ in range(effect_count):
+        effect_ref, power, duration, remaining_shield = _EFFECT.unpack_from(view, offset)
+        offset += _EFFECT.size
+        effect = {'class_name': strings[effect_ref], 'power': power, 'duration': duration}
+        if remaining_shield >= 0:
+            effect['remaining_shield'] = remaining_shield
+        effects.append(effect)
+    data['effects'] = effects
+    return data, offset
+
+def encode_state(state: Dict[str, Any], compress: bool = True) -> bytes:
+    """Упаковка словаря Battle.to_dict в байты"""
+    strings = _StringTable()
+    body = bytearray()
+
+    seed = state.get('seed')
+    rng_state = state.get('rng_state')
+    stash = state.get('stash')
+    flags = ((_HAS_SEED if seed is not None else 0) | (_HAS_RNG if rng_state is not None else 0)
+             | (_HAS_STASH if stash is not None else 0))
+    body += _BATTLE.pack(state['round'], state['is_battle_over'], flags)
+    body += _U16.pack(strings.ref(state.get('battle_id') or ""))
+    if seed is not None:
+        body += _I64.pack(seed)
+
+    body += _U16.pack(len(state['party']))
+    for char in state['party']:
+        _encode_character(body, char, strings)
+    _encode_character(body, state['boss'], strings)
+
+    if rng_state is not None:
+        version, internal, gauss = rng_state
+        body += _U8.pack(version) + _U16.pack(len(internal))
+        body += struct.pack(f'<{len(internal)}I', *internal)
+        body += _U8.pack(gauss is not None) + _F64.pack(gauss or 0.0)
+
+    if stash is not None:
+        body += _U16.pack(len(stash))
+        for item_id, count in stash.items():
+            body += _STACK.pack(strings.ref(item_id), count)
+
+    table = bytearray(_U16.pack(len(strings.strings)))
+    for value in strings.strings:
+        encoded = value.encode('utf-8')
+        table += _U16.pack(len(encoded)) + encoded
+
+    payload = bytes(table + body)
+    if compress:
+        payload = zlib.compress(payload, 1)
+    return _HEADER.pack(MAGIC, int(compress)) + payload
+
+def decode_state(data: bytes) -> Dict[str, Any]:
+    """Распаковка байтов encode_state обратно в словарь Battle.to_dict"""
+    magic, compressed = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Неверный формат снимка боя")
+    payload = data[_HEADER.size:]
+    if compressed:
+        payload = zlib.decompress(payload)
+    view = memoryview(payload)
+
+    (count,) = _U16.unpack_from(view, 0)
+    offset = _U16.size
+    strings = []
+    for _ in range(count):
+        (length,) = _U16.unpack_from(view, offset)
+        offset += _U16.size
+        strings.append(bytes(view[offset:offset + length]).decode('utf-8'))
+        offset += length
+
+    round_number, is_battle_over, flags = _BATTLE.unpack_from(view, offset)
+    offset += _BATTLE.size
+    (battle_id_ref,) = _U16.unpack_from(view, offset)
+    offset += _U16.size
+    seed: Optional[int] = None
+    if flags & _HAS_SEED:
+        (seed,) = _I64.unpack_from(view, offset)
+        offset += _I64.size
+
+    (party_size,) = _U16.unpack_from(view, offset)
+    offset += _U16.size
+    party = []
+    for _ in range(party_size):
+        char, offset = _decode_character(view, offset, strings)
+        party.append(char)
+    boss, offset = _decode_character(view, offset, strings)
+
+    state = {
+        'round': round_number,
+        'party': party,
+        'boss': boss,
+        'is_battle_over': is_battle_over,
+        'seed': seed,
+        'battle_id': strings[battle_id_ref] or None
+    }
+    if flags & _HAS_RNG:
+        (version,) = _U8.unpack_from(view, offset)
+        (length,) = _U16.unpack_from(view, offset + _U8.size)
+        offset += _U8.size + _U16.size
+        internal = struct.unpack_from(f'<{length}I', view, offset)
+        offset += 4 * length
+        (has_gauss,) = _U8.unpack_from(view, offset)
+        (gauss,) = _F64.unpack_from(view, offset + _U8.size)
+        state['rng_state'] = (version, tuple(internal), gauss if has_gauss else None)
+        offset += _U8.size + _F64.size
+    if flags & _HAS_STASH:
+        (stack_count,) = _U16.unpack_from(view, offset)
+        offset += _U16.size
+        stash = {}
+        for _ in range(stack_count):
+            item_ref, count = _STACK.unpack_from(view, offset)
+            offset += _STACK.size
+            stash[strings[item_ref]] = count
+        state['stash'] = stash
+    return state
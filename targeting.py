@@ -0,0 +1,140 @@
+import heapq
+from typing import Iterator, List, Optional, Sequence
+
+from core import Character, RandomSource
+
+# Индексы для выбора целей в больших рейдах.
+# TargetIndex подписывается на изменения HP участников (add_watcher, до
+# detach) и поддерживает число живых, кучу для самого раненого и дерево
+# Фенвика для выборки случайного живого. Выбор цели и проверка конца боя стоят
+# O(log n) или O(1) вместо прохода по всей пати.
+#
+# Функции alive_targets/lowest_hp/random_alive/alive_count принимают и
+# TargetIndex, и обычный список персонажей (тогда - проходом по списку), и
+# дают одинаковый результат при одинаковом ГСЧ.
+
+class TargetIndex:
+    """Поддерживаемые индексы по живым участникам одной стороны боя
+
+    Итерация, len и индексация - по всем участникам в исходном порядке,
+    поэтому индекс можно передавать везде, где ожидается список целей.
+    """
+
+    def __init__(self, members: Sequence[Character]):
+        self.members: List[Character] = list(members)
+        self._position = {char: i for i, char in enumerate(self.members)}
+        self.rebuild()
+
+    def detach(self):
+        """Отписка от участников (Battle.close); rebuild подписывает заново"""
+        for char in self.members:
+            char.remove_watcher(self)
+
+    def rebuild(self):
+        """Пересчет всех индексов (после прямой записи состояния, например Battle.rewind)"""
+        members = self.members
+        # Подписка заново: после detach (завершенный бой) индекс снова следит за HP
+        self.detach()
+        for char in members:
+            char.add_watcher(self)
+        size = len(members)
+        self._alive = bytearray(1 if char._hp > 0 else 0 for char in members)
+        self.alive_count = sum(self._alive)
+        # Дерево Фенвика по флагам живых: k-й живой за O(log n)
+        tree = [0] * (size + 1)
+        for i, flag in enumerate(self._alive, 1):
+            tree[i] += flag
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top = 1 << (size.bit_length() - 1) if size else 0
+        # Куча (hp, позиция); устаревшие записи отбрасываются при чтении
+        self._heap = [(char._hp, i) for i, char in enumerate(members) if char._hp > 0]
+        heapq.heapify(self._heap)
+
+    def __iter__(self) -> Iterator[Character]:
+        return iter(self.members)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __getitem__(self, index):
+        return self.members[index]
+
+    def on_stat_changed(self, character: Character, stat: str):
+        if stat != 'hp':
+            return
+        position = self._position[character]
+        hp = character._hp
+        alive = hp > 0
+        if alive != self._alive[position]:
+            self._alive[position] = alive
+            delta = 1 if alive else -1
+            self.alive_count += delta
+            tree = self._tree
+            i = position + 1
+            while i < len(tree):
+                tree[i] += delta
+                i += i & -i
+        if alive:
+            heap = self._heap
+            heapq.heappush(heap, (hp, position))
+            if len(heap) > 4 * len(self.members) + 64:
+                self._heap = [entry for entry in heap if self.members[entry[1]]._hp == entry[0]]
+                heapq.heapify(self._heap)
+
+    def alive(self) -> List[Character]:
+        """Живые участники в исходном порядке"""
+        return [char for char in self.members if char._hp > 0]
+
+    def lowest_hp(self) -> Optional[Character]:
+        """Живой участник с наименьшим HP (при равенстве - первый по порядку)"""
+        heap = self._heap
+        members = self.members
+        while heap:
+            hp, position = heap[0]
+            if members[position]._hp == hp:
+                return members[position]
+            heapq.heappop(heap)
+        return None
+
+    def nth_alive(self, k: int) -> Character:
+        """k-й (с нуля) живой участник в исходном порядке"""
+        tree = self._tree
+        position = 0
+        step = self._top
+        while step:
+            following = position + step
+            if following < len(tree) and tree[following] <= k:
+                position = following
+                k -= tree[following]
+            step >>= 1
+        return self.members[position]
+
+    def random_alive(self, rng: RandomSource) -> Optional[Character]:
+        """Случайный живой участник; то же извлечение ГСЧ, что rng.choice(alive())"""
+        if not self.alive_count:
+            return None
+        return self.nth_alive(rng.randrange(self.alive_count))
+
+def alive_targets(targets: Sequence[Character]) -> List[Character]:
+    if isinstance(targets, TargetIndex):
+        return targets.alive()
+    return [t for t in targets if t.is_alive]
+
+def alive_count(targets: Sequence[Character]) -> int:
+    if isinstance(targets, TargetIndex):
+        return targets.alive_count
+    return sum(1 for t in targets if t.is_alive)
+
+def lowest_hp(targets: Sequence[Character]) -> Optional[Character]:
+    if isinstance(targets, TargetIndex):
+        return targets.lowest_hp()
+    return min(alive_targets(targets), key=lambda t: t.hp, default=None)
+
+def random_alive(targets: Sequence[Character], rng: RandomSource) -> Optional[Character]:
+    if isinstance(targets, TargetIndex):
+        return targets.random_alive(rng)
+    alive = alive_targets(targets)
+    return alive[rng.randrange(len(alive))] if alive else None
@@ -0,0 +1,138 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+import sys
+from contextlib import redirect_stdout
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import archive
+from archive import ROW_COLUMNS, SnapshotArchive
+from battle import Battle, BattleLogger
+from characters import Boss
+from effects import PoisonEffect, ShieldEffect
+from utils import create_default_party
+
+def make_battle(seed):
+    return Battle(create_default_party(), Boss("Босс", 5, "normal"), seed=seed)
+
+class TestSnapshotArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "runs.archive")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fill(self, battles=5, rounds=3, buffer_rows=65536):
+        expected = {}
+        with SnapshotArchive(self.path, 'a', buffer_rows=buffer_rows) as writer:
+            for seed in range(battles):
+                battle = make_battle(seed)
+                for _ in range(rounds):
+                    writer.append_battle(battle)
+                    expected[(battle.battle_id, battle.round)] = [char.hp for char in battle.party + [battle.boss]]
+                    if battle.run_round(None):
+                        break
+                    battle.round += 1
+        return expected
+
+    def test_select_column(self):
+        expected = self.fill()
+        with SnapshotArchive(self.path) as reader:
+            self.assertEqual(len(reader), len(expected))
+            boss_hp = {battle_id: hp for battle_id, _, _, hp in reader.select('hp', round_number=2, boss=True)}
+            self.assertEqual(boss_hp, {battle_id: hps[-1] for (battle_id, round_number), hps in expected.items()
+                                       if round_number == 2})
+            warrior = list(reader.select('hp', slot=0))
+            self.assertEqual([hp for _, _, _, hp in warrior], [hps[0] for hps in expected.values()])
+            self.assertEqual(len(reader.column('hp')), 4 * len(expected))
+            self.assertIsInstance(reader.column('hp'), memoryview)
+
+    def test_snapshot_lookup_and_effects(self):
+        battle = make_battle(1)
+        battle.boss.add_effect(PoisonEffect(7, 3))
+        battle.boss.add_effect(PoisonEffect(5, 4))
+        battle.party[0].add_effect(ShieldEffect(40, 2))
+        with SnapshotArchive(self.path, 'a') as writer:
+            writer.append_battle(battle)
+        with SnapshotArchive(self.path) as reader:
+            rows = reader.snapshot(battle.battle_id, 1)
+            self.assertIsNone(reader.snapshot(battle.battle_id, 2))
+            self.assertIsNone(reader.snapshot("нет такого", 1))
+        self.assertEqual([row['name'] for row in rows], [char.name for char in battle.party] + ["Босс"])
+        self.assertTrue(rows[-1]['boss'])
+        self.assertEqual((rows[-1]['poison'], rows[-1]['poison_turns']), (12, 4))
+        self.assertEqual(rows[0]['shield'], battle.party[0].effects.first(ShieldEffect).remaining_shield)
+        self.assertEqual(rows[1]['class'], "Mage")
+        self.assertEqual(set(rows[0]), set(ROW_COLUMNS))
+
+    def test_append_reopen_and_recover(self):
+        self.fill(battles=2, rounds=2, buffer_rows=4)
+        with SnapshotArchive(self.path) as reader:
+            committed = len(reader)
+        # Недописанный хвост: лишние байты колонки строк и обрывок строки справочника
+        with open(os.path.join(self.path, "rows.hp.col"), 'ab') as f:
+            f.write(b"\x01\x02")
+        with open(os.path.join(self.path, "battles.jsonl"), 'a', encoding='utf-8') as f:
+            f.write('"обрыв')
+        with SnapshotArchive(self.path) as reader:
+            self.assertEqual(len(reader), committed)
+        with SnapshotArchive(self.path, 'a') as writer:
+            writer.append_battle(make_battle(99))
+        with SnapshotArchive(self.path) as reader:
+            self.assertEqual(len(reader), committed + 1)
+            self.assertEqual(reader.battle_ids[-1], "99")
+            self.assertEqual(len(reader.column('hp')), 4 * (committed + 1))
+            self.assertIsNotNone(reader.snapshot("99", 1))
+
+    def test_round_index(self):
+        expected = self.fill(battles=4, rounds=3, buffer_rows=8)
+        round_two = sorted(battle_id for battle_id, round_number in expected if round_number == 2)
+        index_file = os.path.join(self.path, "index.round.col")
+        with SnapshotArchive(self.path) as reader:
+            self.assertEqual(sorted(battle_id for battle_id, *_ in reader.select('hp', 2, boss=True)), round_two)
+        
+        # Без индекса (сбой до его записи) - проход по таблице снимков, дозапись перестраивает индекс
+        os.remove(index_file)
+        with SnapshotArchive(self.path) as reader:
+            self.assertIsNone(reader._round_index())
+            self.assertEqual(sorted(battle_id for battle_id, *_ in reader.select('hp', 2, boss=True)), round_two)
+        with SnapshotArchive(self.path, 'a'):
+            pass
+        with SnapshotArchive(self.path) as reader:
+            self.assertEqual(len(reader._round_index()), len(expected))
+            self.assertEqual(list(reader.select('hp', 99)), [])
+
+    def test_append_mode_replaces_mappings(self):
+        with SnapshotArchive(self.path, 'a') as archive:
+            for seed in range(5):
+                archive.append_battle(make_battle(seed))
+                self.assertEqual(len(list(archive.select('hp', 1, boss=True))), seed + 1)
+                self.assertLessEqual(len(archive._maps), 6)
+
+    def test_import_checkpoint_files(self):
+        battle = make_battle(4)
+        battle.run_battle(BattleLogger.headless(), autosave=False)
+        state_file = os.path.join(self.tmp.name, "final_battle_result.json")
+        battle.save_state(state_file)
+        archive.main(['import', self.path, state_file])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            archive.main(['select', self.path, 'hp', '--boss'])
+        self.assertEqual(json.loads(output.getvalue()), ["4", battle.round, 3, battle.boss.hp])
+
+    def test_empty_and_invalid(self):
+        with SnapshotArchive(self.path, 'a'):
+            pass
+        with SnapshotArchive(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader.select('hp')), [])
+            with self.assertRaises(ValueError):
+                reader.append_state({'round': 1, 'party': [], 'boss': {}})
+        with self.assertRaises(ValueError):
+            SnapshotArchive(self.path, 'w')
+
+if __name__ == '__main__':
+    unittest.main()
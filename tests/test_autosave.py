@@ -0,0 +1,71 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from autosave import AutosaveWriter, diff_state, apply_delta, load_checkpoint
+from battle import Battle, BattleLogger
+from characters import Warrior, Mage, Healer, Boss
+
+class TestDelta(unittest.TestCase):
+    def test_diff_and_apply(self):
+        old = {'round': 1, 'party': [{'hp': 10, 'cooldowns': {'a': 1}}], 'rng': [1, 2, 3]}
+        new = {'round': 2, 'party': [{'hp': 7, 'cooldowns': {}}], 'rng': [4, 5, 6], 'extra': True}
+        changes, removed = diff_state(old, new)
+        self.assertIn([['party', 0, 'hp'], 7], changes)
+        self.assertIn(['party', 0, 'cooldowns', 'a'], removed)
+        delta = {'changes': changes, 'removed': removed}
+        self.assertEqual(apply_delta(json.loads(json.dumps(old)), delta), new)
+
+class TestAutosaveWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.battle = Battle([Warrior("Воин", 3), Mage("Маг", 3), Healer("Лекарь", 3)],
+                             Boss("Босс", 3, "easy"), seed=2)
+        self.logger = BattleLogger.headless()
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def test_delta_checkpoints_restore_state(self):
+        states = {}
+        with AutosaveWriter(self.tmpdir.name, interval=1, full_every=3, retention=100) as writer:
+            for _ in range(5):
+                if self.battle.run_round(self.logger):
+                    break
+                writer.checkpoint(self.battle)
+                states[self.battle.round] = json.loads(json.dumps(self.battle.to_dict()))
+        
+        names = [os.path.basename(path) for path in writer.files]
+        self.assertTrue(names[0].endswith("_round_2.json"))
+        self.assertTrue(names[1].endswith(".delta.json"))
+        for path in writer.files:
+            restored = load_checkpoint(path)
+            self.assertEqual(restored, states[restored['round']])
+        
+        # Из дельты восстанавливается бой целиком
+        battle = Battle.from_dict(load_checkpoint(writer.files[-1]))
+        self.assertEqual(battle.round, self.battle.round)
+    
+    def test_retention_drops_whole_chains(self):
+        writer = AutosaveWriter(self.tmpdir.name, interval=1, full_every=2, retention=4)
+        with writer:
+            for _ in range(8):
+                if self.battle.run_round(self.logger):
+                    break
+                writer.checkpoint(self.battle)
+        self.assertLessEqual(len(writer.files), 4)
+        self.assertEqual(sorted(os.path.join(self.tmpdir.name, name) for name in os.listdir(self.tmpdir.name)),
+                         sorted(writer.files))
+        self.assertFalse(writer.files[0].endswith(".delta.json"))
+    
+    def test_run_battle_with_writer(self):
+        writer = AutosaveWriter(self.tmpdir.name, prefix="test", interval=2)
+        self.battle.run_battle(logger=self.logger, autosave=writer)
+        self.assertEqual(len(writer.files), len(os.listdir(self.tmpdir.name)))
+        self.assertTrue(all(os.path.basename(path).startswith("test_round_") for path in writer.files))
+
+if __name__ == '__main__':
+    unittest.main()
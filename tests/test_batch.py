@@ -0,0 +1,75 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import batch
+from simulation import simulate
+from utils import DEFAULT_PARTY, create_boss, create_default_party
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+def make_boss():
+    return create_boss({'level': 5, 'difficulty': 'hard'})
+
+def run_main(argv):
+    output = io.StringIO()
+    with redirect_stdout(output):
+        batch.main(argv)
+    return json.loads(output.getvalue())
+
+class TestBatch(unittest.TestCase):
+    def test_json_matches_simulate(self):
+        report = run_main(['--boss', '{"level": 5, "difficulty": "hard"}', '--seed', '5', '--battles', '8'])
+        expected = simulate(create_default_party, make_boss, 8, seed=5, workers=1)
+        self.assertEqual(report['result'], json.loads(json.dumps(expected.to_dict())))
+        self.assertEqual(report['party'], DEFAULT_PARTY)
+        self.assertEqual(report['seed'], 5)
+
+    def test_party_file_stash_and_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            party_file = os.path.join(tmp, "party.json")
+            with open(party_file, 'w', encoding='utf-8') as f:
+                json.dump([{'class': 'warrior', 'name': "Воин", 'level': 5}], f)
+            output = os.path.join(tmp, "result.json")
+            batch.main(['--party', '@' + party_file, '--stash', '{"health_potion": 1}', '--seed', '1',
+                        '--battles', '4', '--workers', '2', '--stats', '--output', output])
+            with open(output, encoding='utf-8') as f:
+                report = json.load(f)
+        self.assertEqual(report['result']['battles'], 4)
+        self.assertIn("Воин", report['result']['stats']['characters'])
+        self.assertIsNone(run_main(['--battles', '1'])['stash'])
+
+    def test_factories_built_once(self):
+        with mock.patch.object(batch, 'make_factories', wraps=batch.make_factories) as make_factories:
+            report = run_main(['--stash', '{"health_potion": 1}', '--seed', '2', '--battles', '2'])
+        self.assertEqual(make_factories.call_count, 1)
+        self.assertEqual(report['result']['battles'], 2)
+
+    def test_invalid_config(self):
+        for argv in (['--party', '[{"class": "rogue", "name": "x"}]'], ['--boss', '{"difficulty": "absurd"}'],
+                     ['--stash', '{"elixir": 1}'], ['--party', '[oops'], ['--battles', '0']):
+            with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                batch.main(argv)
+
+    def test_lazy_imports_and_no_side_effects(self):
+        code = ("import sys, batch; print(','.join(m for m in ('battle', 'simulation', 'characters', 'skills') "
+                "if m in sys.modules))")
+        loaded = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(loaded.stdout.strip(), "")
+        with tempfile.TemporaryDirectory() as tmp:
+            done = subprocess.run([sys.executable, os.path.abspath(os.path.join(ROOT, 'batch.py')),
+                                   '--seed', '2', '--battles', '3'], cwd=tmp, capture_output=True, text=True,
+                                  check=True)
+            self.assertEqual(os.listdir(tmp), [])
+        self.assertEqual(done.stderr, "")
+        self.assertEqual(json.loads(done.stdout)['result']['battles'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,9 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from characters import Warrior, Mage, Boss
-from battle import Battle, TurnOrder
+from characters import Warrior, Mage, Healer, Boss
+from effects import ShieldEffect
+from battle import Battle, TurnOrder, BattleLogger
 from core import Human
 
 class TestTurnOrder(unittest.TestCase):
@@ -39,6 +40,45 @@ class TestTurnOrder(unittest.TestCase):
         self.warrior.hp = 0
         turn_order = TurnOrder(self.characters)
         self.assertEqual(len(turn_order.characters), 2)  # Только живые персонажи
+    
+    def test_round_boundary(self):
+        turn_order = TurnOrder(self.characters)
+        first_round = list(turn_order)
+        second_round = list(turn_order)
+        self.assertEqual(first_round, second_round)
+        self.assertEqual(first_round, turn_order.characters)
+    
+    def test_death_mid_round_skips_character(self):
+        self.warrior.agility, self.mage.agility, self.boss.agility = 30, 20, 10
+        turn_order = TurnOrder(self.characters)
+        self.assertIs(next(turn_order), self.warrior)
+        self.mage.hp = 0
+        self.assertEqual(list(turn_order), [self.boss])
+        self.assertEqual(list(turn_order), [self.warrior, self.boss])
+    
+    def test_agility_change_reprioritizes(self):
+        self.warrior.agility, self.mage.agility, self.boss.agility = 30, 20, 10
+        turn_order = TurnOrder(self.characters)
+        self.assertIs(next(turn_order), self.warrior)
+        self.boss.agility = 50
+        self.warrior.agility = 5
+        self.assertEqual(list(turn_order), [self.boss, self.mage])
+        self.assertEqual(list(turn_order), [self.boss, self.mage, self.warrior])
+    
+    def test_add_character_mid_round(self):
+        self.warrior.agility, self.mage.agility, self.boss.agility = 30, 20, 10
+        turn_order = TurnOrder([self.warrior, self.boss])
+        self.assertIs(next(turn_order), self.warrior)
+        turn_order.add_character(self.mage)
+        self.assertEqual(list(turn_order), [self.mage, self.boss])
+    
+    def test_large_raid(self):
+        raid = [Warrior(f"Воин {i}", 1 + i % 10) for i in range(300)]
+        turn_order = TurnOrder(raid)
+        order = list(turn_order)
+        self.assertEqual(len(order), 300)
+        agilities = [c.agility for c in order]
+        self.assertEqual(agilities, sorted(agilities, reverse=True))
 
 class TestBattle(unittest.TestCase):
     def setUp(self):
@@ -70,13 +110,18 @@ class TestBattle(unittest.TestCase):
         self.assertTrue(os.path.exists("test_save.json"))
         
         # Тест загрузки состояния
-        state = Battle.load_state("test_save.json")
-        self.assertEqual(state['round'], 1)
-        self.assertEqual(len(state['party']), 2)
+        battle = Battle.load_state("test_save.json")
+        self.assertEqual(battle.round, 1)
+        self.assertEqual(len(battle.party), 2)
+        self.assertEqual(battle.to_dict(), self.battle.to_dict())
         
         # Убираем тестовый файл
         os.remove("test_save.json")
     
+    def test_rounds_advance(self):
+        self.battle.run_battle(logger=BattleLogger.headless(), autosave=False)
+        self.assertGreater(self.battle.round, 1)
+    
     def test_apply_effects(self):
         warrior = self.party[0]
         initial_hp = warrior.hp
@@ -87,5 +132,89 @@ class TestBattle(unittest.TestCase):
         # HP не должен измениться без эффектов
         self.assertEqual(warrior.hp, initial_hp)
 
+class TestBattleResume(unittest.TestCase):
+    def setUp(self):
+        self.logger = BattleLogger.headless()
+        self.battle = Battle([Warrior("Воин", 3), Mage("Маг", 3), Healer("Лекарь", 3)],
+                             Boss("Босс", 3, "easy"), seed=5)
+    
+    def play_rounds(self, battle, rounds):
+        for _ in range(rounds):
+            if battle.run_round(self.logger):
+                break
+    
+    def test_restores_characters(self):
+        self.play_rounds(self.battle, 3)
+        restored = Battle.from_dict(self.battle.to_dict())
+        for original, copy in zip(self.battle.party + [self.battle.boss], restored.party + [restored.boss]):
+            self.assertIs(type(copy), type(original))
+            self.assertEqual(copy.to_dict(), original.to_dict())
+    
+    def test_resume_matches_uninterrupted_battle(self):
+        self.play_rounds(self.battle, 3)
+        state = self.battle.to_dict()
+        
+        winner = self.battle.run_battle(logger=self.logger, autosave=False)
+        resumed = Battle.from_dict(state)
+        self.assertEqual(resumed.run_battle(logger=self.logger, autosave=False), winner)
+        self.assertEqual(resumed.to_dict(), self.battle.to_dict())
+    
+    def test_binary_snapshot_round_trip(self):
+        self.play_rounds(self.battle, 4)
+        self.battle.boss.add_effect(ShieldEffect(30, 2))
+        self.battle.save_snapshot("test_snapshot.bin")
+        self.battle.save_state("test_snapshot.json")
+        try:
+            restored = Battle.load_snapshot("test_snapshot.bin")
+            self.assertEqual(restored.to_dict(), self.battle.to_dict())
+            self.assertLess(os.path.getsize("test_snapshot.bin"), os.path.getsize("test_snapshot.json") / 4)
+        finally:
+            os.remove("test_snapshot.bin")
+            os.remove("test_snapshot.json")
+
+    def test_snapshot_keeps_float_difficulty(self):
+        from snapshot import decode_state, encode_state
+        battle = Battle([Warrior("Воин", 3)], Boss("Босс", 5, 1.37), seed=2)
+        state = battle.to_dict()
+        restored = decode_state(encode_state(state))
+        self.assertEqual(restored['boss']['difficulty'], 1.37)
+        self.assertIsInstance(restored['boss']['difficulty'], float)
+        self.assertEqual(Battle.from_dict(restored).to_dict(), state)
+        self.assertEqual(decode_state(encode_state(self.battle.to_dict()))['boss']['difficulty'], "easy")
+
+class TestBattleRNG(unittest.TestCase):
+    def make_battle(self, seed):
+        party = [Warrior("Воин", 3), Mage("Маг", 3)]
+        return Battle(party, Boss("Босс", 5, "normal"), seed=seed)
+    
+    def snapshot(self, battle):
+        return [c.hp for c in battle.party] + [battle.boss.hp]
+    
+    def play(self, battle, logger, turns):
+        for _ in range(turns):
+            if battle.is_battle_over:
+                break
+            # None - граница раунда, следующий вызов начинает новый раунд
+            character = next(battle.turn_order, None) or next(battle.turn_order)
+            battle.run_turn(character, logger)
+    
+    def test_characters_share_battle_rng(self):
+        battle = self.make_battle(1)
+        for char in battle.party + [battle.boss]:
+            self.assertIs(char.rng, battle.rng)
+    
+    def test_interleaved_battles_are_independent(self):
+        logger = BattleLogger(None, echo=False)
+        alone = self.make_battle(11)
+        self.play(alone, logger, 6)
+        
+        first = self.make_battle(11)
+        second = self.make_battle(22)
+        for _ in range(6):
+            self.play(first, logger, 1)
+            self.play(second, logger, 1)
+        
+        self.assertEqual(self.snapshot(first), self.snapshot(alone))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,151 @@
+import json
+import random
+import statistics
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from battle import Battle, BattleLogger
+from battle_stats import BattleStats, QuantileSketch, RunningStats, StatsCollector
+from characters import Boss, Healer, Mage, Warrior
+from items import HEALTH_POTION, Inventory
+from simulation import simulate
+from utils import create_default_party
+
+def make_boss():
+    return Boss("Босс", 5, "normal")
+
+def run(seed, collector=None, stash=None):
+    battle = Battle(create_default_party(), make_boss(), seed=seed, stash=stash)
+    if collector is not None:
+        collector.attach(battle)
+    winner = battle.run_battle(BattleLogger.headless(), autosave=False)
+    return battle, winner
+
+class TestRunningStats(unittest.TestCase):
+    def test_matches_statistics(self):
+        values = [3, 7, 7, 12, 40, 41.5, 55.25]
+        stats = RunningStats()
+        for value in values:
+            stats.add(value)
+        self.assertAlmostEqual(stats.mean, statistics.mean(values))
+        self.assertAlmostEqual(stats.variance, statistics.variance(values))
+        self.assertEqual((stats.min, stats.max), (min(values), max(values)))
+
+    def test_merge_equals_single_pass(self):
+        rng = random.Random(2)
+        values = [rng.uniform(0, 100) for _ in range(500)]
+        whole, left, right = RunningStats(), RunningStats(), RunningStats()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (left if i < 123 else right).add(value)
+        left.merge(right)
+        self.assertEqual(left.count, whole.count)
+        self.assertAlmostEqual(left.mean, whole.mean)
+        self.assertAlmostEqual(left.variance, whole.variance)
+        self.assertAlmostEqual(RunningStats.from_dict(left.to_dict()).variance, whole.variance)
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_relative_accuracy(self):
+        rng = random.Random(3)
+        values = sorted(rng.expovariate(0.01) for _ in range(5000))
+        sketch = QuantileSketch(alpha=0.02)
+        for value in values:
+            sketch.add(value)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertLess(abs(sketch.quantile(q) - exact), 0.021 * exact)
+
+    def test_fixed_memory_and_merge(self):
+        sketch, other = QuantileSketch(max_bins=64), QuantileSketch(max_bins=64)
+        for value in range(1, 20000):
+            (sketch if value % 2 else other).add(value)
+        other.add(0)
+        self.assertLessEqual(len(sketch.bins), 64)
+        sketch.merge(other)
+        self.assertLessEqual(len(sketch.bins), 64)
+        self.assertEqual(sketch.count, 20000)
+        # Слияние младших корзин не трогает верхние квантили
+        self.assertLess(abs(sketch.quantile(0.99) - 19800), 0.03 * 19800)
+        restored = QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+        self.assertEqual(restored.quantile(0.5), sketch.quantile(0.5))
+        with self.assertRaises(ValueError):
+            sketch.merge(QuantileSketch(alpha=0.05))
+
+class TestStatsCollector(unittest.TestCase):
+    def test_does_not_change_battle(self):
+        plain, plain_winner = run(4)
+        collected, winner = run(4, StatsCollector())
+        self.assertEqual(plain_winner, winner)
+        self.assertEqual(plain.to_dict(), collected.to_dict())
+
+    def test_totals_match_battle(self):
+        collector = StatsCollector()
+        battle, _ = run(5, collector)
+        report = collector.flush()
+        self.assertIsNone(battle.stats)
+        self.assertEqual(report.battles, 1)
+        boss = report.characters["Босс"]
+        # Весь урон по боссу нанесен пати
+        dealt_by_party = sum(report.characters[char.name].metrics['damage_dealt'].mean for char in battle.party)
+        self.assertEqual(dealt_by_party, boss.metrics['damage_taken'].mean)
+        self.assertGreaterEqual(boss.metrics['damage_taken'].mean, battle.boss.max_hp - battle.boss.hp)
+        for char in battle.party + [battle.boss]:
+            stats = report.characters[char.name]
+            self.assertEqual(stats.deaths, 0 if char.is_alive else 1)
+            if not char.is_alive:
+                self.assertLessEqual(stats.death_round.mean, battle.round)
+            self.assertEqual(stats.class_name, char.__class__.__name__)
+            spent = sum(skill.mp_cost * uses for skill in char.skills
+                        for name, uses in stats.skill_uses.items() if skill.name == name)
+            self.assertEqual(stats.metrics['mp_spent'].mean, spent)
+
+    def test_heal_and_overheal(self):
+        collector = StatsCollector()
+        healer, warrior = Healer("Лекарь", 5), Warrior("Воин", 5)
+        battle = Battle([healer, warrior], make_boss(), seed=1, stash=Inventory({HEALTH_POTION: 1}))
+        collector.attach(battle)
+        warrior.hp -= 10
+        battle.finish_turn(healer, HEALTH_POTION, [warrior], None)
+        report = collector.flush()
+        healer_stats = report.characters["Лекарь"]
+        self.assertEqual(healer_stats.metrics['healing_done'].mean, 10)
+        self.assertEqual(healer_stats.metrics['overheal'].mean, HEALTH_POTION.heal_amount - 10)
+        self.assertEqual(report.characters["Воин"].metrics['healing_received'].mean, 10)
+
+    def test_poison_is_credited_to_caster(self):
+        collector = StatsCollector()
+        mage = Mage("Маг", 5)
+        battle = Battle([mage], make_boss(), seed=1)
+        collector.attach(battle)
+        poison = [skill.name for skill in mage.skills].index("Отравление")
+        battle.finish_turn(mage, poison, [battle.boss], None)
+        hp = battle.boss.hp
+        battle.apply_start_of_turn_effects(battle.boss)
+        ticked = hp - battle.boss.hp
+        self.assertGreater(ticked, 0)
+        report = collector.flush()
+        self.assertEqual(report.characters["Маг"].metrics['damage_dealt'].mean, ticked)
+        self.assertEqual(report.characters["Босс"].metrics['damage_taken'].mean, ticked)
+
+    def test_simulation_merges_workers(self):
+        single = simulate(create_default_party, make_boss, 12, seed=9, workers=1, stats=True)
+        pooled = simulate(create_default_party, make_boss, 12, seed=9, workers=2, stats=True)
+        self.assertEqual(single.stats.battles, 12)
+        self.assertEqual(pooled.stats.battles, 12)
+        for name, stats in single.stats.characters.items():
+            other = pooled.stats.characters[name]
+            self.assertEqual(stats.battles, other.battles)
+            self.assertEqual(stats.deaths, other.deaths)
+            self.assertEqual(stats.skill_uses, other.skill_uses)
+            dealt, other_dealt = stats.metrics['damage_dealt'], other.metrics['damage_dealt']
+            self.assertAlmostEqual(dealt.mean, other_dealt.mean)
+            self.assertAlmostEqual(dealt.stats.variance, other_dealt.stats.variance)
+        data = json.loads(json.dumps(single.to_dict()))
+        self.assertEqual(BattleStats.from_dict(data['stats']).to_dict(), single.stats.to_dict())
+        self.assertIn("Боев: 12", str(single.stats))
+        self.assertIsNone(simulate(create_default_party, make_boss, 2, seed=9, workers=1).stats)
+
+if __name__ == '__main__':
+    unittest.main()
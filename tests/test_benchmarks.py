@@ -0,0 +1,29 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from bench_combat import compare, metric
+
+class TestCompare(unittest.TestCase):
+    def report(self, **values):
+        results = {}
+        for name, (value, higher_is_better) in values.items():
+            results[name] = metric(value, 'ops/s', higher_is_better)
+        return {'results': results}
+    
+    def test_flags_regression_over_threshold(self):
+        baseline = self.report(speed=(100.0, True), memory=(1000.0, False))
+        current = self.report(speed=(85.0, True), memory=(1050.0, False))
+        rows = {row['name']: row for row in compare(baseline, current, threshold=0.1)}
+        self.assertTrue(rows['speed']['regression'])
+        self.assertFalse(rows['memory']['regression'])
+        self.assertAlmostEqual(rows['memory']['change'], -0.05)
+    
+    def test_improvement_is_not_regression(self):
+        baseline = self.report(memory=(1000.0, False))
+        current = self.report(memory=(500.0, False))
+        self.assertFalse(compare(baseline, current)[0]['regression'])
+
+if __name__ == '__main__':
+    unittest.main()
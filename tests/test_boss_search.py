@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from battle import Battle, BattleLogger
+from boss_search import SearchStrategy
+from characters import Warrior, Mage, Healer, Boss
+
+def make_battle(seed):
+    return Battle([Warrior("Воин", 3), Mage("Маг", 3), Healer("Лекарь", 3)], Boss("Босс", 3, "normal"), seed=seed)
+
+class TestCaptureRewind(unittest.TestCase):
+    def test_round_trip(self):
+        battle = make_battle(5)
+        battle.run_round(None)
+        before = battle.to_dict()
+        state = battle.capture()
+        for _ in range(4):
+            if battle.run_round(None):
+                break
+        self.assertNotEqual(battle.to_dict(), before)
+        battle.rewind(state)
+        self.assertEqual(battle.to_dict(), before)
+    
+    def test_rewind_continues_identically(self):
+        battle = make_battle(8)
+        state = battle.capture()
+        while not battle.run_round(None):
+            pass
+        first = battle.to_dict()
+        battle.rewind(state)
+        while not battle.run_round(None):
+            pass
+        self.assertEqual(battle.to_dict(), first)
+
+class TestSearchStrategy(unittest.TestCase):
+    def setUp(self):
+        self.battle = make_battle(3)
+        self.search = SearchStrategy(rollouts=60).attach(self.battle)
+    
+    def test_legal_action_and_rng_untouched(self):
+        boss = self.battle.boss
+        rng_state = self.battle.rng.getstate()
+        before = self.battle.to_dict()
+        skill_index, targets = boss.decide(self.battle.party)
+        self.assertEqual(self.battle.rng.getstate(), rng_state)
+        self.assertEqual(self.battle.to_dict(), before)
+        self.assertIn((skill_index, targets), self.search.options(boss, self.battle.party))
+        self.assertEqual(sum(visits for _, visits, _ in self.search.last_stats), 60)
+    
+    def test_battle_completes(self):
+        self.search.rollouts = 20
+        logger = BattleLogger.headless()
+        while not self.battle.run_round(logger):
+            pass
+        self.assertTrue(self.battle.is_battle_over)
+        self.assertIs(self.battle.boss.current_strategy, self.search)
+    
+    def test_rollout_throughput(self):
+        self.search.rollouts = 300
+        start = time.perf_counter()
+        self.battle.boss.decide(self.battle.party)
+        elapsed = time.perf_counter() - start
+        # Сотни доигрываний на ход должны укладываться в доли секунды
+        self.assertLess(elapsed, 2.0)
+
+if __name__ == '__main__':
+    unittest.main()
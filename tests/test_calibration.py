@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from characters import Boss
+import calibration
+import simulation
+from calibration import (SequentialTest, CalibrationPoint, best_point, calibrate, calibrate_level, max_multiplier,
+                         TOO_EASY, TOO_HARD, ON_TARGET)
+
+PARTY = [
+    {"class": "warrior", "name": "Воин", "level": 5},
+    {"class": "mage", "name": "Маг", "level": 5},
+    {"class": "healer", "name": "Целитель", "level": 5}
+]
+
+class TestSequentialTest(unittest.TestCase):
+    def test_decisions(self):
+        cases = ((95, TOO_EASY), (5, TOO_HARD), (50, ON_TARGET))
+        for wins, expected in cases:
+            test = SequentialTest(0.5, 0.1)
+            for _ in range(20):
+                test.update(wins, 100)
+                if test.decision() is not None:
+                    break
+            self.assertEqual(test.decision(), expected)
+    
+    def test_undecided_on_small_sample(self):
+        test = SequentialTest(0.5, 0.05)
+        test.update(3, 5)
+        self.assertIsNone(test.decision())
+        self.assertEqual(test.battles, 5)
+
+class TestCalibration(unittest.TestCase):
+    def test_numeric_difficulty(self):
+        boss = Boss("Босс", 5, 1.15)
+        self.assertEqual(boss.max_hp, int(500 * 1.15) + 5 * 50)
+        Boss("Босс", 5, max_multiplier(5))
+    
+    def test_calibrate_level(self):
+        history = calibrate_level(PARTY, 5, target=0.5, tolerance=0.1, batch=100,
+                                  max_battles=400, seed=1, workers=1)
+        final = history[-1]
+        self.assertGreater(final.multiplier, 0)
+        self.assertLessEqual(final.multiplier, max_multiplier(5))
+        self.assertLessEqual(final.battles, 400)
+        if final.verdict == ON_TARGET:
+            self.assertAlmostEqual(final.win_rate, 0.5, delta=0.15)
+
+    def test_level_without_admissible_multipliers(self):
+        self.assertLess(max_multiplier(25), 0)
+        with self.assertRaises(ValueError):
+            calibrate_level(PARTY, 25, workers=1)
+    
+    def test_unreachable_target_raises(self):
+        # Очень слабый босс: доля побед выше коридора при любом множителе из диапазона
+        with self.assertRaises(ValueError):
+            calibrate_level(PARTY, 1, target=0.2, tolerance=0.05, low=0.3, high=0.35,
+                            batch=50, max_battles=100, seed=1, workers=1)
+    
+    def test_best_point_prefers_accepted_candidate(self):
+        history = [CalibrationPoint(5, 0.6, ON_TARGET, 0.42, 100),
+                   CalibrationPoint(5, 0.55, ON_TARGET, 0.49, 100),
+                   CalibrationPoint(5, 0.5, TOO_EASY, 0.5, 100)]
+        self.assertIs(best_point(history, 0.5), history[1])
+        with self.assertRaises(ValueError):
+            best_point(history[2:], 0.5)
+    
+    def test_one_pool_for_all_batches(self):
+        pools = []
+
+        class CountingPool(calibration.ProcessPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                pools.append(self)
+                super().__init__(*args, **kwargs)
+
+        with mock.patch.object(calibration, 'ProcessPoolExecutor', CountingPool), \
+                mock.patch.object(simulation, 'ProcessPoolExecutor', CountingPool):
+            points = calibrate(PARTY, (4, 5), target=0.5, tolerance=0.15, batch=20,
+                               max_battles=60, resolution=0.1, seed=1, workers=2)
+        self.assertEqual(len(points), 2)
+        self.assertEqual(len(pools), 1)
+
+if __name__ == '__main__':
+    unittest.main()
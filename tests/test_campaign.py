@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from concurrent.futures import ProcessPoolExecutor
+
+from battle import Battle, BattleLogger
+from campaign import Campaign, battle_seed, derive_seed, merge_blocks, merge_shards, run_blocks, run_shard
+from characters import Boss
+from utils import create_default_party
+
+def make_boss():
+    return Boss("Босс", 5, "normal")
+
+def run_node(campaign_data, shard, shards, filename):
+    """Отдельный "узел": свой процесс, свой шард"""
+    run_shard(Campaign.from_dict(campaign_data), shard, shards, filename,
+              create_default_party, make_boss, stats=True)
+    return filename
+
+class TestSeedDerivation(unittest.TestCase):
+    def test_stable_and_independent(self):
+        self.assertEqual(derive_seed(7, 'battle', 3), derive_seed(7, 'battle', 3))
+        self.assertEqual(battle_seed(7, 3), derive_seed(7, 'battle', 3))
+        seeds = {battle_seed(campaign, index) for campaign in range(5) for index in range(200)}
+        self.assertEqual(len(seeds), 1000)   # соседние кампании не пересекаются
+        self.assertNotEqual(derive_seed(7, 'a', 'b'), derive_seed(7, 'a/b'))
+        self.assertTrue(all(0 <= seed < 2 ** 63 for seed in seeds))
+
+    def test_battle_replays_from_derived_seed(self):
+        seed = battle_seed(11, 42)
+        first = Battle(create_default_party(), make_boss(), seed=seed)
+        second = Battle(create_default_party(), make_boss(), seed=seed)
+        logger = BattleLogger.headless()
+        self.assertEqual(first.run_battle(logger, autosave=False), second.run_battle(logger, autosave=False))
+        self.assertEqual(first.to_dict(), second.to_dict())
+
+    def test_derived_seeds_survive_snapshot_and_replay(self):
+        from replay import ReplayLog, ReplayRecorder
+        from snapshot import decode_state, encode_state
+        for index in range(10):
+            battle = Battle(create_default_party(), make_boss(), seed=battle_seed(1, index))
+            self.assertEqual(decode_state(encode_state(battle.to_dict()))['seed'], battle.seed)
+            recorder = ReplayRecorder.attach(battle)
+            battle.run_battle(BattleLogger.headless(), autosave=False)
+            log = ReplayLog.from_bytes(recorder.log.to_bytes())
+            self.assertEqual(log.initial_state['seed'], battle.seed)
+            self.assertEqual(len(log.events), len(recorder.log.events))
+
+class TestCampaign(unittest.TestCase):
+    def test_blocks_and_shards(self):
+        campaign = Campaign(1, 25, block_size=4)
+        self.assertEqual(campaign.blocks, 7)
+        self.assertEqual(campaign.block_battles(6), range(24, 25))
+        covered = [block for shard in range(3) for block in campaign.shard_blocks(shard, 3)]
+        self.assertEqual(covered, list(range(7)))
+        self.assertEqual(list(Campaign(1, 2, block_size=4).shard_blocks(0, 3)), [])   # шардов больше, чем блоков
+        with self.assertRaises(ValueError):
+            campaign.shard_blocks(3, 3)
+
+    def test_sharded_result_is_bit_identical(self):
+        campaign = Campaign(123, 30, block_size=4)
+        single = merge_blocks(campaign, run_blocks(campaign, range(campaign.blocks), create_default_party,
+                                                   make_boss, stats=True))
+        self.assertEqual(single.battles, 30)
+        expected = json.dumps(single.to_dict(), sort_keys=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            for shards in (1, 3):
+                files = [os.path.join(tmp, f"shard_{shards}_{shard}.json") for shard in range(shards)]
+                with ProcessPoolExecutor(max_workers=shards) as pool:
+                    done = list(pool.map(run_node, [campaign.to_dict()] * shards, range(shards),
+                                         [shards] * shards, files))
+                merged = merge_shards(list(reversed(done)))
+                self.assertEqual(json.dumps(merged.to_dict(), sort_keys=True), expected)
+
+    def test_merge_checks_coverage(self):
+        campaign = Campaign(5, 6, block_size=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = os.path.join(tmp, "a.json"), os.path.join(tmp, "b.json")
+            run_shard(campaign, 0, 2, first, create_default_party, make_boss)
+            with self.assertRaises(ValueError):
+                merge_shards([first])
+            with self.assertRaises(ValueError):
+                merge_shards([first, first])
+            run_shard(Campaign(6, 6, block_size=2), 1, 2, second, create_default_party, make_boss)
+            with self.assertRaises(ValueError):
+                merge_shards([first, second])
+            self.assertFalse(os.path.exists(first + ".tmp"))
+
+if __name__ == '__main__':
+    unittest.main()
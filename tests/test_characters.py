@@ -25,6 +25,20 @@ class TestHuman(unittest.TestCase):
         self.assertTrue(human.is_alive)
         human.hp = 0
         self.assertFalse(human.is_alive)
+    
+    def test_stat_validation(self):
+        human = Human("Тест")
+        with self.assertRaises(ValueError):
+            human.strength = 0
+        with self.assertRaises(ValueError):
+            human.agility = 101
+        human.max_hp = 2000
+        with self.assertRaises(ValueError):
+            human.hp = 1500
+    
+    def test_slotted_instances(self):
+        for obj in (Human("Тест"), Warrior("Воин"), Boss("Босс")):
+            self.assertFalse(hasattr(obj, '__dict__'))
 
 class TestWarrior(unittest.TestCase):
     def setUp(self):
@@ -43,8 +57,28 @@ class TestWarrior(unittest.TestCase):
     
     def test_skill_usage(self):
         result = self.warrior.use_skill(0, [self.target])
-        self.assertIn("использует", result)
+        self.assertIn("использует", str(result))
+        self.assertTrue(result.succeeded)
+        self.assertEqual(result.targets, (self.target,))
+        self.assertEqual(self.target.hp, 100 - result.total)
         self.assertLess(self.target.hp, 100)
+    
+    def test_skill_cooldown(self):
+        # "Мощный удар" с кулдауном 2 снова доступен через два своих хода
+        self.warrior.use_skill(1, [self.target])
+        self.assertEqual(self.warrior.cooldowns, {"Мощный удар": 2})
+        self.assertNotIn(1, self.warrior.ready_skills())
+        self.assertIn("перезарядке", str(self.warrior.use_skill(1, [self.target])))
+        
+        self.warrior.update_cooldowns()
+        self.assertEqual(self.warrior.cooldowns, {"Мощный удар": 1})
+        restored = Warrior.from_dict(self.warrior.to_dict())
+        self.assertEqual(restored.cooldowns, {"Мощный удар": 1})
+        
+        for character in (self.warrior, restored):
+            character.update_cooldowns()
+            self.assertEqual(character.cooldowns, {})
+            self.assertIn(1, character.ready_skills())
 
 class TestMage(unittest.TestCase):
     def setUp(self):
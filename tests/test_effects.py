@@ -3,8 +3,8 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from effects import PoisonEffect, ShieldEffect, SilenceEffect, RegenerationEffect
-from characters import Warrior
+from effects import PoisonEffect, ShieldEffect, SilenceEffect, RegenerationEffect, EffectSet
+from characters import Warrior, Mage, Boss
 
 class TestPoisonEffect(unittest.TestCase):
     def setUp(self):
@@ -19,6 +19,9 @@ class TestPoisonEffect(unittest.TestCase):
     def test_poison_duration(self):
         self.assertEqual(self.poison.duration, 3)
         self.poison.apply(self.warrior)
+        self.assertEqual(self.poison.duration, 3)  # apply длительность не трогает
+        self.warrior.add_effect(self.poison)
+        self.warrior.apply_effects()
         self.assertEqual(self.poison.duration, 2)
 
 class TestShieldEffect(unittest.TestCase):
@@ -42,6 +45,37 @@ class TestShieldEffect(unittest.TestCase):
         self.assertEqual(self.shield.remaining_shield, 0)
         self.assertEqual(self.shield.duration, 0)  # Щит разрушен
 
+    def test_shield_absorbs_exact_hit(self):
+        self.assertEqual(self.shield.absorb_damage(50), 0)
+        self.assertEqual(self.shield.remaining_shield, 0)
+        self.assertEqual(self.shield.duration, 2)  # Удар, равный остатку, щит не разрушает
+        
+        self.assertEqual(self.shield.absorb_damage(7), 7)
+        self.assertEqual(self.shield.duration, 0)
+
+    def test_shield_absorbs_attacks(self):
+        boss = Boss("Босс", 3)
+        self.warrior.add_effect(self.shield)
+        initial_hp = self.warrior.hp
+        dealt = self.warrior.take_damage(30)
+        self.assertEqual(dealt, 0)
+        self.assertEqual(self.warrior.hp, initial_hp)
+        
+        # Остаток щита поглощает часть базовой атаки, разбитый щит снимается
+        result = boss.basic_attack(self.warrior)
+        self.assertIn("щит поглотил 20", str(result))
+        self.assertEqual(result.absorbed, 20)
+        self.assertNotIn(self.shield, self.warrior.effects)
+        self.assertLess(self.warrior.hp, initial_hp)
+    
+    def test_poison_goes_through_shield(self):
+        self.warrior.add_effect(PoisonEffect(10, 3))
+        self.warrior.add_effect(self.shield)
+        initial_hp = self.warrior.hp
+        self.warrior.apply_effects()
+        self.assertEqual(self.warrior.hp, initial_hp)
+        self.assertEqual(self.shield.remaining_shield, 40)
+
 class TestRegenerationEffect(unittest.TestCase):
     def setUp(self):
         self.warrior = Warrior("Тестовый воин", 3)
@@ -60,7 +94,45 @@ class TestSilenceEffect(unittest.TestCase):
     
     def test_silence_application(self):
         result = self.silence.apply(self.warrior)
-        self.assertIn("немой", result)
+        self.assertIn("немой", str(result))
+    
+    def test_silence_blocks_skills(self):
+        self.warrior.add_effect(self.silence)
+        self.assertTrue(self.warrior.is_silenced)
+        mp = self.warrior.mp
+        result = self.warrior.use_skill(0, [Mage("Маг", 1)])
+        self.assertIn("немот", str(result))
+        self.assertFalse(result.succeeded)
+        self.assertEqual(self.warrior.mp, mp)
+        
+        # Немота с длительностью 2 снимается после двух ходов
+        self.warrior.apply_effects()
+        self.warrior.apply_effects()
+        self.assertFalse(self.warrior.is_silenced)
+
+class TestEffectSet(unittest.TestCase):
+    def test_index_and_expiry(self):
+        warrior = Warrior("Тестовый воин", 3)
+        effects = EffectSet([RegenerationEffect(1, 1 + i % 3) for i in range(30)])
+        shield = ShieldEffect(5, 10)
+        effects.add(shield)
+        self.assertEqual(len(effects), 31)
+        self.assertIs(effects.first(ShieldEffect), shield)
+        self.assertFalse(effects.has(SilenceEffect))
+        
+        effects.tick(warrior)
+        self.assertEqual(len(effects), 21)
+        self.assertEqual(len(effects.of_type(RegenerationEffect)), 20)
+        effects.remove(shield)
+        self.assertIsNone(effects.first(ShieldEffect))
+    
+    def test_serialization_keeps_order(self):
+        warrior = Warrior("Тестовый воин", 3)
+        warrior.add_effect(PoisonEffect(3, 2))
+        warrior.add_effect(ShieldEffect(10, 2))
+        restored = Warrior.from_dict(warrior.to_dict())
+        self.assertEqual([type(effect) for effect in restored.effects], [PoisonEffect, ShieldEffect])
+        self.assertIsInstance(restored.effects, EffectSet)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from battle import Battle, BattleLogger
+from characters import Warrior, Mage, Healer, Boss
+from items import Inventory, HealthPotion, HEALTH_POTION, MANA_POTION, ITEMS, drink_potions, register_item
+from replay import ReplayRecorder, ReplayLog, Replayer
+from simulation import simulate
+from snapshot import encode_state, decode_state
+from utils import create_default_party
+
+# Зарегистрированное зелье помимо общих HEALTH_POTION и MANA_POTION
+BIG_HEALTH_POTION = register_item(HealthPotion(120, item_id="test_big_health_potion", code=100))
+
+def make_stash():
+    return Inventory({HEALTH_POTION: 10, MANA_POTION: 10})
+
+def make_boss():
+    return Boss("Босс", 4, "normal")
+
+def make_battle(seed, stash=None):
+    return Battle([Warrior("Воин", 3), Mage("Маг", 3), Healer("Лекарь", 3)], Boss("Босс", 4), seed=seed, stash=stash)
+
+class TestInventory(unittest.TestCase):
+    def test_stacks(self):
+        inventory = Inventory()
+        inventory.add_item(HEALTH_POTION, 1000000)
+        inventory.add_item(MANA_POTION)
+        self.assertEqual(inventory.count(HEALTH_POTION), 1000000)
+        self.assertEqual(len(inventory), 1000001)
+        self.assertTrue(inventory.remove_item(MANA_POTION))
+        self.assertNotIn(MANA_POTION, inventory)
+        self.assertFalse(inventory.remove_item(MANA_POTION))
+        self.assertEqual(str(inventory), "0. Зелье здоровья: Восстанавливает 50 HP x1000000")
+    
+    def test_use_item(self):
+        inventory = Inventory({HEALTH_POTION: 2})
+        warrior = Warrior("Воин", 3)
+        warrior.hp = 10
+        result = inventory.use_item(HEALTH_POTION, warrior)
+        self.assertEqual(str(result), "Воин использует Зелье здоровья на Воин и восстанавливает 50 HP")
+        self.assertEqual(warrior.hp, 60)
+        self.assertEqual(inventory.count(HEALTH_POTION), 1)
+        inventory.use_item(0, warrior)
+        self.assertFalse(inventory)
+        self.assertFalse(inventory.use_item(0, warrior).succeeded)
+    
+    def test_serialization(self):
+        inventory = Inventory.from_dict(make_stash().to_dict())
+        self.assertEqual(inventory.count(MANA_POTION), 10)
+        self.assertIs(ITEMS['health_potion'], HEALTH_POTION)
+        with self.assertRaises(ValueError):
+            Inventory.from_dict({'elixir': 1})
+        with self.assertRaises(ValueError):
+            from items import register_item
+            register_item(HealthPotion(80))
+        with self.assertRaises(ValueError):
+            from items import register_item
+            register_item(HealthPotion(80, item_id="big_health_potion", code=MANA_POTION.code))
+
+    def test_separately_built_items_share_a_stack(self):
+        inventory = Inventory()
+        inventory.add_item(HealthPotion())
+        inventory.add_item(HealthPotion())
+        self.assertEqual(len(inventory), 2)
+        self.assertEqual(inventory.count(HEALTH_POTION), 2)
+        self.assertEqual(inventory.to_dict(), {'health_potion': 2})
+        restored = Inventory.from_dict(inventory.to_dict())
+        self.assertEqual(restored.count(HealthPotion()), 2)
+        self.assertTrue(restored.remove_item(HealthPotion()))
+        with self.assertRaises(ValueError):
+            inventory.add_item(HealthPotion(item_id="elixir"))
+
+class TestBattleStash(unittest.TestCase):
+    def test_party_drinks_potions(self):
+        stash = make_stash()
+        battle = make_battle(3, stash)
+        battle.run_battle(logger=BattleLogger.headless(), autosave=False)
+        self.assertLess(len(stash), 20)
+    
+    def test_ai_drinks_any_registered_potion(self):
+        battle = make_battle(3, Inventory({BIG_HEALTH_POTION: 1}))
+        warrior = battle.party[0]
+        self.assertIsNone(drink_potions(battle, warrior))
+        warrior.hp = 1
+        self.assertIs(drink_potions(battle, warrior), BIG_HEALTH_POTION)
+    
+    def test_without_stash_nothing_changes(self):
+        first, second = make_battle(5), make_battle(5, Inventory())
+        for battle in (first, second):
+            battle.run_battle(logger=BattleLogger.headless(), autosave=False)
+        self.assertEqual(first.round, second.round)
+        self.assertEqual([c.hp for c in first.party], [c.hp for c in second.party])
+    
+    def test_state_round_trips(self):
+        battle = make_battle(4, make_stash())
+        state = battle.capture()
+        while not battle.run_round(None):
+            pass
+        battle.rewind(state)
+        self.assertEqual(battle.stash.count(HEALTH_POTION), 10)
+        
+        saved = battle.to_dict()
+        self.assertEqual(decode_state(encode_state(saved))['stash'], saved['stash'])
+        self.assertEqual(Battle.from_dict(saved).stash.to_dict(), saved['stash'])
+    
+    def test_replay_with_potions(self):
+        battle = make_battle(6, make_stash())
+        recorder = ReplayRecorder.attach(battle)
+        battle.run_battle(logger=BattleLogger.headless(), autosave=False)
+        replayed = Replayer(ReplayLog.from_bytes(recorder.log.to_bytes())).run()
+        self.assertEqual(replayed.stash.to_dict(), battle.stash.to_dict())
+    
+    def test_simulation_with_stash(self):
+        without = simulate(create_default_party, make_boss, 40, seed=1, workers=1)
+        with_potions = simulate(create_default_party, make_boss, 40, seed=1, workers=1, stash_factory=make_stash)
+        self.assertGreaterEqual(with_potions.party_wins, without.party_wins)
+
+if __name__ == '__main__':
+    unittest.main()
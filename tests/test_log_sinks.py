@@ -0,0 +1,107 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from log_sinks import MemorySink, BufferedFileSink, JsonLinesSink, ThreadedSink, NullSink
+from battle import Battle, BattleLogger
+from characters import Warrior, Mage, Boss
+from results import ActionFailure, ActionResult, ATTACK
+
+class TestSinks(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "log.txt")
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def read_lines(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read().splitlines()
+    
+    def test_memory_sink_is_ring_buffer(self):
+        sink = MemorySink(capacity=2)
+        for message in ("a", "b", "c"):
+            sink.write(message)
+        self.assertEqual(sink.lines(), ["b", "c"])
+    
+    def test_buffered_file_sink_flushes_in_batches(self):
+        sink = BufferedFileSink(self.path, flush_every=3)
+        sink.open()
+        sink.write("1")
+        sink.write("2")
+        sink.file.flush()
+        self.assertEqual(self.read_lines(), [])
+        sink.write("3")
+        sink.file.flush()
+        self.assertEqual(self.read_lines(), ["1", "2", "3"])
+        sink.write("4")
+        sink.close()
+        self.assertEqual(self.read_lines(), ["1", "2", "3", "4"])
+    
+    def test_json_lines_sink(self):
+        sink = JsonLinesSink(self.path, battle_id="b1")
+        sink.open()
+        sink.write("удар")
+        sink.close()
+        record = json.loads(self.read_lines()[0])
+        self.assertEqual(record, {'battle_id': "b1", 'seq': 1, 'message': "удар"})
+    
+    def test_json_lines_sink_writes_result_fields(self):
+        warrior, boss = Warrior("Воин", 3), Boss("Босс", 5)
+        sink = JsonLinesSink(self.path, battle_id="b1")
+        sink.open()
+        sink.write(ActionResult(ATTACK, warrior, (boss,), (12,), 3, True))
+        sink.write(ActionFailure(warrior, "Недостаточно MP"))
+        sink.close()
+        attack, failure = [json.loads(line) for line in self.read_lines()]
+        self.assertEqual(attack, {'battle_id': "b1", 'seq': 1, 'kind': ATTACK, 'actor': "Воин",
+                                  'targets': ["Босс"], 'amounts': [12], 'absorbed': 3, 'crit': True})
+        self.assertEqual(failure['message'], "Недостаточно MP")
+
+    def test_null_sink_does_not_render(self):
+        class Unrenderable(ActionResult):
+            def __str__(self):
+                raise AssertionError("сообщение не должно форматироваться")
+
+        logger = BattleLogger(sinks=[NullSink(), ThreadedSink(NullSink())])
+        self.assertFalse(logger.enabled)
+        logger.log(Unrenderable(ATTACK, Warrior("Воин", 3)))
+        battle = Battle([Warrior("Воин", 3)], Boss("Босс", 5), seed=1)
+        self.assertIn(battle.run_battle(logger=BattleLogger(sinks=[NullSink()]), autosave=False),
+                      ("party", "boss"))
+        logger.sinks = [MemorySink()]
+        self.assertTrue(logger.enabled)
+
+    def test_threaded_sink_writes_everything_on_close(self):
+        inner = MemorySink()
+        sink = ThreadedSink(inner)
+        sink.open()
+        for i in range(100):
+            sink.write(str(i))
+        sink.close()
+        self.assertEqual(inner.lines(), [str(i) for i in range(100)])
+    
+    def test_logger_fans_out_to_sinks(self):
+        first, second = MemorySink(), MemorySink()
+        with BattleLogger(sinks=[first, NullSink(), second]) as logger:
+            logger.log("сообщение")
+        self.assertEqual(first.lines(), ["сообщение"])
+        self.assertEqual(second.lines(), ["сообщение"])
+    
+    def test_battle_log_path_is_per_battle(self):
+        first = Battle([Warrior("Воин", 3)], Boss("Босс", 5), seed=1)
+        second = Battle([Mage("Маг", 3)], Boss("Босс", 5), seed=2)
+        self.assertNotEqual(first.log_path, second.log_path)
+    
+    def test_battle_with_memory_sink(self):
+        sink = MemorySink(capacity=10000)
+        battle = Battle([Warrior("Воин", 3)], Boss("Босс", 5), seed=1)
+        battle.run_battle(logger=BattleLogger(sinks=[sink]), autosave=False)
+        self.assertTrue(sink.lines()[0].startswith("Начало боя!"))
+
+if __name__ == '__main__':
+    unittest.main()
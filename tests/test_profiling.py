@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from battle import Battle, BattleLogger
+from characters import Boss
+from profiling import BattleProfiler, ProfileReport, profile_battle
+from simulation import simulate
+from utils import create_default_party
+
+def make_boss():
+    return Boss("Босс", 4, "normal")
+
+class TestProfiling(unittest.TestCase):
+    def test_disabled_by_default(self):
+        battle = Battle(create_default_party(), make_boss(), seed=1)
+        self.assertNotIn('decide', vars(battle))
+        self.assertNotIn('run_turn', vars(battle))
+    
+    def test_phases_and_counters(self):
+        battle = Battle(create_default_party(), make_boss(), seed=1)
+        report = profile_battle(battle, logger=BattleLogger.headless(), autosave=False)
+        for phase in ('effects', 'decide', 'execute', 'end_check', 'logging', 'scheduling'):
+            self.assertIn(phase, report.phases)
+        turns = report.counters['turns']
+        self.assertEqual(report.counters['battles'], 1)
+        self.assertEqual(report.phases['decide'][0], turns)
+        self.assertEqual(report.counters['rounds'], battle.round)
+        self.assertGreater(report.total_ns, 0)
+        self.assertIn("Выбор действия", str(report))
+    
+    def test_logger_is_restored(self):
+        logger = BattleLogger.headless()
+        battle = BattleProfiler().attach(Battle(create_default_party(), make_boss(), seed=1))
+        battle.run_battle(logger=logger, autosave=False)
+        self.assertNotIn('log', vars(logger))
+        battle.run_round(logger)
+        self.assertNotIn('log', vars(logger))
+
+    def test_profiling_does_not_change_results(self):
+        plain = Battle(create_default_party(), make_boss(), seed=3)
+        profiled = BattleProfiler().attach(Battle(create_default_party(), make_boss(), seed=3))
+        logger = BattleLogger.headless()
+        self.assertEqual(plain.run_battle(logger, autosave=False), profiled.run_battle(logger, autosave=False))
+        self.assertEqual(plain.to_dict()['rng_state'], profiled.to_dict()['rng_state'])
+    
+    def test_merge_and_export(self):
+        first = ProfileReport()
+        first.add('decide', 100)
+        second = ProfileReport()
+        second.add('decide', 300)
+        second.counters['turns'] = 2
+        merged = ProfileReport.from_dict(first.to_dict()).merge(second)
+        self.assertEqual(merged.phases['decide'], [2, 400, 300])
+        self.assertEqual(merged.counters['turns'], 2)
+    
+    def test_simulation_profile(self):
+        result = simulate(create_default_party, make_boss, 20, seed=5, workers=1, profile=True)
+        self.assertEqual(result.profile.counters['battles'], 20)
+        self.assertIn('profile', result.to_dict())
+        plain = simulate(create_default_party, make_boss, 20, seed=5, workers=1)
+        self.assertIsNone(plain.profile)
+        self.assertEqual(plain.party_wins, result.party_wins)
+
+if __name__ == '__main__':
+    unittest.main()
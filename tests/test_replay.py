@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from battle import Battle, BattleLogger
+from characters import Warrior, Mage, Healer, Boss
+from items import HEALTH_POTION, MANA_POTION, Inventory
+from replay import ReplayRecorder, ReplayLog, Replayer, ReplayDivergence, BASIC_ATTACK, ITEM_ACTIONS
+
+def make_battle(seed):
+    return Battle([Warrior("Воин", 3), Mage("Маг", 3), Healer("Лекарь", 3)], Boss("Босс", 3, "normal"), seed=seed)
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.battle = make_battle(11)
+        self.recorder = ReplayRecorder.attach(self.battle)
+        self.states = {}
+        logger = BattleLogger.headless()
+        while not self.battle.is_battle_over:
+            self.states[self.battle.round] = self.battle.to_dict()
+            self.battle.run_round(logger)
+    
+    def test_events_recorded(self):
+        events = self.recorder.log.events
+        self.assertGreater(len(events), 0)
+        self.assertEqual(self.recorder.log.rounds, self.battle.round)
+        first_round = self.recorder.log.events_in_round(1)
+        self.assertEqual(len(first_round), 4)
+        boss_index = len(self.battle.party)
+        self.assertTrue(all(event.targets == (boss_index,) for event in first_round if event.actor != boss_index))
+        self.assertTrue(all(event.action >= BASIC_ATTACK for event in events))
+    
+    def test_round_trip_and_fast_forward(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "battle.replay")
+            self.recorder.log.save(filename)
+            self.assertLess(os.path.getsize(filename), 1024)
+            log = ReplayLog.load(filename)
+        
+        self.assertEqual([event.key() for event in log.events],
+                         [event.key() for event in self.recorder.log.events])
+        middle = max(1, self.battle.round // 2)
+        replayer = Replayer(log)
+        self.assertEqual(replayer.fast_forward(middle).to_dict(), self.states[middle])
+        self.assertEqual(replayer.run().to_dict(), self.battle.to_dict())
+    
+    def test_items_use_explicit_codes(self):
+        battle = Battle([Warrior("Воин", 3), Mage("Маг", 3), Healer("Лекарь", 3)], Boss("Босс", 4), seed=5,
+                        stash=Inventory({HEALTH_POTION: 10, MANA_POTION: 10}))
+        recorder = ReplayRecorder.attach(battle)
+        battle.run_battle(logger=BattleLogger.headless(), autosave=False)
+        items = {event.action for event in recorder.log.events if event.action >= ITEM_ACTIONS}
+        self.assertTrue(items)
+        self.assertLessEqual(items, {ITEM_ACTIONS + HEALTH_POTION.code, ITEM_ACTIONS + MANA_POTION.code})
+        log = ReplayLog.from_bytes(recorder.log.to_bytes())
+        self.assertEqual(Replayer(log).run().to_dict(), battle.to_dict())
+
+    def test_divergence_detected(self):
+        log = ReplayLog.from_bytes(self.recorder.log.to_bytes())
+        event = log.events[2]
+        event.draws += 1
+        with self.assertRaises(ReplayDivergence):
+            Replayer(log).run()
+
+if __name__ == '__main__':
+    unittest.main()
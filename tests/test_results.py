@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import results
+from battle import Battle, BattleLogger
+from characters import Warrior, Mage, Healer, Boss
+from effects import PoisonEffect, ShieldEffect
+from log_sinks import MemorySink
+from results import ActionFailure, FAILURE, SKILL_EFFECT, SKILL_MASS_HEAL
+
+class TestActionResult(unittest.TestCase):
+    def test_rendering(self):
+        mage, boss = Mage("Маг", 3), Boss("Босс", 3)
+        result = mage.basic_attack(boss)
+        self.assertEqual(str(result), f"Маг атакует Босс магией на {result.total} урона")
+        
+        healer, warrior = Healer("Лекарь", 3), Warrior("Воин", 3)
+        warrior.hp = 10
+        mage.hp = 20
+        result = healer.use_skill(1, [warrior, mage])
+        self.assertEqual(result.kind, SKILL_MASS_HEAL)
+        self.assertEqual(str(result), f"Лекарь использует Массовое лечение: Воин +{result.amounts[0]} HP, "
+                                      f"Маг +{result.amounts[1]} HP")
+        
+        warrior.add_effect(ShieldEffect(5, 2))
+        result = boss.basic_attack(warrior)
+        self.assertEqual(result.absorbed, 5)
+        self.assertTrue(str(result).endswith("(щит поглотил 5)"))
+    
+    def test_effect_text_uses_duration_at_cast_time(self):
+        mage, boss = Mage("Маг", 3), Boss("Босс", 3)
+        result = mage.use_skill(2, [boss])
+        self.assertEqual(result.kind, SKILL_EFFECT)
+        boss.apply_effects()
+        self.assertEqual(str(result), "Маг использует Отравление: Босс получает Отравление (3 ходов)")
+    
+    def test_effect_ticks_and_failures(self):
+        warrior = Warrior("Воин", 3)
+        warrior.add_effect(PoisonEffect(7, 1))
+        [tick] = warrior.apply_effects()
+        self.assertEqual(str(tick), "Воин получает 7 урона от отравления")
+        result = warrior.perform(None, [])
+        self.assertIsInstance(result, ActionFailure)
+        self.assertEqual(result.kind, FAILURE)
+        self.assertEqual(str(result), "Нет целей для атаки")
+    
+    def test_headless_battle_renders_nothing(self):
+        rendered = []
+        renderers = dict(results.RENDERERS)
+        try:
+            for kind, render in renderers.items():
+                results.RENDERERS[kind] = lambda r, render=render: rendered.append(r) or render(r)
+            battle = Battle([Warrior("Воин", 3), Mage("Маг", 3)], Boss("Босс", 3), seed=1)
+            battle.run_battle(logger=BattleLogger.headless(), autosave=False)
+            self.assertEqual(rendered, [])
+            
+            sink = MemorySink(10000)
+            battle = Battle([Warrior("Воин", 3), Mage("Маг", 3)], Boss("Босс", 3), seed=1)
+            battle.run_battle(logger=BattleLogger(sinks=[sink]), autosave=False)
+            self.assertGreater(len(rendered), 0)
+            self.assertTrue(all(isinstance(line, str) for line in sink.lines()))
+        finally:
+            results.RENDERERS.update(renderers)
+
+if __name__ == '__main__':
+    unittest.main()
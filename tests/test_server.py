@@ -0,0 +1,125 @@
+import unittest
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server import BattleServer, LocalClient, SessionError
+
+PARTY = [
+    {"class": "warrior", "name": "Воин", "level": 5},
+    {"class": "mage", "name": "Маг", "level": 5},
+    {"class": "healer", "name": "Лекарь", "level": 5}
+]
+
+class TestBattleServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = BattleServer(max_sessions=500)
+    
+    async def asyncTearDown(self):
+        await self.server.close()
+    
+    async def test_many_local_sessions(self):
+        sessions = [self.server.create_session(PARTY, seed=i) for i in range(50)]
+        winners = await asyncio.gather(*(LocalClient(session).play() for session in sessions))
+        self.assertEqual(len(winners), 50)
+        self.assertTrue(all(winner in ("party", "boss") for winner in winners))
+        self.assertEqual(self.server.sessions, {})
+    
+    async def test_ai_session_finishes_without_moves(self):
+        session = self.server.create_session(PARTY, seed=3, human=False)
+        winner = await session.task
+        self.assertEqual(winner, session.winner)
+        self.assertIn(winner, ("party", "boss"))
+    
+    async def test_invalid_move_is_rejected(self):
+        session = self.server.create_session(PARTY, seed=1)
+        client = LocalClient(session)
+        turn = await client.next_message('turn')
+        await client.move(targets=[42])
+        error = await client.next_message('error')
+        self.assertIn("Неверные цели", error['message'])
+        self.assertIs(session.waiting_for, session.combatants[turn['character']])
+        
+        await client.move(skill=turn['ready_skills'][0])
+        log = await client.next_message('log')
+        self.assertIn("использует", log['message'])
+    
+    async def test_bad_indices_are_rejected(self):
+        session = self.server.create_session(PARTY, seed=1)
+        client = LocalClient(session)
+        turn = await client.next_message('turn')
+        for move in ({'skill': True}, {'targets': [-1]}, {'targets': [False]}, {'targets': 3}):
+            await session.submit({'type': 'move', **move})
+            self.assertEqual((await client.next_message('error'))['type'], 'error')
+        await session.submit([1])
+        self.assertEqual((await client.next_message('error'))['type'], 'error')
+        self.assertIs(session.waiting_for, session.combatants[turn['character']])
+
+    async def test_move_timeout_falls_back_to_ai(self):
+        self.server.move_timeout = 0.01
+        session = self.server.create_session(PARTY, seed=2)
+        self.assertIn(await session.task, ("party", "boss"))
+    
+    async def test_session_limit(self):
+        self.server.max_sessions = 1
+        self.server.create_session(PARTY, seed=1)
+        with self.assertRaises(SessionError):
+            self.server.create_session(PARTY, seed=2)
+    
+    async def test_tcp_protocol(self):
+        listener = await self.server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write((json.dumps({'type': 'new', 'party': PARTY, 'seed': 5}) + "\n").encode('utf-8'))
+        
+        kinds = set()
+        while True:
+            message = json.loads(await reader.readline())
+            kinds.add(message['type'])
+            if message['type'] == 'turn':
+                writer.write(b'{"type": "move", "skill": null}\n')
+            elif message['type'] == 'end':
+                break
+        self.assertTrue({'session', 'log', 'turn', 'end'} <= kinds)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+
+    async def _connect(self, listener, hello: bytes):
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(hello)
+        return reader, writer
+
+    async def test_disconnect_cancels_session(self):
+        listener = await self.server.start(port=0)
+        reader, writer = await self._connect(listener, (json.dumps({'type': 'new', 'party': PARTY}) + "\n").encode())
+        while json.loads(await reader.readline())['type'] != 'turn':
+            pass
+        session = next(iter(self.server.sessions.values()))
+        writer.close()
+        await asyncio.wait_for(asyncio.gather(session.task, return_exceptions=True), 1)
+        self.assertTrue(session.task.cancelled())
+        self.assertEqual(self.server.sessions, {})
+        listener.close()
+        await listener.wait_closed()
+
+    async def test_malformed_hello_is_rejected(self):
+        listener = await self.server.start(port=0)
+        for hello in ([1, 2], {'type': 'new', 'party': {'class': 'warrior'}}, {'type': 'new', 'party': [1]},
+                      {'type': 'new', 'party': [{'class': 'rogue', 'name': "x"}]},
+                      {'type': 'new', 'party': PARTY, 'boss': "Саурон"},
+                      {'type': 'new', 'party': PARTY, 'seed': "x"}, {'type': 'new', 'party': PARTY, 'seed': [1]},
+                      {'type': 'new', 'party': PARTY, 'seed': True}):
+            reader, writer = await self._connect(listener, (json.dumps(hello) + "\n").encode())
+            message = json.loads(await reader.readline())
+            self.assertEqual(message['type'], 'error')
+            writer.close()
+        self.assertEqual(self.server.sessions, {})
+        listener.close()
+        await listener.wait_closed()
+
+if __name__ == '__main__':
+    unittest.main()
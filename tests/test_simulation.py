@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from characters import Boss
+from utils import create_default_party
+from simulation import simulate, run_headless, battle_seed, SimulationResult
+
+def make_boss():
+    return Boss("Босс", 5, "normal")
+
+class TestSimulation(unittest.TestCase):
+    def test_headless_battle_has_winner(self):
+        battle, winner = run_headless(create_default_party, make_boss, seed=1)
+        self.assertIn(winner, ("party", "boss"))
+        self.assertTrue(battle.is_battle_over)
+    
+    def test_aggregates(self):
+        result = simulate(create_default_party, make_boss, 20, seed=7, workers=1)
+        self.assertEqual(result.battles, 20)
+        self.assertEqual(sum(result.rounds.values()), 20)
+        self.assertEqual(sum(result.survivors.values()), 20)
+        self.assertTrue(0.0 <= result.win_rate <= 1.0)
+    
+    def test_same_seed_same_result(self):
+        first = simulate(create_default_party, make_boss, 10, seed=3, workers=1)
+        second = simulate(create_default_party, make_boss, 10, seed=3, workers=1)
+        self.assertEqual(first.to_dict(), second.to_dict())
+    
+    def test_process_pool_matches_single_process(self):
+        single = simulate(create_default_party, make_boss, 12, seed=5, workers=1)
+        pooled = simulate(create_default_party, make_boss, 12, seed=5, workers=2)
+        self.assertEqual(single.to_dict(), pooled.to_dict())
+    
+    def test_battle_seed_is_derived_from_base_and_index(self):
+        result = simulate(create_default_party, make_boss, 1, seed=4, workers=1)
+        battle, winner = run_headless(create_default_party, make_boss, seed=battle_seed(4, 0))
+        expected = SimulationResult()
+        expected.record(battle, winner)
+        self.assertEqual(result.to_dict(), expected.to_dict())
+    
+    def test_neighbouring_seeds_do_not_share_battles(self):
+        first = {battle_seed(4, index) for index in range(100)}
+        second = {battle_seed(5, index) for index in range(100)}
+        self.assertFalse(first & second)
+    
+    def test_merge(self):
+        a = simulate(create_default_party, make_boss, 5, seed=0, workers=1)
+        b = simulate(create_default_party, make_boss, 5, seed=5, workers=1)
+        total = SimulationResult().merge(a).merge(b)
+        self.assertEqual(total.battles, 10)
+        self.assertEqual(total.party_wins, a.party_wins + b.party_wins)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from characters import Warrior, Mage, Boss
+from core import SKILL_TAG_CACHE_SIZE, skill_tag_index
+from skills import SkillCatalog, DamageSkill, EffectSkill, default_catalog, AOE, BUFF, DAMAGE, DEBUFF, EFFECT, SINGLE_TARGET
+
+class TestSkillCatalog(unittest.TestCase):
+    def test_characters_share_skills(self):
+        first = Warrior("Воин 1", 1)
+        second = Warrior("Воин 2", 5)
+        self.assertIs(first.skills, second.skills)
+        self.assertEqual([skill.name for skill in first.skills], ["Удар мечом", "Мощный удар", "Боевой клич"])
+    
+    def test_skills_are_immutable(self):
+        skill = default_catalog().get("fireball")
+        with self.assertRaises(AttributeError):
+            skill.mp_cost = 0
+        self.assertEqual(skill.mp_cost, 15)
+    
+    def test_cooldowns_stay_per_character(self):
+        first = Mage("Маг 1", 3)
+        second = Mage("Маг 2", 3)
+        first.use_skill(1, [Boss("Босс", 1)])
+        self.assertIn("Ледяная стрела", first.cooldowns)
+        self.assertEqual(second.cooldowns, {})
+    
+    def test_custom_catalog(self):
+        catalog = SkillCatalog.from_dict({
+            'skills': {
+                'bolt': {'type': 'damage', 'name': "Молния", 'mp_cost': 5, 'base_power': 7, 'stat': 'intelligence'},
+                'curse': {'type': 'effect', 'name': "Проклятие", 'mp_cost': 5, 'stat': 'intelligence',
+                          'power': 0.2, 'duration': 2, 'effect_type': 'poison'}
+            },
+            'loadouts': {'warlock': ['bolt', 'curse']}
+        })
+        bolt, curse = catalog.loadout('warlock')
+        self.assertIsInstance(bolt, DamageSkill)
+        self.assertIsInstance(curse, EffectSkill)
+        
+        with self.assertRaises(ValueError):
+            SkillCatalog.from_dict({'skills': {'x': {'type': 'unknown'}}})
+        with self.assertRaises(ValueError):
+            SkillCatalog.from_dict({'skills': {}, 'loadouts': {'warlock': ['bolt']}})
+    
+    def test_skill_tags(self):
+        catalog = default_catalog()
+        self.assertEqual(catalog.get('mass_darkness').tags, {AOE, DAMAGE})
+        self.assertEqual(catalog.get('chains_of_darkness').tags, {EFFECT, DEBUFF, 'silence', SINGLE_TARGET})
+        self.assertIn(BUFF, catalog.get('shield').tags)
+        self.assertIn(AOE, catalog.get('mass_heal').tags)
+        self.assertEqual(DamageSkill("Укол", 1, 1, 'strength', tags=[AOE]).tags, {AOE, DAMAGE})
+    
+    def test_tag_index_cache_is_bounded(self):
+        for i in range(SKILL_TAG_CACHE_SIZE + 10):
+            Warrior("Воин", 1).skills = (DamageSkill(f"Удар {i}", 1, 1, 'strength'),)
+        self.assertLessEqual(skill_tag_index.cache_info().currsize, SKILL_TAG_CACHE_SIZE)
+    
+    def test_tag_index_shared_and_independent_of_names(self):
+        first, second = Boss("Первый", 1), Boss("Второй", 1)
+        self.assertIs(first.skill_tags, second.skill_tags)
+        self.assertEqual(first.skill_with_tag(AOE), 1)
+        self.assertEqual(first.skill_with_tag(DEBUFF), 2)
+        self.assertIsNone(Warrior("Воин", 1).skill_with_tag(AOE))
+        
+        catalog = SkillCatalog.from_dict({
+            'skills': {
+                'quake': {'type': 'damage', 'name': "Quake", 'mp_cost': 5, 'base_power': 7, 'stat': 'strength',
+                          'tags': ['aoe']},
+                'hex': {'type': 'effect', 'name': "Hex", 'mp_cost': 5, 'stat': 'intelligence',
+                        'power': 0.2, 'duration': 2, 'effect_type': 'poison'}
+            },
+            'loadouts': {'boss': ['hex', 'quake']}
+        })
+        boss = Boss("Босс", 1)
+        boss.skills = catalog.loadout('boss')
+        self.assertEqual(boss.usable_skill(AOE), 1)
+        self.assertEqual(boss.usable_skill(DEBUFF), 0)
+        boss.ready_at[boss.skills[0]] = boss.turn + 2
+        self.assertIsNone(boss.usable_skill(DEBUFF))
+        boss.mp = 0
+        self.assertIsNone(boss.usable_skill(AOE))
+
+if __name__ == '__main__':
+    unittest.main()
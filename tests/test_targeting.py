@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import random
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from battle import Battle, BattleLogger
+from characters import Warrior, Mage, Boss, AggressiveStrategy, DebuffStrategy
+from targeting import TargetIndex, alive_targets, alive_count, lowest_hp, random_alive
+
+class TestTargetIndex(unittest.TestCase):
+    def setUp(self):
+        self.party = [(Warrior if i % 2 else Mage)(f"Боец {i}", 1 + i % 5) for i in range(40)]
+        self.index = TargetIndex(self.party)
+    
+    def assert_matches_scan(self):
+        self.assertEqual(self.index.alive_count, alive_count(self.party))
+        self.assertEqual(self.index.alive(), alive_targets(self.party))
+        self.assertIs(self.index.lowest_hp(), lowest_hp(self.party))
+        for k, char in enumerate(alive_targets(self.party)):
+            self.assertIs(self.index.nth_alive(k), char)
+    
+    def test_follows_hp_changes(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            char = rng.choice(self.party)
+            if rng.random() < 0.7:
+                char.take_damage(rng.randint(1, 60))
+            else:
+                char.hp += rng.randint(1, 80)
+            if rng.random() < 0.05:
+                self.assert_matches_scan()
+        self.assert_matches_scan()
+    
+    def test_random_alive_same_draws_as_choice(self):
+        for char in self.party[::3]:
+            char.hp = 0
+        first, second = random.Random(7), random.Random(7)
+        alive = alive_targets(self.party)
+        for _ in range(200):
+            self.assertIs(self.index.random_alive(first), second.choice(alive))
+        self.assertIs(random_alive(self.party, random.Random(3)), random.Random(3).choice(alive))
+    
+    def test_everyone_dead(self):
+        for char in self.party:
+            char.take_damage(10000)
+        self.assertEqual(self.index.alive_count, 0)
+        self.assertIsNone(self.index.lowest_hp())
+        self.assertIsNone(self.index.random_alive(random.Random(0)))
+        self.assertEqual(AggressiveStrategy().decide(Boss("Босс", 1), self.index), (None, []))
+
+class TestBattleTargets(unittest.TestCase):
+    def test_strategies_use_index(self):
+        party = [Warrior(f"Воин {i}", 2) for i in range(300)]
+        battle = Battle(party, Boss("Босс", 5), seed=4)
+        party[123].take_damage(100)
+        self.assertEqual(AggressiveStrategy().decide(battle.boss, battle.targets), (None, [party[123]]))
+        _, targets = DebuffStrategy().decide(battle.boss, battle.targets)
+        self.assertTrue(targets[0].is_alive)
+    
+    def test_rewind_rebuilds_index(self):
+        battle = Battle([Warrior("Воин", 3), Mage("Маг", 3)], Boss("Босс", 6), seed=2)
+        state = battle.capture()
+        while not battle.run_round(None):
+            pass
+        battle.rewind(state)
+        self.assertEqual(battle.targets.alive_count, 2)
+        self.assertIs(battle.targets.lowest_hp(), lowest_hp(battle.party))
+    
+    def test_finished_battle_releases_party(self):
+        party = [Warrior("Воин", 3), Mage("Маг", 3)]
+        battle = Battle(party, Boss("Босс", 6), seed=2)
+        state = battle.capture()
+        battle.run_battle(logger=BattleLogger.headless(), autosave=False)
+        self.assertTrue(all(battle.targets not in char._watchers for char in party))
+        
+        # После отката индекс снова следит за HP
+        battle.rewind(state)
+        party[0].take_damage(10 ** 6)
+        self.assertEqual(battle.targets.alive_count, 1)
+        self.assertTrue(all(char._watchers.count(battle.targets) == 1 for char in party))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from characters import Boss
+from utils import create_default_party
+from simulation import simulate
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def make_boss():
+    return Boss("Босс", 3, "easy")
+
+@unittest.skipUnless(numpy, "numpy не установлен")
+class TestVectorizedBattle(unittest.TestCase):
+    def test_all_battles_finish(self):
+        from vectorized import simulate_vectorized
+        result = simulate_vectorized(create_default_party, make_boss, 500, seed=1)
+        self.assertEqual(result.battles, 500)
+        self.assertEqual(sum(result.rounds.values()), 500)
+        self.assertEqual(sum(result.survivors.values()), 500)
+    
+    def test_seed_reproducible(self):
+        from vectorized import simulate_vectorized
+        first = simulate_vectorized(create_default_party, make_boss, 300, seed=4)
+        second = simulate_vectorized(create_default_party, make_boss, 300, seed=4)
+        self.assertEqual(first.to_dict(), second.to_dict())
+    
+    def test_matches_object_engine(self):
+        from vectorized import simulate_vectorized
+        reference = simulate(create_default_party, make_boss, 400, seed=1, workers=1)
+        vectorized = simulate_vectorized(create_default_party, make_boss, 4000, seed=1)
+        self.assertAlmostEqual(vectorized.win_rate, reference.win_rate, delta=0.08)
+        for survivors in range(4):
+            self.assertAlmostEqual(vectorized.survivors[survivors] / vectorized.battles,
+                                   reference.survivors[survivors] / reference.battles, delta=0.08)
+
+    def test_round_cap_is_not_a_win(self):
+        from vectorized import simulate_vectorized
+        result = simulate_vectorized(create_default_party, make_boss, 200, seed=2, max_rounds=2)
+        self.assertEqual(result.battles, 200)
+        self.assertGreater(result.timeouts, 0)
+        finished = simulate_vectorized(create_default_party, make_boss, 200, seed=2)
+        self.assertEqual(finished.timeouts, 0)
+        self.assertLessEqual(result.party_wins, 200 - result.timeouts)
+        self.assertEqual(result.to_dict()['timeouts'], result.timeouts)
+
+    def test_exact_hit_keeps_shield(self):
+        from vectorized import SHIELD, VectorizedBattle
+        battle = VectorizedBattle(create_default_party, make_boss, 2, seed=1)
+        rows, targets = numpy.arange(2), numpy.zeros(2, dtype=numpy.int64)
+        hp = battle.hp[targets, rows].copy()
+        battle._add_effect(rows, targets, SHIELD, 20, 3)
+        battle._damage(rows, targets, numpy.array([20, 25]))
+        self.assertEqual(battle.effect_duration[0, 0].tolist(), [3, 0])
+        self.assertEqual(battle.shield[0].tolist(), [0, 0])
+        self.assertEqual((hp - battle.hp[targets, rows]).tolist(), [0, 5])
+
+    def test_shields_absorb_in_slot_order(self):
+        from vectorized import SHIELD, VectorizedBattle
+        battle = VectorizedBattle(create_default_party, make_boss, 3, seed=1)
+        rows, boss = numpy.arange(3), battle.boss_index
+        hp = battle.hp[boss].copy()
+        battle._add_effect(rows, boss, SHIELD, 10, 3)
+        battle._add_effect(rows, boss, SHIELD, 5, 3)
+        battle._damage(rows, boss, numpy.array([4, 12, 30]))
+        self.assertEqual(battle.effect_power[boss, :2].tolist(), [[6, 0, 0], [5, 3, 0]])
+        self.assertEqual(battle.effect_duration[boss, :2].tolist(), [[3, 0, 0], [3, 3, 0]])
+        self.assertEqual(battle.shield[boss].tolist(), [11, 3, 0])
+        self.assertEqual((hp - battle.hp[boss]).tolist(), [0, 0, 15])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import random
-from typing import List
+from typing import Any, Dict, List, Optional
 from characters import Warrior, Mage, Healer, Boss
 def create_party(party_config: List[dict]) -> List:
     """Создание пати по конфигурации"""
@@ -17,13 +17,22 @@ def create_party(party_config: List[dict]) -> List:
     
     return party
 
+def create_boss(boss_config: Optional[Dict[str, Any]] = None) -> Boss:
+    """Создание босса по конфигурации {"name", "level", "difficulty"} (все поля необязательны)"""
+    boss_config = boss_config or {}
+    return Boss(boss_config.get('name', "Саурон"), boss_config.get('level', 5),
+                boss_config.get('difficulty', "normal"))
+
+# Пати по умолчанию в формате create_party
+DEFAULT_PARTY = [
+    {'class': 'warrior', 'name': "Боромир", 'level': 5},
+    {'class': 'mage', 'name': "Гэндальф", 'level': 5},
+    {'class': 'healer', 'name': "Элронд", 'level': 5},
+]
+
 def create_default_party() -> List:
     """Создание пати по умолчанию"""
-    return [
-        Warrior("Боромир", 5),
-        Mage("Гэндальф", 5),
-        Healer("Элронд", 5)
-    ]
+    return create_party(DEFAULT_PARTY)
 
 def select_difficulty() -> str:
     """Выбор сложности через CLI"""
@@ -0,0 +1,375 @@
+from collections import Counter
+from typing import Callable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy - необязательная зависимость, нужна только этому модулю
+    np = None
+
+from core import Character
+from characters import Warrior, Mage, Healer, Boss
+from skills import AOE, DEBUFF, DamageSkill, HealSkill, EffectSkill
+from simulation import SimulationResult
+
+# Базовые атаки классов: (характеристика, делитель, мин. бонус, макс. бонус, шанс крита)
+BASIC_ATTACKS = {
+    Warrior: ('strength', 1, 1, 5, 0.15),
+    Mage: ('intelligence', 2, 1, 3, 0.0),
+    Healer: ('strength', 1, 1, 3, 0.0),
+    Boss: ('strength', 1, 5, 10, 0.2),
+}
+
+EFFECT_CODES = {"poison": 1, "shield": 2, "silence": 3, "regeneration": 4}
+POISON = EFFECT_CODES["poison"]
+SHIELD = EFFECT_CODES["shield"]
+SILENCE = EFFECT_CODES["silence"]
+REGENERATION = EFFECT_CODES["regeneration"]
+
+class VectorizedBattle:
+    """Пакетный движок: n копий одного боя пати против босса в lockstep
+
+    Состояние хранится структурой массивов формы [участники, бои]: HP, MP,
+    характеристики, кулдауны [участники, навыки, бои] и слоты эффектов
+    [участники, max_effects, бои]; у щита effect_power - остаток прочности,
+    как ShieldEffect.remaining_shield, а shield - сумма остатков активных
+    щитов участника (бои без щитов не разбирают слоты при уроне). Каждый ход
+    одного участника выполняется сразу во всех еще идущих боях масками
+    numpy; слоты эффектов обрабатываются целиком, без цикла по слотам.
+    Правила повторяют объектный движок (characters, skills, effects,
+    battle.Battle), поэтому распределения результатов совпадают, но поток
+    случайных чисел другой.
+    """
+
+    def __init__(self, party_factory: Callable[[], List[Character]], boss_factory: Callable[[], Boss],
+                 n: int, seed: Optional[int] = None, max_rounds: int = 1000, max_effects: int = 8):
+        if np is None:
+            raise ImportError("VectorizedBattle требует numpy")
+
+        party = party_factory()
+        boss = boss_factory()
+        self.combatants = party + [boss]
+        self.party_size = len(party)
+        self.boss_index = len(party)
+        self.n = n
+        self.max_rounds = max_rounds
+        self.rng = np.random.default_rng(seed)
+
+        for char in self.combatants:
+            if type(char) not in BASIC_ATTACKS:
+                raise ValueError(f"Класс {type(char).__name__} не поддерживается")
+
+        # Строка участника (и каждый его слот) лежит в памяти подряд: почти все
+        # операции хода идут по строкам действующего участника или цели, а
+        # свертки по слотам и навыкам - сложение нескольких длинных строк
+        def column(attr: str):
+            values = np.array([getattr(char, attr) for char in self.combatants], dtype=np.int32)
+            return np.repeat(values[:, None], n, axis=1)
+
+        self.hp = column('hp')
+        self.max_hp = column('max_hp')
+        self.mp = column('mp')
+        self.max_mp = column('max_mp')
+        self.stats = {attr: column(attr) for attr in ('strength', 'agility', 'intelligence')}
+
+        count = len(self.combatants)
+        max_skills = max(len(char.skills) for char in self.combatants)
+        # Коды, длительности и кулдауны малы: int8 вчетверо сокращает трафик памяти
+        self.cooldowns = np.zeros((count, max_skills, n), dtype=np.int8)
+        self.effect_type = np.zeros((count, max_effects, n), dtype=np.int8)
+        self.effect_power = np.zeros((count, max_effects, n), dtype=np.int32)
+        self.effect_duration = np.zeros((count, max_effects, n), dtype=np.int8)
+        self.shield = np.zeros((count, n), dtype=np.int32)
+        self.used_slots = np.zeros(count, dtype=np.int64)  # сколько слотов эффектов участника когда-либо занято
+        self.skill_costs = [np.array([skill.mp_cost for skill in char.skills], dtype=np.int32)
+                            for char in self.combatants]
+
+        # Порядок ходов одинаков во всех копиях: по убыванию ловкости
+        self.order = sorted(range(count), key=lambda i: -self.combatants[i].agility)
+
+        # Навыки босса для стратегий второй и третьей фаз (как в AOEStrategy/DebuffStrategy)
+        self.boss_aoe_skill = boss.skill_with_tag(AOE)
+        self.boss_debuff_skill = boss.skill_with_tag(DEBUFF)
+
+        self.active = np.ones(n, dtype=bool)
+        self.rounds = np.ones(n, dtype=np.int32)
+
+    # --- Элементарные операции над строками (боями) ---
+    # targets - номер участника (один для всех строк) или массив номеров по строкам
+
+    def _damage(self, rows, targets, amounts):
+        """Урон через щиты целей, как Human.take_damage"""
+        covered = np.nonzero(self.shield[targets, rows] > 0)[0]
+        if len(covered):
+            amounts = amounts.copy()
+            sub_targets = targets if np.isscalar(targets) else targets[covered]
+            amounts[covered] = self._absorb(rows[covered], sub_targets, amounts[covered])
+        self.hp[targets, rows] = np.maximum(self.hp[targets, rows] - amounts, 0)
+
+    def _slots(self, array, targets, rows, width: int):
+        """Первые width слотов целей в строках rows: массив [слоты, строки]"""
+        if np.isscalar(targets):
+            return array[targets, :width][:, rows]
+        return np.ascontiguousarray(array[targets, :width, rows].T)
+
+    def _set_slots(self, array, targets, rows, values):
+        if np.isscalar(targets):
+            array[targets, :len(values)][:, rows] = values
+        else:
+            array[targets, :len(values), rows] = values.T
+
+    def _absorb(self, rows, targets, amounts):
+        """Поглощение урона щитами по порядку слотов; возвращает прошедший урон
+
+        Щит в слоте j получает урон, прошедший через щиты перед ним, и
+        снимается, если этот урон больше его остатка (ShieldEffect.absorb_damage).
+        """
+        width = int(self.used_slots[targets] if np.isscalar(targets) else self.used_slots.max())
+        duration = self._slots(self.effect_duration, targets, rows, width)
+        power = self._slots(self.effect_power, targets, rows, width)
+        kind = self._slots(self.effect_type, targets, rows, width)
+        remaining = np.where((kind == SHIELD) & (duration > 0), power, 0)
+        ahead = np.cumsum(remaining, axis=0) - remaining
+        reaching = amounts - ahead
+        absorbed = np.clip(reaching, 0, remaining)
+        total = absorbed.sum(axis=0)
+        self._set_slots(self.effect_power, targets, rows, power - absorbed)
+        self._set_slots(self.effect_duration, targets, rows,
+                        np.where((remaining > 0) & (reaching > remaining), 0, duration))
+        self.shield[targets, rows] -= total
+        return amounts - total
+
+    def _heal(self, rows, targets, amounts):
+        self.hp[targets, rows] = np.minimum(self.hp[targets, rows] + amounts, self.max_hp[targets, rows])
+
+    def _add_effect(self, rows, targets, code: int, power, duration: int):
+        if not len(rows):
+            return
+        # Если свободных слотов нет, перезаписывается первый
+        durations = self._slots(self.effect_duration, targets, rows, self.effect_duration.shape[1])
+        slots = np.argmax(durations <= 0, axis=0)
+        replaced = (self.effect_duration[targets, slots, rows] > 0) & (self.effect_type[targets, slots, rows] == SHIELD)
+        if replaced.any():
+            self.shield[targets, rows] -= np.where(replaced, self.effect_power[targets, slots, rows], 0)
+        self.effect_type[targets, slots, rows] = code
+        self.effect_power[targets, slots, rows] = power
+        self.effect_duration[targets, slots, rows] = duration
+        if code == SHIELD:
+            self.shield[targets, rows] += power
+        if np.isscalar(targets):
+            self.used_slots[targets] = max(self.used_slots[targets], slots.max() + 1)
+        else:
+            np.maximum.at(self.used_slots, targets, slots + 1)
+
+    def _random_alive_target(self, rows):
+        alive = self.hp[:self.party_size, rows] > 0
+        picks = np.floor(self.rng.random(len(rows)) * alive.sum(axis=0)).astype(np.int32)
+        # picks-й живой: проход по членам пати со счетчиком живых перед ними
+        targets = np.zeros(len(rows), dtype=np.int32)
+        seen = np.zeros(len(rows), dtype=np.int32)
+        for member in range(1, self.party_size):
+            seen += alive[member - 1]
+            targets[alive[member] & (seen == picks)] = member
+        return targets
+
+    # --- Фазы хода ---
+
+    def _apply_effects(self, acting, actor: int):
+        """Тики всех слотов эффектов участника сразу, как EffectSet.tick"""
+        width = self.used_slots[actor]
+        if not width:
+            return
+        duration = self.effect_duration[actor, :width]
+        ticking = (duration > 0) & acting
+        if not ticking.any():
+            return
+        kind = self.effect_type[actor, :width]
+        power = self.effect_power[actor, :width]
+        # Отравление идет через щиты, как PoisonEffect.tick
+        poison = np.where(ticking & (kind == POISON), power, 0).sum(axis=0)
+        poisoned = np.nonzero(poison)[0]
+        if len(poisoned):
+            self._damage(poisoned, actor, poison[poisoned])
+        regeneration = np.where(ticking & (kind == REGENERATION), power, 0).sum(axis=0)
+        hp = self.hp[actor]
+        hp += regeneration
+        np.minimum(hp, self.max_hp[actor], out=hp)
+        # Истекающие щиты уносят свой остаток (разбитые отравлением уже сняты)
+        expiring = ticking & (duration == 1) & (kind == SHIELD)
+        self.shield[actor] -= np.where(expiring, power, 0).sum(axis=0)
+        duration -= ticking
+
+    def _basic_attack(self, rows, actor: int, targets):
+        stat, divisor, low, high, crit_chance = BASIC_ATTACKS[type(self.combatants[actor])]
+        damage = self.stats[stat][actor, rows] // divisor + self.rng.integers(low, high + 1, len(rows))
+        if crit_chance:
+            crit = self.rng.random(len(rows)) < crit_chance
+            damage = np.where(crit, (damage * 1.5).astype(np.int32), damage)
+        self._damage(rows, targets, damage)
+
+    def _use_skill(self, rows, actor: int, index: int, targets):
+        skill = self.combatants[actor].skills[index]
+        self.mp[actor, rows] -= skill.mp_cost
+        if skill.cooldown > 0:
+            self.cooldowns[actor, index, rows] = skill.cooldown
+
+        if isinstance(skill, (DamageSkill, HealSkill)):
+            stat = self.stats[skill.stat][actor, rows]
+            amount = np.floor((skill.base_power + stat) * skill.multiplier
+                              * self.rng.uniform(0.9, 1.1, len(rows))).astype(np.int32)
+            if isinstance(skill, DamageSkill):
+                self._damage(rows, targets, amount)
+            else:
+                self._heal(rows, targets, amount)
+        elif isinstance(skill, EffectSkill) and skill.effect_type in EFFECT_CODES:
+            alive = self.hp[targets, rows] > 0
+            power = (self.stats[skill.stat][actor, rows] * skill.power).astype(np.int32)
+            self._add_effect(rows[alive], targets if np.isscalar(targets) else targets[alive],
+                             EFFECT_CODES[skill.effect_type], power[alive], skill.duration)
+
+    def _silenced(self, rows, actor: int):
+        width = self.used_slots[actor]
+        if not width:
+            return np.zeros(len(rows), dtype=bool)
+        silenced = ((self.effect_type[actor, :width] == SILENCE)
+                    & (self.effect_duration[actor, :width] > 0)).any(axis=0)
+        return silenced[rows]
+
+    def _skill_ready(self, rows, actor: int, index: Optional[int]):
+        if index is None:
+            return np.zeros(len(rows), dtype=bool)
+        skill = self.combatants[actor].skills[index]
+        return (self.cooldowns[actor, index, rows] == 0) & (self.mp[actor, rows] >= skill.mp_cost)
+
+    def _party_turn(self, rows, actor: int):
+        """Случайная политика пати из Battle.run_turn; цель всегда босс"""
+        costs = self.skill_costs[actor]
+        boss = self.boss_index
+        mp = self.mp[actor, rows]
+
+        wants_skill = (self.rng.random(len(rows)) < 0.6) & (mp > 10)
+        if not len(costs):
+            self._basic_attack(rows, actor, boss)
+            return
+        wants_skill &= ~self._silenced(rows, actor)
+        available = (self.cooldowns[actor, :len(costs)][:, rows] == 0) & (mp >= costs[:, None])
+        counts = available.sum(axis=0)
+        uses = wants_skill & (counts > 0)
+
+        picks = np.floor(self.rng.random(len(rows)) * counts).astype(np.int32)
+        # picks-й готовый навык: проход по навыкам со счетчиком готовых перед ними
+        seen = np.zeros(len(rows), dtype=np.int32)
+        for index in range(len(costs)):
+            ready = available[index]
+            selected = np.nonzero(uses & ready & (seen == picks))[0]
+            seen += ready
+            if len(selected):
+                self._use_skill(rows[selected], actor, index, boss)
+
+        attacking = np.nonzero(~uses)[0]
+        if len(attacking):
+            self._basic_attack(rows[attacking], actor, boss)
+
+    def _boss_turn(self, rows, actor: int):
+        """Фазы Boss.update_strategy и стратегии AggressiveStrategy/AOEStrategy/DebuffStrategy"""
+        hp_percent = self.hp[actor, rows] / self.max_hp[actor, rows]
+        phase1 = hp_percent > 0.7
+        phase2 = ~phase1 & (hp_percent > 0.3)
+        phase3 = ~phase1 & ~phase2
+        party_hp = self.hp[:self.party_size, rows]
+        alive = party_hp > 0
+
+        if phase1.any():
+            sub = rows[phase1]
+            masked_hp = np.where(alive[:, phase1], party_hp[:, phase1], np.iinfo(np.int32).max)
+            self._basic_attack(sub, actor, np.argmin(masked_hp, axis=0))
+
+        random_attack = np.zeros(len(rows), dtype=bool)
+        silenced = self._silenced(rows, actor)
+        for phase, index in ((phase2, self.boss_aoe_skill), (phase3, self.boss_debuff_skill)):
+            if not phase.any():
+                continue
+            casting = phase & ~silenced & self._skill_ready(rows, actor, index)
+            random_attack |= phase & ~casting
+            if casting.any():
+                sub = rows[casting]
+                if phase is phase2:
+                    # AOE-навык получает всех живых, DamageSkill бьет первого из них
+                    targets = np.argmax(alive[:, casting], axis=0)
+                else:
+                    targets = self._random_alive_target(sub)
+                self._use_skill(sub, actor, index, targets)
+
+        if random_attack.any():
+            sub = rows[random_attack]
+            self._basic_attack(sub, actor, self._random_alive_target(sub))
+
+    def _turn(self, actor: int):
+        acting = self.active & (self.hp[actor] > 0)
+        rows = np.nonzero(acting)[0]
+        if not len(rows):
+            return
+
+        self._apply_effects(acting, actor)
+        cooldowns = self.cooldowns[actor]
+        np.subtract(cooldowns, 1, out=cooldowns, where=(cooldowns > 0) & acting)
+
+        if actor == self.boss_index:
+            self._boss_turn(rows, actor)
+        else:
+            self._party_turn(rows, actor)
+
+        self.active &= (self.hp[:self.party_size] > 0).any(axis=0) & (self.hp[self.boss_index] > 0)
+
+    def _collect(self, rows, timed_out: bool = False):
+        """Перенос результатов завершенных боев в итоговую статистику
+
+        timed_out - бои, упершиеся в max_rounds при живых обеих сторонах: они
+        считаются отдельно (SimulationResult.timeouts), а не победами пати.
+        """
+        survivors = (self.hp[:self.party_size, rows] > 0).sum(axis=0)
+        self.result.battles += len(survivors)
+        if timed_out:
+            self.result.timeouts += len(survivors)
+        else:
+            self.result.party_wins += int((survivors > 0).sum())
+        self.result.rounds.update(_value_counts(self.rounds[rows]))
+        self.result.survivors.update(_value_counts(survivors))
+
+    def _compact(self):
+        """Сжатие массивов состояния до еще идущих боев"""
+        self._collect(~self.active)
+        keep = self.active
+        for name in ('hp', 'max_hp', 'mp', 'max_mp', 'shield', 'cooldowns',
+                     'effect_type', 'effect_power', 'effect_duration'):
+            setattr(self, name, np.ascontiguousarray(getattr(self, name)[..., keep]))
+        self.stats = {attr: np.ascontiguousarray(values[:, keep]) for attr, values in self.stats.items()}
+        self.rounds = self.rounds[keep]
+        self.active = self.active[keep]
+
+    def run(self) -> SimulationResult:
+        """Прогон всех боев до конца (или до max_rounds раундов)"""
+        self.result = SimulationResult()
+        for _ in range(self.max_rounds):
+            for actor in self.order:
+                if not self.active.any():
+                    break
+                self._turn(actor)
+            if not self.active.any():
+                break
+            self.rounds[self.active] += 1
+            # Завершенные бои больше не тратят время на маскированные операции
+            if self.active.sum() * 2 < len(self.active):
+                self._compact()
+
+        self._collect(~self.active)
+        self._collect(self.active, timed_out=True)
+        return self.result
+
+def _value_counts(values) -> Counter:
+    counts = np.bincount(values)
+    return Counter({int(v): int(counts[v]) for v in np.flatnonzero(counts)})
+
+def simulate_vectorized(party_factory: Callable[[], List[Character]], boss_factory: Callable[[], Boss],
+                        n: int, seed: Optional[int] = None, **kwargs) -> SimulationResult:
+    """Аналог simulation.simulate на векторизованном движке"""
+    return VectorizedBattle(party_factory, boss_factory, n, seed, **kwargs).run()